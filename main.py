@@ -5,7 +5,11 @@
 注意: 程序启动时可能会出现libpng警告信息，这些警告来自Windows系统TTK主题中的PNG图标，
      包含不正确的sRGB颜色配置文件。这些警告不影响程序的正常功能，可以安全忽略。
 """
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
 import sys
 from pathlib import Path
 
@@ -17,8 +21,33 @@ try:
     # 导入主窗口
     from src.gui.main_window import MainWindow
     
+    def configure_logging(verbose: bool = False):
+        """
+        配置日志输出
+        
+        默认只输出警告和错误，使用 --verbose 启动时输出各处理器的详细调试信息。
+        日志记录先放入队列，由后台线程写入控制台，打印循环不会因控制台输出而阻塞。
+        
+        Args:
+            verbose: 是否输出调试信息
+        """
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter("%(message)s"))
+        
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        listener.start()
+        atexit.register(listener.stop)
+        
+        logging.basicConfig(
+            level=logging.DEBUG if verbose else logging.WARNING,
+            handlers=[logging.handlers.QueueHandler(log_queue)]
+        )
+    
     def main():
         """主函数"""
+        configure_logging(verbose="--verbose" in sys.argv[1:])
+        
         print("=" * 50)
         print("        办公文档批量打印器 v5.0")
         print("  支持 Word、PowerPoint、Excel、PDF 文档")
@@ -55,6 +55,13 @@ class ScalingMode(Enum):
     NOSCALE = "noscale"   # 无缩放
 
 
+# 枚举值到成员的映射表（直接查字典，比调用枚举构造函数更快）
+COLOR_MODE_BY_VALUE = {m.value: m for m in ColorMode}
+ORIENTATION_BY_VALUE = {m.value: m for m in Orientation}
+DUPLEX_MODE_BY_VALUE = {m.value: m for m in DuplexMode}
+SCALING_MODE_BY_VALUE = {m.value: m for m in ScalingMode}
+
+
 @dataclass
 class Document:
     """文档数据模型"""
@@ -146,6 +153,11 @@ class PrintSettings:
             return "simplex"
         return self.duplex_mode.value
     
+    @property
+    def sumatra_settings_str(self) -> str:
+        """SumatraPDF -print-settings 参数"""
+        return f"{self.duplex_mode_str},{self.orientation_str}"
+    
     def to_dict(self) -> dict:
         """转换为字典"""
         return {
@@ -167,10 +179,10 @@ class PrintSettings:
             paper_size=data.get('paper_size', 'A4'),
             copies=data.get('copies', 1),
             duplex=data.get('duplex', False),
-            duplex_mode=DuplexMode(data.get('duplex_mode', 'duplexlong')),
-            color_mode=ColorMode(data.get('color_mode', 'grayscale')),
-            orientation=Orientation(data.get('orientation', 'portrait')),
-            scaling=ScalingMode(data.get('scaling', 'fit'))
+            duplex_mode=DUPLEX_MODE_BY_VALUE[data.get('duplex_mode', 'duplexlong')],
+            color_mode=COLOR_MODE_BY_VALUE[data.get('color_mode', 'grayscale')],
+            orientation=ORIENTATION_BY_VALUE[data.get('orientation', 'portrait')],
+            scaling=SCALING_MODE_BY_VALUE[data.get('scaling', 'fit')]
         )
 
 
@@ -10,7 +10,8 @@ from enum import Enum
 from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 
 from .models import Document, FileType
-from ..handlers import HandlerRegistry, PDFDocumentHandler, WordDocumentHandler, PowerPointDocumentHandler, ExcelDocumentHandler, ImageDocumentHandler, TextDocumentHandler
+from ..handlers import BaseDocumentHandler, HandlerRegistry, PDFDocumentHandler, WordDocumentHandler, PowerPointDocumentHandler, ExcelDocumentHandler, ImageDocumentHandler, TextDocumentHandler
+from ..handlers.com_utils import com_apartment
 
 
 class PageCountStatus(Enum):
@@ -123,59 +124,61 @@ class PageCountManager:
         print(f"📊 开始批量页数统计，共 {len(documents)} 个文档")
         self._cancel_flag = False
         
-        results = []
-        total_docs = len(documents)
-        
-        try:
-            # 使用线程池并行计算页数
-            futures = []
-            for i, document in enumerate(documents):
-                if self._cancel_flag:
-                    break
-                
-                future = self._executor.submit(self._calculate_single_document, document)
-                futures.append((i, future))
+        # 文件状态只在本次统计内缓存，文件在两次统计之间可能发生变化
+        with BaseDocumentHandler.stat_cache():
+            results = []
+            total_docs = len(documents)
             
-            # 收集结果
-            for i, future in futures:
-                try:
+            try:
+                # 使用线程池并行计算页数
+                futures = []
+                for i, document in enumerate(documents):
                     if self._cancel_flag:
                         break
                     
-                    # 更新进度
-                    if self._progress_callback:
-                        self._progress_callback(
-                            len(results) + 1, total_docs,
-                            f"正在统计: {documents[i].file_name}"
+                    future = self._executor.submit(self._calculate_single_document, document)
+                    futures.append((i, future))
+                
+                # 收集结果
+                for i, future in futures:
+                    try:
+                        if self._cancel_flag:
+                            break
+                        
+                        # 更新进度
+                        if self._progress_callback:
+                            self._progress_callback(
+                                len(results) + 1, total_docs,
+                                f"正在统计: {documents[i].file_name}"
+                            )
+                        
+                        result = future.result(timeout=60)  # 60秒超时
+                        results.append(result)
+                        
+                    except Exception as e:
+                        # 创建错误结果
+                        error_result = PageCountResult(
+                            document=documents[i],
+                            status=PageCountStatus.ERROR,
+                            error_message=f"计算超时或异常: {e}"
                         )
-                    
-                    result = future.result(timeout=60)  # 60秒超时
-                    results.append(result)
-                    
-                except Exception as e:
-                    # 创建错误结果
-                    error_result = PageCountResult(
-                        document=documents[i],
-                        status=PageCountStatus.ERROR,
-                        error_message=f"计算超时或异常: {e}"
+                        results.append(error_result)
+                
+                # 生成汇总
+                summary = self._generate_summary(results)
+                
+                if self._progress_callback:
+                    self._progress_callback(
+                        len(results), total_docs,
+                        f"页数统计完成！总页数: {summary.total_pages}"
                     )
-                    results.append(error_result)
-            
-            # 生成汇总
-            summary = self._generate_summary(results)
-            
-            if self._progress_callback:
-                self._progress_callback(
-                    len(results), total_docs,
-                    f"页数统计完成！总页数: {summary.total_pages}"
-                )
-            
-            print(f"📊 页数统计完成: {summary.success_count}/{len(results)} 成功")
-            return summary
-            
-        except Exception as e:
-            print(f"批量页数统计失败: {e}")
-            return PageCountSummary()
+                
+                print(f"📊 页数统计完成: {summary.success_count}/{len(results)} 成功")
+                return summary
+                
+            except Exception as e:
+                print(f"批量页数统计失败: {e}")
+                return PageCountSummary()
     
     def _calculate_single_document(self, document: Document) -> PageCountResult:
         """
@@ -216,7 +219,9 @@ class PageCountManager:
             
             # 使用处理器计算页数
             print(f"🔧 使用 {handler.get_handler_name()} 统计页数: {document.file_name}")
-            page_count = handler.count_pages(document.file_path)
+            # 线程池线程随管理器销毁，COM在每次统计后反初始化
+            with com_apartment():
+                page_count = handler.count_pages(document.file_path)
             
             # 验证结果
             if page_count < 0:
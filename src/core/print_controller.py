@@ -9,7 +9,8 @@ from concurrent.futures import ThreadPoolExecutor, Future
 
 from .models import Document, PrintSettings, PrintStatus, FileType
 from .printer_config_manager import PrinterConfigManager
-from ..handlers import HandlerRegistry, PDFDocumentHandler, WordDocumentHandler, PowerPointDocumentHandler, ExcelDocumentHandler, ImageDocumentHandler, TextDocumentHandler
+from ..handlers import BaseDocumentHandler, HandlerRegistry, PDFDocumentHandler, WordDocumentHandler, PowerPointDocumentHandler, ExcelDocumentHandler, ImageDocumentHandler, TextDocumentHandler
+from ..handlers.com_utils import com_apartment
 
 
 class PrintController:
@@ -33,10 +34,13 @@ class PrintController:
         """设置文档处理器"""
         self._handler_registry = HandlerRegistry()
         
+        # Word处理器在批量打印时开启会话，需要保留引用
+        self._word_handler = WordDocumentHandler()
+        
         # 注册所有处理器
         handlers = [
             PDFDocumentHandler(),
-            WordDocumentHandler(),
+            self._word_handler,
             PowerPointDocumentHandler(),
             ExcelDocumentHandler(),
             ImageDocumentHandler(),
@@ -136,38 +140,49 @@ class PrintController:
                 else:
                     print(f"⚠️ 系统级配置应用失败，将使用各处理器的独立设置")
             
-            for i, document in enumerate(self._print_queue):
-                try:
-                    # 更新进度
-                    if self._print_progress_callback:
-                        self._print_progress_callback(
-                            i + 1, total_docs, 
-                            f"正在打印: {document.file_name}"
-                        )
-                    
-                    # 更新文档状态为打印中
-                    document.print_status = PrintStatus.PRINTING
-                    
-                    # 执行打印
-                    success = self._print_single_document(document)
-                    
-                    if success:
-                        document.print_status = PrintStatus.COMPLETED
-                        success_count += 1
-                        print(f"✓ 打印成功: {document.file_name}")
-                    else:
+            # 打印机配置可能已变化，清空双面设置验证缓存
+            try:
+                from ..handlers.print_utils import clear_printer_duplex_cache
+                clear_printer_duplex_cache()
+            except ImportError:
+                pass
+            
+            # 文件状态只在本批次内缓存；Excel、Word文件在整个批次中各自复用同一个应用实例
+            # （会话先于COM反初始化结束）
+            with com_apartment(), BaseDocumentHandler.stat_cache(), \
+                    ExcelDocumentHandler.session(), self._word_handler.session():
+                for i, document in enumerate(self._print_queue):
+                    try:
+                        # 更新进度
+                        if self._print_progress_callback:
+                            self._print_progress_callback(
+                                i + 1, total_docs, 
+                                f"正在打印: {document.file_name}"
+                            )
+                        
+                        # 更新文档状态为打印中
+                        document.print_status = PrintStatus.PRINTING
+                        
+                        # 执行打印
+                        success = self._print_single_document(document)
+                        
+                        if success:
+                            document.print_status = PrintStatus.COMPLETED
+                            success_count += 1
+                            print(f"✓ 打印成功: {document.file_name}")
+                        else:
+                            document.print_status = PrintStatus.ERROR
+                            error_count += 1
+                            print(f"✗ 打印失败: {document.file_name}")
+                        
+                        # 短暂延迟，避免打印队列拥堵
+                        time.sleep(0.5)
+                        
+                    except Exception as e:
                         document.print_status = PrintStatus.ERROR
                         error_count += 1
-                        print(f"✗ 打印失败: {document.file_name}")
-                    
-                    # 短暂延迟，避免打印队列拥堵
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    document.print_status = PrintStatus.ERROR
-                    error_count += 1
-                    print(f"✗ 打印异常 {document.file_name}: {e}")
-            
+                        print(f"✗ 打印异常 {document.file_name}: {e}")
+                
             # 打印完成
             if self._print_progress_callback:
                 self._print_progress_callback(
@@ -2,6 +2,7 @@
 打印设置管理器
 负责检测打印机、管理打印设置配置
 """
+import time
 import win32print
 import win32api
 from typing import List, Dict, Optional, Tuple
@@ -50,6 +51,12 @@ DC_MAXCOPIES = 36
 class PrinterSettingsManager:
     """打印机设置管理器类"""
     
+    # 打印机列表缓存有效期（秒），期间非强制刷新直接使用缓存结果
+    PRINTER_CACHE_TTL = 10.0
+    
+    # 纸张尺寸列表缓存有效期（秒），用于"同步电脑纸张"
+    PAPER_SIZES_CACHE_TTL = 60.0
+    
     # 标准纸张尺寸映射表（作为备用）
     STANDARD_PAPER_SIZES = {
         'A4': (210, 297),
@@ -58,6 +65,10 @@ class PrinterSettingsManager:
         'B5': (176, 250)
     }
     
+    # 标准纸张名称（类加载时生成一次，供界面直接使用和成员判断）
+    STANDARD_PAPER_NAMES = tuple(STANDARD_PAPER_SIZES)
+    STANDARD_PAPER_SET = frozenset(STANDARD_PAPER_SIZES)
+    
     # 常见纸张尺寸代码映射（DMPAPER_* 常量）
     PAPER_CODE_MAPPING = {
         1: 'Letter',
@@ -183,6 +194,8 @@ class PrinterSettingsManager:
         self._available_printers: List[str] = []
         self._default_printer: Optional[str] = None
         self._printer_paper_sizes: Dict[str, List[str]] = {}  # 缓存各打印机的纸张大小
+        self._paper_sizes_cache: Dict[str, Tuple[float, List[str]]] = {}  # 带时间戳的纸张大小缓存
+        self._printers_refreshed_at = 0.0  # 打印机列表上次成功枚举的时间
         self._refresh_printers()
     
     def _refresh_printers(self):
@@ -200,6 +213,8 @@ class PrinterSettingsManager:
                 
             # 清空纸张尺寸缓存，强制重新读取
             self._printer_paper_sizes.clear()
+            self._paper_sizes_cache.clear()
+            self._printers_refreshed_at = time.monotonic()
                 
             print(f"发现 {len(self._available_printers)} 台打印机")
             if self._default_printer:
@@ -209,6 +224,7 @@ class PrinterSettingsManager:
             print(f"获取打印机列表失败: {e}")
             self._available_printers = []
             self._default_printer = None
+            self._printers_refreshed_at = 0.0
     
     @property
     def available_printers(self) -> List[str]:
@@ -402,6 +418,27 @@ class PrinterSettingsManager:
             self._printer_paper_sizes[printer_name] = fallback_papers
             return fallback_papers
 
+    def get_printer_paper_sizes_cached(self, printer_name: str) -> List[str]:
+        """
+        获取指定打印机支持的纸张大小列表（缓存有效期内不再查询驱动）
+        
+        Args:
+            printer_name: 打印机名称
+            
+        Returns:
+            纸张大小列表
+        """
+        now = time.monotonic()
+        entry = self._paper_sizes_cache.get(printer_name)
+        if entry and now - entry[0] < self.PAPER_SIZES_CACHE_TTL:
+            return entry[1]
+        
+        # 缓存过期，丢弃旧结果重新通过 DeviceCapabilities 读取
+        self._printer_paper_sizes.pop(printer_name, None)
+        paper_sizes = self.get_printer_paper_sizes(printer_name)
+        self._paper_sizes_cache[printer_name] = (now, paper_sizes)
+        return paper_sizes
+    
     def get_printer_paper_details(self, printer_name: str) -> Dict[str, Tuple[float, float]]:
         """
         获取指定打印机的纸张尺寸详细信息（尺寸以毫米为单位）
@@ -492,10 +529,21 @@ class PrinterSettingsManager:
             print(f"获取打印机功能失败 {printer_name}: {e}")
             return {'paper_sizes': list(self.STANDARD_PAPER_SIZES.keys())}
     
-    def refresh_printer_list(self):
-        """手动刷新打印机列表"""
+    def refresh_printer_list(self, force: bool = False):
+        """
+        刷新打印机列表
+        
+        Args:
+            force: 是否忽略缓存强制重新枚举（用户点击刷新时使用）
+        """
+        if not force and time.monotonic() - self._printers_refreshed_at < self.PRINTER_CACHE_TTL:
+            return
         self._refresh_printers()
     
+    def invalidate_printer_cache(self):
+        """使打印机列表缓存失效，下次刷新时重新枚举"""
+        self._printers_refreshed_at = 0.0
+    
     def set_default_printer(self, printer_name: str) -> bool:
         """
         设置默认打印机
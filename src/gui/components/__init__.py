@@ -6,12 +6,13 @@ GUI组件模块
 from .file_import_handler import FileImportHandler
 from .list_operation_handler import ListOperationHandler
 from .window_manager import WindowManager
-from .tooltip import ToolTip, create_button_tooltip
+from .tooltip import ToolTip, LazyToolTip, create_button_tooltip
 
 __all__ = [
     'FileImportHandler',
     'ListOperationHandler', 
     'WindowManager',
     'ToolTip',
+    'LazyToolTip',
     'create_button_tooltip'
 ] 
\ No newline at end of file
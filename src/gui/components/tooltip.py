@@ -218,4 +218,39 @@ def create_button_tooltip(button: tk.Widget, text: str, delay: Optional[int] = N
     """
     if delay is None:
         delay = FILTER_DELAY
-    return ToolTip(button, text, delay=delay, wraplength=FILTER_WRAPLENGTH) 
\ No newline at end of file
+    return ToolTip(button, text, delay=delay, wraplength=FILTER_WRAPLENGTH)
+
+
+class LazyToolTip:
+    """
+    延迟创建的提示框组件
+    
+    仅绑定<Enter>事件，首次悬停时才创建真正的ToolTip，
+    之后由ToolTip接管事件绑定。从未悬停过的控件不会分配提示框对象。
+    
+    使用方法:
+    LazyToolTip(widget, "这是提示文本")
+    """
+    
+    def __init__(self, widget: tk.Widget, text: str, delay: Optional[int] = None):
+        """
+        初始化延迟提示框
+        
+        Args:
+            widget: 要添加提示的控件
+            text: 提示文本
+            delay: 延迟时间，如果为None则使用配置默认值
+        """
+        self.widget = widget
+        self.text = text
+        self.delay = delay
+        self.tooltip: Optional[ToolTip] = None
+        
+        self._bind_id = self.widget.bind('<Enter>', self._on_first_enter, add='+')
+    
+    def _on_first_enter(self, event=None):
+        """首次鼠标进入控件时创建ToolTip并替换自身绑定"""
+        self.widget.unbind('<Enter>', self._bind_id)
+        self.tooltip = create_button_tooltip(self.widget, self.text, self.delay)
+        self.tooltip._on_enter(event)
+
@@ -25,12 +25,25 @@ from src.gui.print_settings_dialog import PrintSettingsDialog
 from src.gui.page_count_dialog import show_page_count_dialog
 
 # 导入功能处理器
-from src.gui.components import FileImportHandler, ListOperationHandler, WindowManager, create_button_tooltip
+from src.gui.components import FileImportHandler, ListOperationHandler, WindowManager, LazyToolTip
 
 
 class MainWindow:
     """主窗口类 (重构版本)"""
     
+    # 界面提示配置: (控件属性名, 提示文本)
+    _TOOLTIPS = (
+        # 文件类型过滤器
+        ("chk_word", "Word文档过滤器\n支持格式: .doc, .docx, .wps"),
+        ("chk_ppt", "PowerPoint演示文稿过滤器\n支持格式: .ppt, .pptx, .dps"),
+        ("chk_excel", "Excel表格过滤器\n支持格式: .xls, .xlsx, .et\n注意:此格式只能模糊统计页数，请先手动再文件内排版好再打印"),
+        ("chk_pdf", "PDF文档过滤器\n支持标准PDF文件"),
+        ("chk_image", "图片文件过滤器\n支持格式: .jpg, .jpeg, .png, .bmp, .tiff, .tif, .webp\n注意: TIFF可能包含多页，其他图片按1页计算"),
+        ("chk_text", "文本文件过滤器\n支持格式: .txt\n注意:此格式只能模糊统计页数"),
+        # 工具栏按钮
+        ("btn_filter", "文件过滤\n根据上方勾选的文件类型过滤列表\n只保留勾选类型的文档，移除未勾选类型的文档"),
+    )
+    
     def __init__(self):
         """初始化主窗口"""
         # 创建支持拖拽的主窗口
@@ -71,6 +84,17 @@ class MainWindow:
         # 窗口管理器
         self.window_manager = WindowManager(self.root, self.config_manager)
         
+        # 文件类型启用状态快照 (勾选框切换时更新，避免每次读取都访问Tcl变量)
+        enabled = self.app_config.enabled_file_types
+        self._enabled_types = {
+            'word': enabled.get('word', True),
+            'ppt': enabled.get('ppt', True),
+            'excel': enabled.get('excel', False),
+            'pdf': enabled.get('pdf', True),
+            'image': enabled.get('image', True),
+            'text': enabled.get('text', True)
+        }
+        
         # 文件导入处理器 (需要在创建界面后初始化拖拽功能)
         self.file_import_handler = FileImportHandler(
             self.document_manager, 
@@ -80,6 +104,9 @@ class MainWindow:
         
         # 列表操作处理器 (需要在创建树形控件后初始化)
         self.list_operation_handler = None  # 稍后初始化
+        
+        # 打印设置对话框（首次打开时创建，关闭后隐藏复用）
+        self._print_settings_dialog = None
     
     def _setup_window(self):
         """设置窗口属性"""
@@ -195,12 +222,21 @@ class MainWindow:
     def _create_file_type_filters(self, parent):
         """创建文件类型过滤器"""
         # 文件类型勾选框变量
-        self.var_word = tk.BooleanVar(value=self.app_config.enabled_file_types.get('word', True))
-        self.var_ppt = tk.BooleanVar(value=self.app_config.enabled_file_types.get('ppt', True))
-        self.var_excel = tk.BooleanVar(value=self.app_config.enabled_file_types.get('excel', False))
-        self.var_pdf = tk.BooleanVar(value=self.app_config.enabled_file_types.get('pdf', True))
-        self.var_image = tk.BooleanVar(value=self.app_config.enabled_file_types.get('image', True))
-        self.var_text = tk.BooleanVar(value=self.app_config.enabled_file_types.get('text', True))
+        self.var_word = tk.BooleanVar(value=self._enabled_types['word'])
+        self.var_ppt = tk.BooleanVar(value=self._enabled_types['ppt'])
+        self.var_excel = tk.BooleanVar(value=self._enabled_types['excel'])
+        self.var_pdf = tk.BooleanVar(value=self._enabled_types['pdf'])
+        self.var_image = tk.BooleanVar(value=self._enabled_types['image'])
+        self.var_text = tk.BooleanVar(value=self._enabled_types['text'])
+        
+        self._type_vars = {
+            'word': self.var_word,
+            'ppt': self.var_ppt,
+            'excel': self.var_excel,
+            'pdf': self.var_pdf,
+            'image': self.var_image,
+            'text': self.var_text
+        }
         
         # 标题
         title_label = ttk.Label(parent, text="文档列表")
@@ -209,27 +245,27 @@ class MainWindow:
         # 文件类型勾选框
         self.chk_word = ttk.Checkbutton(
             parent, text="Word", variable=self.var_word,
-            command=self._on_filter_changed
+            command=lambda k='word': self._toggle_type(k)
         )
         self.chk_ppt = ttk.Checkbutton(
             parent, text="PPT", variable=self.var_ppt,
-            command=self._on_filter_changed
+            command=lambda k='ppt': self._toggle_type(k)
         )
         self.chk_excel = ttk.Checkbutton(
             parent, text="Excel", variable=self.var_excel,
-            command=self._on_filter_changed
+            command=lambda k='excel': self._toggle_type(k)
         )
         self.chk_pdf = ttk.Checkbutton(
             parent, text="PDF", variable=self.var_pdf,
-            command=self._on_filter_changed
+            command=lambda k='pdf': self._toggle_type(k)
         )
         self.chk_image = ttk.Checkbutton(
             parent, text="图片", variable=self.var_image,
-            command=self._on_filter_changed
+            command=lambda k='image': self._toggle_type(k)
         )
         self.chk_text = ttk.Checkbutton(
             parent, text="文本", variable=self.var_text,
-            command=self._on_filter_changed
+            command=lambda k='text': self._toggle_type(k)
         )
         
         # 布局
@@ -249,6 +285,7 @@ class MainWindow:
         # 创建Treeview
         columns = ("文件名", "类型", "大小", "状态", "路径")
         self.doc_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=15)
+        self.doc_tree.configure(selectmode="extended")
         
         # 设置列标题和宽度
         self.doc_tree.heading("文件名", text="文件名")
@@ -257,11 +294,12 @@ class MainWindow:
         self.doc_tree.heading("状态", text="状态")
         self.doc_tree.heading("路径", text="文件路径")
         
-        self.doc_tree.column("文件名", width=240)
-        self.doc_tree.column("类型", width=80)
-        self.doc_tree.column("大小", width=80)
-        self.doc_tree.column("状态", width=50)
-        self.doc_tree.column("路径", width=310)
+        # 固定前几列宽度，仅路径列随窗口伸缩，避免插入行时重复计算列宽
+        self.doc_tree.column("文件名", width=240, stretch=tk.NO)
+        self.doc_tree.column("类型", width=80, stretch=tk.NO)
+        self.doc_tree.column("大小", width=80, stretch=tk.NO)
+        self.doc_tree.column("状态", width=50, stretch=tk.NO)
+        self.doc_tree.column("路径", width=310, stretch=tk.YES)
         
         # 滚动条
         scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.doc_tree.yview)
@@ -356,32 +394,9 @@ class MainWindow:
     
     def _setup_tooltips(self):
         """设置界面提示功能"""
-        # 只为文件类型过滤器添加tooltip
-        create_button_tooltip(self.chk_word, 
-            "Word文档过滤器\n支持格式: .doc, .docx, .wps")
-        
-        create_button_tooltip(self.chk_ppt, 
-            "PowerPoint演示文稿过滤器\n支持格式: .ppt, .pptx, .dps")
-        
-        create_button_tooltip(self.chk_excel, 
-            "Excel表格过滤器\n支持格式: .xls, .xlsx, .et\n注意:此格式只能模糊统计页数，请先手动再文件内排版好再打印")
-        
-        create_button_tooltip(self.chk_pdf, 
-            "PDF文档过滤器\n支持标准PDF文件")
-        
-        create_button_tooltip(self.chk_image, 
-            "图片文件过滤器\n支持格式: .jpg, .jpeg, .png, .bmp, .tiff, .tif, .webp\n注意: TIFF可能包含多页，其他图片按1页计算")
-        
-        create_button_tooltip(self.chk_text, 
-            "文本文件过滤器\n支持格式: .txt\n注意:此格式只能模糊统计页数")
-        
-        # 为工具栏按钮添加tooltip
-        create_button_tooltip(self.btn_filter, 
-            "文件过滤\n根据上方勾选的文件类型过滤列表\n只保留勾选类型的文档，移除未勾选类型的文档")
-        
-
-    
-
+        # 提示框在首次悬停时才创建
+        for widget_attr, text in self._TOOLTIPS:
+            LazyToolTip(getattr(self, widget_attr), text)
     
     # === 文件操作相关方法 ===
     def _add_files(self):
@@ -433,14 +448,12 @@ class MainWindow:
     # === 文件类型过滤器相关 ===
     def _get_enabled_file_types(self) -> dict:
         """获取当前启用的文件类型"""
-        return {
-            'word': self.var_word.get(),
-            'ppt': self.var_ppt.get(),
-            'excel': self.var_excel.get(),
-            'pdf': self.var_pdf.get(),
-            'image': self.var_image.get(),
-            'text': self.var_text.get()
-        }
+        return dict(self._enabled_types)
+    
+    def _toggle_type(self, type_key: str):
+        """文件类型勾选框切换事件，同步更新启用状态快照"""
+        self._enabled_types[type_key] = self._type_vars[type_key].get()
+        self._on_filter_changed()
     
     def _on_filter_changed(self):
         """文件类型过滤器变更事件"""
@@ -461,11 +474,17 @@ class MainWindow:
     # === 打印相关方法 ===
     def _show_print_settings(self):
         """显示打印设置对话框"""
-        dialog = PrintSettingsDialog(
-            self.root, 
-            self.printer_manager, 
-            self.current_print_settings
-        )
+        dialog = self._print_settings_dialog
+        if dialog is not None and dialog.is_alive():
+            # 复用隐藏的对话框，无需重新创建组件
+            dialog.show(self.current_print_settings)
+        else:
+            dialog = PrintSettingsDialog(
+                self.root, 
+                self.printer_manager, 
+                self.current_print_settings
+            )
+            self._print_settings_dialog = dialog
         
         if dialog.result:
             self.current_print_settings = dialog.result
@@ -658,9 +677,46 @@ class MainWindow:
             self.btn_calculate_pages.config(state="normal")
     
     # === 右键菜单相关 ===
+    # 右键菜单项索引 (菜单只创建一次，弹出时通过entryconfigure切换状态和标签)
+    _MENU_OPEN_FOLDER = 0
+    _MENU_PRINT_SELECTED = 1
+    _MENU_REMOVE = 2
+    _MENU_CALCULATE = 7
+    _MENU_EXPORT = 8
+    
     def _create_context_menu(self):
         """创建右键菜单"""
         self.context_menu = tk.Menu(self.root, tearoff=0)
+        self.context_menu.add_command(
+            label="📁  打开所在文件夹",
+            command=lambda: self.list_operation_handler.open_file_location() if self.list_operation_handler else None
+        )
+        self.context_menu.add_command(
+            label="📄  仅打印选中文档",
+            command=self._print_selected_documents
+        )
+        self.context_menu.add_command(
+            label="❌  从列表中移除",
+            command=self._remove_selected_documents
+        )
+        self.context_menu.add_separator()
+        self.context_menu.add_command(
+            label="🔄  重置排序",
+            command=self._reset_sort
+        )
+        self.context_menu.add_command(
+            label="🔍  文件过滤",
+            command=self._filter_documents
+        )
+        self.context_menu.add_separator()
+        self.context_menu.add_command(
+            label="📊  计算选中文档页数",
+            command=self._calculate_selected_pages
+        )
+        self.context_menu.add_command(
+            label="💾  导出选中文档列表",
+            command=lambda: self.list_operation_handler.export_document_list("selected") if self.list_operation_handler else None
+        )
     
     def _show_context_menu(self, event):
         """显示右键菜单"""
@@ -668,74 +724,24 @@ class MainWindow:
         if not selection:
             return
         
-        # 清空现有菜单项
-        self.context_menu.delete(0, "end")
-        
-        # 根据选中项目数量构建菜单
+        # 根据选中项目数量切换菜单项状态和标签
         selected_count = len(selection)
+        single = selected_count == 1
+        suffix = "" if single else f" ({selected_count}个文件)"
         
-        if selected_count == 1:
-            # 单文件菜单
-            self.context_menu.add_command(
-                label="📁  打开所在文件夹",
-                command=lambda: self.list_operation_handler.open_file_location() if self.list_operation_handler else None
-            )
-            self.context_menu.add_command(
-                label="📄  仅打印选中文档",
-                command=self._print_selected_documents
-            )
-            self.context_menu.add_command(
-                label="❌  从列表中移除",
-                command=self._remove_selected_documents
-            )
-            self.context_menu.add_separator()
-            self.context_menu.add_command(
-                label="🔄  重置排序",
-                command=self._reset_sort
-            )
-            self.context_menu.add_command(
-                label="🔍  文件过滤",
-                command=self._filter_documents
-            )
-            self.context_menu.add_separator()
-            self.context_menu.add_command(
-                label="📊  计算选中文档页数",
-                command=self._calculate_selected_pages
-            )
-        else:
-            # 多文件菜单
-            self.context_menu.add_command(
-                label=f"📄  仅打印选中文档 ({selected_count}个文件)",
-                command=self._print_selected_documents
-            )
-            self.context_menu.add_command(
-                label=f"❌  从列表中移除 ({selected_count}个文件)",
-                command=self._remove_selected_documents
-            )
-            self.context_menu.add_separator()
-            self.context_menu.add_command(
-                label="🔄  重置排序",
-                command=self._reset_sort
-            )
-            self.context_menu.add_command(
-                label="🔍  文件过滤",
-                command=self._filter_documents
-            )
-            self.context_menu.add_separator()
-            self.context_menu.add_command(
-                label=f"📊  计算选中文档页数 ({selected_count}个文件)",
-                command=self._calculate_selected_pages
-            )
-            self.context_menu.add_command(
-                label=f"💾  导出选中文档列表 ({selected_count}个文件)",
-                command=lambda: self.list_operation_handler.export_document_list("selected") if self.list_operation_handler else None
-            )
+        menu = self.context_menu
+        menu.entryconfigure(self._MENU_OPEN_FOLDER, state="normal" if single else "disabled")
+        menu.entryconfigure(self._MENU_PRINT_SELECTED, label=f"📄  仅打印选中文档{suffix}")
+        menu.entryconfigure(self._MENU_REMOVE, label=f"❌  从列表中移除{suffix}")
+        menu.entryconfigure(self._MENU_CALCULATE, label=f"📊  计算选中文档页数{suffix}")
+        menu.entryconfigure(self._MENU_EXPORT, label=f"💾  导出选中文档列表{suffix}",
+                            state="disabled" if single else "normal")
         
         # 显示菜单
         try:
-            self.context_menu.tk_popup(event.x_root, event.y_root)
+            menu.tk_popup(event.x_root, event.y_root)
         finally:
-            self.context_menu.grab_release()
+            menu.grab_release()
     
     def _print_selected_documents(self):
         """仅打印选中的文档"""
@@ -6,53 +6,81 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from pathlib import Path
 from typing import List
-import csv
-import json
-from datetime import datetime
+from itertools import chain, islice
 import threading
+import time
 
 from src.core.page_count_manager import PageCountManager, PageCountSummary, PageCountResult, PageCountStatus
 from src.core.models import Document, FileType
 
 
+# 文件类型显示名称
+_FILE_TYPE_DISPLAY = {
+    FileType.WORD: "Word文档",
+    FileType.PPT: "PowerPoint",
+    FileType.EXCEL: "Excel表格",
+    FileType.PDF: "PDF文件",
+    FileType.IMAGE: "图片文件"
+}
+_FILE_TYPE_UNKNOWN = "未知"
+_FILE_TYPE_UNKNOWN_LONG = "未知类型"
+
+# 问题文件列表每批插入的行数
+_TREE_INSERT_CHUNK = 500
+
+
+def _center_on_parent(dialog, parent, dialog_width: int, dialog_height: int):
+    """
+    将对话框居中显示在父窗口上
+    
+    对话框尺寸已知，无需强制刷新布局来获取请求尺寸
+    
+    Args:
+        dialog: 对话框窗口
+        parent: 父窗口
+        dialog_width: 对话框宽度
+        dialog_height: 对话框高度
+    """
+    parent_x = parent.winfo_rootx()
+    parent_y = parent.winfo_rooty()
+    parent_width = parent.winfo_width()
+    parent_height = parent.winfo_height()
+    
+    x = parent_x + (parent_width - dialog_width) // 2
+    y = parent_y + (parent_height - dialog_height) // 2
+    
+    dialog.geometry(f"+{x}+{y}")
+
+
 class PageCountProgressDialog:
     """页数计算进度对话框"""
     
+    # 对话框尺寸
+    WIDTH = 400
+    HEIGHT = 180
+    
     def __init__(self, parent):
         """初始化进度对话框"""
         self.parent = parent
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("页数计算中，遇到密码保护文档必须手动关掉打开的文档")
-        self.dialog.geometry("400x180")
+        self.dialog.geometry(f"{self.WIDTH}x{self.HEIGHT}")
         self.dialog.resizable(False, False)
         self.dialog.transient(parent)
         self.dialog.grab_set()
         
         # 居中显示
-        self._center_dialog()
+        _center_on_parent(self.dialog, self.parent, self.WIDTH, self.HEIGHT)
         
         # 创建界面
         self._create_widgets()
         
         # 取消标志
         self.cancelled = False
-    
-    def _center_dialog(self):
-        """将对话框居中显示"""
-        self.dialog.update_idletasks()
         
-        parent_x = self.parent.winfo_rootx()
-        parent_y = self.parent.winfo_rooty()
-        parent_width = self.parent.winfo_width()
-        parent_height = self.parent.winfo_height()
-        
-        dialog_width = self.dialog.winfo_reqwidth()
-        dialog_height = self.dialog.winfo_reqheight()
-        
-        x = parent_x + (parent_width - dialog_width) // 2
-        y = parent_y + (parent_height - dialog_height) // 2
-        
-        self.dialog.geometry(f"+{x}+{y}")
+        # 进度刷新节流状态
+        self._last_update_ts = 0.0
+        self._last_pct = -1
     
     def _create_widgets(self):
         """创建界面组件"""
@@ -81,12 +109,24 @@ class PageCountProgressDialog:
     
     def update_progress(self, current: int, total: int, message: str):
         """更新进度"""
+        # 用户已取消时不再刷新界面
+        if self.cancelled:
+            return
+        
         if self.dialog.winfo_exists():
-            progress = (current / total) * 100 if total > 0 else 0
-            self.progress_bar['value'] = progress
+            # 节流：百分比未变化且距上次刷新不足200ms时跳过，最后一项始终刷新
+            pct = int(current * 100 / total) if total > 0 else 0
+            now = time.monotonic()
+            if current < total and pct == self._last_pct and (now - self._last_update_ts) < 0.2:
+                return
+            
+            self.progress_bar['value'] = pct
             self.progress_label.config(text=f"{current}/{total}")
             self.status_label.config(text=message)
-            self.dialog.update()
+            self.dialog.update_idletasks()
+            
+            self._last_pct = pct
+            self._last_update_ts = now
     
     def _on_cancel(self):
         """取消计算"""
@@ -102,6 +142,10 @@ class PageCountProgressDialog:
 class PageCountResultDialog:
     """页数统计结果对话框"""
     
+    # 对话框尺寸
+    WIDTH = 750
+    HEIGHT = 450
+    
     def __init__(self, parent, summary: PageCountSummary):
         """
         初始化结果对话框
@@ -113,39 +157,32 @@ class PageCountResultDialog:
         self.parent = parent
         self.summary = summary
         
+        # 有Excel文件参与统计时总页数为估算值，添加"约"字（概览和文本报告共用）
+        approx = "约" if summary.excel_files > 0 else ""
+        self._total_pages_text = f"{approx}{summary.total_pages:,}"
+        
+        # 各类型页数的千分位格式化文本（统计结果不再变化，只格式化一次）
+        self._page_counts_fmt = (
+            f"{summary.word_pages:,}",
+            f"{summary.ppt_pages:,}",
+            f"{summary.excel_pages:,}",
+            f"{summary.pdf_pages:,}",
+            f"{summary.image_pages:,}"
+        )
+        
         # 创建对话框窗口
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("页数统计结果")
-        self.dialog.geometry("750x450")
+        self.dialog.geometry(f"{self.WIDTH}x{self.HEIGHT}")
         self.dialog.resizable(True, True)
         self.dialog.transient(parent)
         self.dialog.grab_set()
         
         # 居中显示
-        self._center_dialog()
+        _center_on_parent(self.dialog, self.parent, self.WIDTH, self.HEIGHT)
         
-        # 创建界面
+        # 创建界面（不阻塞调用方，对话框关闭由用户操作决定）
         self._create_widgets()
-        
-        # 等待对话框关闭
-        self.dialog.wait_window()
-    
-    def _center_dialog(self):
-        """将对话框居中显示"""
-        self.dialog.update_idletasks()
-        
-        parent_x = self.parent.winfo_rootx()
-        parent_y = self.parent.winfo_rooty()
-        parent_width = self.parent.winfo_width()
-        parent_height = self.parent.winfo_height()
-        
-        dialog_width = self.dialog.winfo_reqwidth()
-        dialog_height = self.dialog.winfo_reqheight()
-        
-        x = parent_x + (parent_width - dialog_width) // 2
-        y = parent_y + (parent_height - dialog_height) // 2
-        
-        self.dialog.geometry(f"+{x}+{y}")
     
     def _create_widgets(self):
         """创建界面组件"""
@@ -159,8 +196,8 @@ class PageCountResultDialog:
         # 文件类型统计区域
         self._create_file_type_section(main_frame)
         
-        # 计算问题区域
-        self._create_problems_section(main_frame)
+        # 计算问题区域（空闲时再构建，对话框先显示出来）
+        self.dialog.after_idle(self._create_problems_section_if_open, main_frame)
         
         # 按钮区域（独立的框架，固定在底部）
         button_frame = ttk.Frame(main_frame)
@@ -170,54 +207,56 @@ class PageCountResultDialog:
         # 设置权重
         main_frame.grid_rowconfigure(1, weight=1)  # 问题区域可扩展
     
+    def _create_summary_text(self, parent) -> tk.Text:
+        """
+        创建单行只读统计文本控件
+        
+        用一个Text控件配合标签样式显示整行统计，代替逐项创建的Label网格
+        """
+        background = ttk.Style().lookup("TLabelframe", "background") or parent.winfo_toplevel().cget("background")
+        text = tk.Text(parent, height=1, wrap="none", font=("", 10),
+                       relief="flat", borderwidth=0, highlightthickness=0,
+                       background=background, cursor="arrow")
+        text.tag_configure("bold", font=("", 10, "bold"))
+        text.tag_configure("green", foreground="green")
+        text.tag_configure("orange", foreground="orange")
+        text.tag_configure("red", foreground="red")
+        return text
+    
+    def _fill_summary_text(self, text: tk.Text, items):
+        """
+        填充统计文本
+        
+        Args:
+            text: 统计文本控件
+            items: (标题, 内容, 标题颜色标签) 列表
+        """
+        for index, (title, value, color) in enumerate(items):
+            title_tags = ("bold", color) if color else ("bold",)
+            text.insert("end", f"{title} ", title_tags)
+            text.insert("end", value)
+            if index < len(items) - 1:
+                text.insert("end", "    ")
+        text.configure(state="disabled")
+        text.pack(fill="x")
+    
     def _create_overview_section(self, parent):
         """创建统计概览区域"""
         # 统计概览框架
         overview_frame = ttk.LabelFrame(parent, text="📊 统计概览", padding="10")
         overview_frame.pack(fill="x", pady=(0, 10))
         
-        # 总体统计（横向排列）
-        col = 0
-        
-        # 总文档数
-        ttk.Label(overview_frame, text="总文档数:", font=("", 10, "bold")).grid(
-            row=0, column=col, sticky="w", padx=(0, 5))
-        ttk.Label(overview_frame, text=f"{self.summary.total_files} 个", 
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w", padx=(0, 20))
-        col += 2
-        
-        # 总页数
-        ttk.Label(overview_frame, text="总页数:", font=("", 10, "bold")).grid(
-            row=0, column=col, sticky="w", padx=(0, 5))
-        
-        # 检查是否有Excel文件参与统计，如果有则添加"约"字
-        has_excel = self.summary.excel_files > 0
-        total_pages_text = f"约{self.summary.total_pages:,} 页" if has_excel else f"{self.summary.total_pages:,} 页"
-        
-        ttk.Label(overview_frame, text=total_pages_text, 
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w", padx=(0, 20))
-        col += 2
-        
-        # 成功数
-        ttk.Label(overview_frame, text="成功:", font=("", 10, "bold"), 
-                 foreground="green").grid(row=0, column=col, sticky="w", padx=(0, 5))
-        ttk.Label(overview_frame, text=f"{self.summary.success_count} 个", 
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w", padx=(0, 20))
-        col += 2
-        
-        # 跳过数（始终显示）
-        ttk.Label(overview_frame, text="跳过:", font=("", 10, "bold"), 
-                 foreground="orange").grid(row=0, column=col, sticky="w", padx=(0, 5))
-        ttk.Label(overview_frame, text=f"{self.summary.skipped_count} 个", 
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w", padx=(0, 20))
-        col += 2
-        
-        # 失败数（始终显示）
-        ttk.Label(overview_frame, text="失败:", font=("", 10, "bold"), 
-                 foreground="red").grid(row=0, column=col, sticky="w", padx=(0, 5))
-        ttk.Label(overview_frame, text=f"{self.summary.error_count} 个", 
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w")
+        s = self.summary
         
+        # 总体统计（横向排列）
+        text = self._create_summary_text(overview_frame)
+        self._fill_summary_text(text, [
+            ("总文档数:", f"{s.total_files} 个", None),
+            ("总页数:", f"{self._total_pages_text} 页", None),
+            ("成功:", f"{s.success_count} 个", "green"),
+            ("跳过:", f"{s.skipped_count} 个", "orange"),
+            ("失败:", f"{s.error_count} 个", "red"),
+        ])
     
     def _create_file_type_section(self, parent):
         """创建文件类型统计区域"""
@@ -225,51 +264,28 @@ class PageCountResultDialog:
         type_frame = ttk.LabelFrame(parent, text="📄 按文件类型统计", padding="10")
         type_frame.pack(fill="x", pady=(0, 10))
         
-        # 横向排列所有文件类型统计
-        col = 0
-        
-        # Word统计
-        ttk.Label(type_frame, text="Word:", font=("", 10, "bold")).grid(
-            row=0, column=col, sticky="w", padx=(0, 5))
-        ttk.Label(type_frame, 
-                 text=f"{self.summary.word_files}个 / {self.summary.word_pages:,}页",
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w", padx=(0, 20))
-        col += 2
-        
-        # PPT统计
-        ttk.Label(type_frame, text="PPT:", font=("", 10, "bold")).grid(
-            row=0, column=col, sticky="w", padx=(0, 5))
-        ttk.Label(type_frame, 
-                 text=f"{self.summary.ppt_files}个 / {self.summary.ppt_pages:,}页",
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w", padx=(0, 20))
-        col += 2
-        
-        # Excel统计
-        ttk.Label(type_frame, text="Excel:", font=("", 10, "bold")).grid(
-            row=0, column=col, sticky="w", padx=(0, 5))
+        s = self.summary
+        excel_files = s.excel_files
         
         # Excel页数显示时添加"约"字，提醒用户不确定性
-        excel_pages_text = f"{self.summary.excel_files}个 / 约{self.summary.excel_pages:,}页" if self.summary.excel_files > 0 else f"{self.summary.excel_files}个 / {self.summary.excel_pages:,}页"
-        
-        ttk.Label(type_frame, 
-                 text=excel_pages_text,
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w", padx=(0, 20))
-        col += 2
-        
-        # PDF统计
-        ttk.Label(type_frame, text="PDF:", font=("", 10, "bold")).grid(
-            row=0, column=col, sticky="w", padx=(0, 5))
-        ttk.Label(type_frame, 
-                 text=f"{self.summary.pdf_files}个 / {self.summary.pdf_pages:,}页",
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w", padx=(0, 20))
-        col += 2
-        
-        # 图片统计
-        ttk.Label(type_frame, text="图片:", font=("", 10, "bold")).grid(
-            row=0, column=col, sticky="w", padx=(0, 5))
-        ttk.Label(type_frame, 
-                 text=f"{self.summary.image_files}个 / {self.summary.image_pages:,}页",
-                 font=("", 10)).grid(row=0, column=col+1, sticky="w")
+        excel_approx = "约" if excel_files > 0 else ""
+        
+        word_pages_fmt, ppt_pages_fmt, excel_pages_fmt, pdf_pages_fmt, image_pages_fmt = self._page_counts_fmt
+        
+        # 横向排列所有文件类型统计
+        text = self._create_summary_text(type_frame)
+        self._fill_summary_text(text, [
+            ("Word:", f"{s.word_files}个 / {word_pages_fmt}页", None),
+            ("PPT:", f"{s.ppt_files}个 / {ppt_pages_fmt}页", None),
+            ("Excel:", f"{excel_files}个 / {excel_approx}{excel_pages_fmt}页", None),
+            ("PDF:", f"{s.pdf_files}个 / {pdf_pages_fmt}页", None),
+            ("图片:", f"{s.image_files}个 / {image_pages_fmt}页", None),
+        ])
+    
+    def _create_problems_section_if_open(self, parent):
+        """对话框仍然存在时创建计算问题区域"""
+        if self.dialog.winfo_exists():
+            self._create_problems_section(parent)
     
     def _create_problems_section(self, parent):
         """创建计算问题区域"""
@@ -279,7 +295,7 @@ class PageCountResultDialog:
         problems_frame.pack(fill="both", expand=True, pady=(0, 10))
         
         # 问题文件列表
-        problem_files = self.summary.skipped_files + self.summary.error_files
+        problem_count = len(self.summary.skipped_files) + len(self.summary.error_files)
         
         # 创建树形视图容器
         tree_frame = ttk.Frame(problems_frame)
@@ -298,29 +314,8 @@ class PageCountResultDialog:
         tree.column("文件类型", width=100)
         tree.column("文件路径", width=350)
         
-        if problem_files:
-            # 添加问题文件
-            for result in problem_files:
-                file_type_display = {
-                    FileType.WORD: "Word文档",
-                    FileType.PPT: "PowerPoint",
-                    FileType.EXCEL: "Excel表格",
-                    FileType.PDF: "PDF文件",
-                    FileType.IMAGE: "图片文件"
-                }.get(result.document.file_type, "未知类型")
-                
-                tree.insert("", "end", values=(
-                    result.document.file_name,
-                    file_type_display,
-                    str(result.document.file_path)
-                ))
-        else:
-            # 没有问题文件时显示提示
-            tree.insert("", "end", values=(
-                "✅ 所有文件均成功计算页数",
-                "—",
-                "—"
-            ))
+        # 在树形视图交给布局管理器之前插入全部行，只触发一次布局计算
+        self._fill_problems_tree(tree, problem_count)
         
         # 滚动条
         v_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
@@ -336,9 +331,9 @@ class PageCountResultDialog:
         tree_frame.grid_columnconfigure(0, weight=1)
         
         # 提示信息
-        if problem_files:
+        if problem_count:
             tip_label = ttk.Label(problems_frame, 
-                                 text=f"共 {len(problem_files)} 个文件存在问题，可导出详细报告查看完整信息",
+                                 text=f"共 {problem_count} 个文件存在问题，可导出详细报告查看完整信息",
                                  font=("", 9), foreground="gray")
             tip_label.pack(anchor="w", pady=(5, 0))
         else:
@@ -347,6 +342,43 @@ class PageCountResultDialog:
                                  font=("", 9), foreground="green")
             tip_label.pack(anchor="w", pady=(5, 0))
     
+    def _fill_problems_tree(self, tree: ttk.Treeview, problem_count: int):
+        """
+        填充问题文件列表（调用时树形视图尚未布局）
+        
+        首批行同步插入，其余按批次在空闲时插入，大量问题文件时对话框可立即显示
+        """
+        if problem_count:
+            insert = tree.insert
+            display_get = _FILE_TYPE_DISPLAY.get
+            problem_files = chain(self.summary.skipped_files, self.summary.error_files)
+            
+            def insert_chunk(start: int):
+                if not tree.winfo_exists():
+                    return
+                
+                # 添加问题文件
+                for result in islice(problem_files, _TREE_INSERT_CHUNK):
+                    document = result.document
+                    insert("", "end", values=(
+                        document.file_name,
+                        display_get(document.file_type, _FILE_TYPE_UNKNOWN_LONG),
+                        str(document.file_path)
+                    ))
+                
+                next_start = start + _TREE_INSERT_CHUNK
+                if next_start < problem_count:
+                    self.dialog.after_idle(insert_chunk, next_start)
+            
+            insert_chunk(0)
+        else:
+            # 没有问题文件时显示提示
+            tree.insert("", "end", values=(
+                "✅ 所有文件均成功计算页数",
+                "—",
+                "—"
+            ))
+    
     def _get_problem_description(self, result: PageCountResult) -> str:
         """获取问题描述（简化版）"""
         error_msg = result.error_message.lower()
@@ -384,22 +416,22 @@ class PageCountResultDialog:
     
     def _export_all_report(self):
         """导出完整报告"""
-        try:
-            file_path = filedialog.asksaveasfilename(
-                title="保存完整统计报告",
-                defaultextension=".csv",
-                filetypes=[
-                    ("CSV文件", "*.csv"),
-                    ("Excel文件", "*.xlsx"),
-                    ("文本文件", "*.txt")
-                ]
-            )
-            
-            if not file_path:
-                return
-            
-            file_path = Path(file_path)
-            
+        file_path = filedialog.asksaveasfilename(
+            title="保存完整统计报告",
+            defaultextension=".csv",
+            filetypes=[
+                ("CSV文件", "*.csv"),
+                ("Excel文件", "*.xlsx"),
+                ("文本文件", "*.txt")
+            ]
+        )
+        
+        if not file_path:
+            return
+        
+        file_path = Path(file_path)
+        
+        def do_export():
             if file_path.suffix.lower() == '.csv':
                 self._export_to_csv(file_path, include_all=True)
             elif file_path.suffix.lower() == '.xlsx':
@@ -409,39 +441,26 @@ class PageCountResultDialog:
             
             # 去掉导出成功提示窗口
             print(f"报告已导出到: {file_path}")
-            
-        except PermissionError:
-            messagebox.showerror("导出失败", "文件正在被其他程序使用，请关闭相关文件后重试")
-        except FileNotFoundError:
-            messagebox.showerror("导出失败", "指定的文件路径不存在，请选择有效的保存位置")
-        except Exception as e:
-            error_msg = str(e)
-            if "openpyxl" in error_msg.lower():
-                messagebox.showerror("导出失败", "缺少Excel支持库，Excel导出功能不可用，请选择CSV或文本格式")
-            elif "permission" in error_msg.lower() or "access" in error_msg.lower():
-                messagebox.showerror("导出失败", "没有写入权限，请选择其他保存位置或以管理员身份运行")
-            elif "disk" in error_msg.lower() or "space" in error_msg.lower():
-                messagebox.showerror("导出失败", "磁盘空间不足，请清理磁盘空间后重试")
-            else:
-                messagebox.showerror("导出失败", f"导出过程中出现错误，请检查文件路径和权限\n\n技术详情：{error_msg}")
+        
+        self._run_export_in_background(do_export)
     
     def _export_error_report(self):
         """导出错误报告"""
-        try:
-            file_path = filedialog.asksaveasfilename(
-                title="保存错误报告",
-                defaultextension=".csv",
-                filetypes=[
-                    ("CSV文件", "*.csv"),
-                    ("文本文件", "*.txt")
-                ]
-            )
-            
-            if not file_path:
-                return
-            
-            file_path = Path(file_path)
-            
+        file_path = filedialog.asksaveasfilename(
+            title="保存错误报告",
+            defaultextension=".csv",
+            filetypes=[
+                ("CSV文件", "*.csv"),
+                ("文本文件", "*.txt")
+            ]
+        )
+        
+        if not file_path:
+            return
+        
+        file_path = Path(file_path)
+        
+        def do_export():
             if file_path.suffix.lower() == '.csv':
                 self._export_to_csv(file_path, include_all=False)
             else:
@@ -449,166 +468,212 @@ class PageCountResultDialog:
             
             # 去掉导出成功提示窗口
             print(f"错误报告已导出到: {file_path}")
+        
+        self._run_export_in_background(do_export)
+    
+    def _get_export_buttons(self) -> list:
+        """获取导出相关按钮"""
+        buttons = [self.btn_export_all]
+        if hasattr(self, 'btn_export_errors'):
+            buttons.append(self.btn_export_errors)
+        return buttons
+    
+    def _run_export_in_background(self, export_func):
+        """
+        在后台线程中执行导出，避免大文件导出时界面卡顿
+        
+        Args:
+            export_func: 执行实际写入的函数，完成后的提示和按钮恢复在界面线程中进行
+        """
+        for button in self._get_export_buttons():
+            button.state(['disabled'])
+        
+        def worker():
+            error = None
+            try:
+                export_func()
+            except Exception as e:
+                error = e
             
-        except PermissionError:
+            try:
+                self.dialog.after(0, lambda: self._on_export_finished(error))
+            except (tk.TclError, RuntimeError):
+                # 对话框已关闭
+                pass
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def _on_export_finished(self, error):
+        """导出完成回调（界面线程）"""
+        if not self.dialog.winfo_exists():
+            return
+        
+        for button in self._get_export_buttons():
+            button.state(['!disabled'])
+        
+        if error is not None:
+            self._show_export_error(error)
+    
+    def _show_export_error(self, error: Exception):
+        """显示导出错误信息"""
+        if isinstance(error, PermissionError):
             messagebox.showerror("导出失败", "文件正在被其他程序使用，请关闭相关文件后重试")
-        except FileNotFoundError:
+        elif isinstance(error, FileNotFoundError):
             messagebox.showerror("导出失败", "指定的文件路径不存在，请选择有效的保存位置")
-        except Exception as e:
-            error_msg = str(e)
-            if "permission" in error_msg.lower() or "access" in error_msg.lower():
+        else:
+            error_msg = str(error)
+            if "openpyxl" in error_msg.lower():
+                messagebox.showerror("导出失败", "缺少Excel支持库，Excel导出功能不可用，请选择CSV或文本格式")
+            elif "permission" in error_msg.lower() or "access" in error_msg.lower():
                 messagebox.showerror("导出失败", "没有写入权限，请选择其他保存位置或以管理员身份运行")
             elif "disk" in error_msg.lower() or "space" in error_msg.lower():
                 messagebox.showerror("导出失败", "磁盘空间不足，请清理磁盘空间后重试")
             else:
                 messagebox.showerror("导出失败", f"导出过程中出现错误，请检查文件路径和权限\n\n技术详情：{error_msg}")
     
+    def _iter_csv_rows(self, results, include_all: bool):
+        """生成CSV数据行"""
+        display_get = _FILE_TYPE_DISPLAY.get
+        if include_all:
+            for result in results:
+                document = result.document
+                status_display = "成功" if result.page_count is not None else self._get_problem_description(result)
+                
+                # 如果是Excel文件且有页数，在页数前添加"约"字
+                page_count_display = result.page_count or "N/A"
+                if result.page_count is not None and document.file_type == FileType.EXCEL:
+                    page_count_display = f"约{result.page_count}"
+                
+                yield (
+                    document.file_name,
+                    display_get(document.file_type, _FILE_TYPE_UNKNOWN),
+                    page_count_display,
+                    status_display,
+                    str(document.file_path),
+                    result.error_message
+                )
+        else:
+            for result in results:
+                document = result.document
+                yield (
+                    document.file_name,
+                    display_get(document.file_type, _FILE_TYPE_UNKNOWN_LONG),
+                    str(document.file_path)
+                )
+    
     def _export_to_csv(self, file_path: Path, include_all: bool = True):
         """导出到CSV文件"""
-        with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            writer = csv.writer(csvfile)
+        import csv
+        
+        with open(file_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
+            # 写入一次BOM，保证Excel直接打开时中文不乱码
+            csvfile.write('\ufeff')
+            writer = csv.writer(csvfile, dialect='unix')
             
             # 写入标题
             if include_all:
                 writer.writerow(['文件名', '文件类型', '页数', '状态', '文件路径', '错误信息'])
-                
-                # 写入所有文件数据
-                all_results = []
-                
-                # 收集所有结果
-                for result in self.summary.skipped_files + self.summary.error_files:
-                    all_results.append(result)
-                
-                # 添加成功的文件（需要从原始数据重构，这里简化处理）
-                # 由于我们没有保存成功的详细结果，这里只显示问题文件
-                for result in all_results:
-                    file_type_display = {
-                        FileType.WORD: "Word文档",
-                        FileType.PPT: "PowerPoint",
-                        FileType.EXCEL: "Excel表格",
-                        FileType.PDF: "PDF文件",
-                        FileType.IMAGE: "图片文件"
-                    }.get(result.document.file_type, "未知")
-                    
-                    status_display = "成功" if result.page_count is not None else self._get_problem_description(result)
-                    
-                    # 如果是Excel文件且有页数，在页数前添加"约"字
-                    page_count_display = result.page_count or "N/A"
-                    if result.page_count is not None and result.document.file_type == FileType.EXCEL:
-                        page_count_display = f"约{result.page_count}"
-                    
-                    writer.writerow([
-                        result.document.file_name,
-                        file_type_display,
-                        page_count_display,
-                        status_display,
-                        str(result.document.file_path),
-                        result.error_message
-                    ])
             else:
-                # 只导出错误文件
                 writer.writerow(['文件名', '文件类型', '文件路径'])
-                
-                for result in self.summary.skipped_files + self.summary.error_files:
-                    file_type_display = {
-                        FileType.WORD: "Word文档",
-                        FileType.PPT: "PowerPoint",
-                        FileType.EXCEL: "Excel表格",
-                        FileType.PDF: "PDF文件",
-                        FileType.IMAGE: "图片文件"
-                    }.get(result.document.file_type, "未知类型")
-                    
-                    writer.writerow([
-                        result.document.file_name,
-                        file_type_display,
-                        str(result.document.file_path)
-                    ])
+            
+            # 目前只保存了问题文件的详细结果，成功文件不在导出范围内
+            problem_files = chain(self.summary.skipped_files, self.summary.error_files)
+            writer.writerows(self._iter_csv_rows(problem_files, include_all))
     
     def _export_to_text(self, file_path: Path, include_all: bool = True):
         """导出到文本文件"""
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write("页数统计报告\n")
-            f.write("=" * 50 + "\n")
-            f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            # 统计概览
-            f.write("统计概览:\n")
-            f.write(f"  总文档数: {self.summary.total_files} 个\n")
-            
-            # 如果有Excel文件参与统计，在总页数前添加"约"字
-            total_pages_text = f"约{self.summary.total_pages:,}" if self.summary.excel_files > 0 else f"{self.summary.total_pages:,}"
-            f.write(f"  总页数: {total_pages_text} 页\n")
-            
-            f.write(f"  成功计算: {self.summary.success_count} 个\n")
-            f.write(f"  跳过文件: {self.summary.skipped_count} 个\n")
-            f.write(f"  计算失败: {self.summary.error_count} 个\n\n")
-            
-            # 按类型统计
-            if self.summary.word_files > 0 or self.summary.ppt_files > 0 or \
-               self.summary.excel_files > 0 or self.summary.pdf_files > 0 or \
-               self.summary.image_files > 0:
-                f.write("按文件类型统计:\n")
-                if self.summary.word_files > 0:
-                    f.write(f"  Word文档: {self.summary.word_files}个文件, {self.summary.word_pages:,}页\n")
-                if self.summary.ppt_files > 0:
-                    f.write(f"  PowerPoint: {self.summary.ppt_files}个文件, {self.summary.ppt_pages:,}页\n")
-                if self.summary.excel_files > 0:
-                    f.write(f"  Excel表格: {self.summary.excel_files}个文件, 约{self.summary.excel_pages:,}页 (估算)\n")
-                if self.summary.pdf_files > 0:
-                    f.write(f"  PDF文件: {self.summary.pdf_files}个文件, {self.summary.pdf_pages:,}页\n")
-                if self.summary.image_files > 0:
-                    f.write(f"  图片文件: {self.summary.image_files}个文件, {self.summary.image_pages:,}页\n")
-                f.write("\n")
+        from datetime import datetime
+        
+        # 先在内存中拼接完整报告，再一次性写入文件
+        parts = []
+        add = parts.append
+        
+        add("页数统计报告\n")
+        add("=" * 50 + "\n")
+        add(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        
+        s = self.summary
+        word_files = s.word_files
+        ppt_files = s.ppt_files
+        excel_files = s.excel_files
+        pdf_files = s.pdf_files
+        image_files = s.image_files
+        word_pages_fmt, ppt_pages_fmt, excel_pages_fmt, pdf_pages_fmt, image_pages_fmt = self._page_counts_fmt
+        
+        # 统计概览
+        add("统计概览:\n")
+        add(f"  总文档数: {s.total_files} 个\n")
+        add(f"  总页数: {self._total_pages_text} 页\n")
+        add(f"  成功计算: {s.success_count} 个\n")
+        add(f"  跳过文件: {s.skipped_count} 个\n")
+        add(f"  计算失败: {s.error_count} 个\n\n")
+        
+        # 按类型统计
+        if word_files > 0 or ppt_files > 0 or excel_files > 0 or pdf_files > 0 or image_files > 0:
+            add("按文件类型统计:\n")
+            if word_files > 0:
+                add(f"  Word文档: {word_files}个文件, {word_pages_fmt}页\n")
+            if ppt_files > 0:
+                add(f"  PowerPoint: {ppt_files}个文件, {ppt_pages_fmt}页\n")
+            if excel_files > 0:
+                add(f"  Excel表格: {excel_files}个文件, 约{excel_pages_fmt}页 (估算)\n")
+            if pdf_files > 0:
+                add(f"  PDF文件: {pdf_files}个文件, {pdf_pages_fmt}页\n")
+            if image_files > 0:
+                add(f"  图片文件: {image_files}个文件, {image_pages_fmt}页\n")
+            add("\n")
+        
+        # 问题文件列表
+        if not include_all:
+            add("问题文件详情:\n")
+            add("-" * 30 + "\n")
             
-            # 问题文件列表
-            if not include_all:
-                f.write("问题文件详情:\n")
-                f.write("-" * 30 + "\n")
-                
-                for result in self.summary.skipped_files + self.summary.error_files:
-                    f.write(f"文件名: {result.document.file_name}\n")
-                    f.write(f"类型: {result.document.file_type.value}\n")
-                    f.write(f"路径: {result.document.file_path}\n")
-                    f.write("-" * 30 + "\n")
+            for result in chain(s.skipped_files, s.error_files):
+                document = result.document
+                add(f"文件名: {document.file_name}\n")
+                add(f"类型: {document.file_type.value}\n")
+                add(f"路径: {document.file_path}\n")
+                add("-" * 30 + "\n")
+        
+        with open(file_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write(''.join(parts))
     
     def _export_to_excel(self, file_path: Path, include_all: bool = True):
         """导出到Excel文件（需要openpyxl库）"""
         try:
             import openpyxl  # type: ignore
+            from openpyxl.cell import WriteOnlyCell  # type: ignore
             from openpyxl.styles import Font, PatternFill  # type: ignore
             
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            if ws is not None:  # 类型安全检查
-                ws.title = "页数统计报告"  # type: ignore
-                
-                # 设置标题
-                headers = ['文件名', '文件类型', '文件路径']
-                for col, header in enumerate(headers, 1):
-                    cell = ws.cell(row=1, column=col, value=header)  # type: ignore
-                    cell.font = Font(bold=True)  # type: ignore
-                    cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")  # type: ignore
-                
-                # 写入数据（简化版本，只写入问题文件）
-                row = 2
-                for result in self.summary.skipped_files + self.summary.error_files:
-                    file_type_display = {
-                        FileType.WORD: "Word文档",
-                        FileType.PPT: "PowerPoint",
-                        FileType.EXCEL: "Excel表格",
-                        FileType.PDF: "PDF文件",
-                        FileType.IMAGE: "图片文件"
-                    }.get(result.document.file_type, "未知")
-                    
-                    ws.cell(row=row, column=1, value=result.document.file_name)  # type: ignore
-                    ws.cell(row=row, column=2, value=file_type_display)  # type: ignore
-                    ws.cell(row=row, column=3, value=str(result.document.file_path))  # type: ignore
-                    row += 1
-                
-                # 调整列宽
-                ws.column_dimensions['A'].width = 30  # type: ignore
-                ws.column_dimensions['B'].width = 15  # type: ignore
-                ws.column_dimensions['C'].width = 50  # type: ignore
+            # 只写模式按行流式写出，不在内存中保留单元格对象
+            wb = openpyxl.Workbook(write_only=True)
+            ws = wb.create_sheet("页数统计报告")
+            
+            # 调整列宽（只写模式下需在写入数据前设置）
+            ws.column_dimensions['A'].width = 30  # type: ignore
+            ws.column_dimensions['B'].width = 15  # type: ignore
+            ws.column_dimensions['C'].width = 50  # type: ignore
+            
+            # 设置标题
+            header_font = Font(bold=True)
+            header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+            header_cells = []
+            for header in ['文件名', '文件类型', '文件路径']:
+                cell = WriteOnlyCell(ws, value=header)
+                cell.font = header_font
+                cell.fill = header_fill
+                header_cells.append(cell)
+            ws.append(header_cells)
+            
+            # 写入数据（简化版本，只写入问题文件）
+            display_get = _FILE_TYPE_DISPLAY.get
+            for result in chain(self.summary.skipped_files, self.summary.error_files):
+                document = result.document
+                ws.append([
+                    document.file_name,
+                    display_get(document.file_type, _FILE_TYPE_UNKNOWN),
+                    str(document.file_path)
+                ])
             
             wb.save(file_path)
             
@@ -644,6 +709,7 @@ def show_page_count_dialog(parent, documents: List[Document]):
     
     summary = None
     error_message = None
+    done = threading.Event()
     
     def calculate_in_background():
         """在后台线程中计算页数"""
@@ -653,7 +719,8 @@ def show_page_count_dialog(parent, documents: List[Document]):
         except Exception as e:
             error_message = str(e)
         finally:
-            # 关闭进度对话框
+            # 先标记完成再关闭进度对话框，保证窗口关闭时结果已就绪
+            done.set()
             if not progress_dialog.cancelled:
                 progress_dialog.close()
     
@@ -666,11 +733,10 @@ def show_page_count_dialog(parent, documents: List[Document]):
     
     if progress_dialog.cancelled:
         page_manager.cancel_calculation()
+        # 给后台线程留出退出时间
+        done.wait(timeout=2.0)
         return
     
-    # 等待线程完成
-    thread.join(timeout=1.0)
-    
     if error_message:
         messagebox.showerror("错误", f"页数计算失败: {error_message}")
         return
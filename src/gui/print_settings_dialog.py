@@ -2,17 +2,22 @@
 打印设置对话框
 提供打印机选择和参数配置界面
 """
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 from typing import Optional
 
 from src.core.settings_manager import PrinterSettingsManager
-from src.core.models import PrintSettings, ColorMode, Orientation
+from src.core.models import PrintSettings, COLOR_MODE_BY_VALUE, ORIENTATION_BY_VALUE
 
 
 class PrintSettingsDialog:
     """打印设置对话框类"""
     
+    # 对话框固定尺寸
+    WIDTH = 550
+    HEIGHT = 450
+    
     def __init__(self, parent, printer_manager: PrinterSettingsManager, current_settings: PrintSettings):
         """
         初始化打印设置对话框
@@ -26,29 +31,65 @@ class PrintSettingsDialog:
         self.printer_manager = printer_manager
         self.current_settings = current_settings
         self.result: Optional[PrintSettings] = None
+        self._populated = False
         
-        # 创建对话框窗口
+        # 创建对话框窗口（关闭时隐藏而不销毁，再次打开时直接复用）
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("打印设置")
-        self.dialog.geometry("550x450")
+        self.dialog.geometry(f"{self.WIDTH}x{self.HEIGHT}")
         self.dialog.resizable(False, False)
         self.dialog.transient(parent)
-        self.dialog.grab_set()
+        self.dialog.protocol("WM_DELETE_WINDOW", self._on_cancel)
+        self._closed_var = tk.BooleanVar(value=False)
+        
+        # 先创建对话框外壳，其余组件和打印机枚举在首次绘制后进行
+        self._create_shell()
+        self.dialog.after(0, self._populate_async)
+        
+        self.show(current_settings)
+    
+    def show(self, current_settings: PrintSettings) -> Optional[PrintSettings]:
+        """
+        显示对话框并等待用户关闭
+        
+        Args:
+            current_settings: 当前打印设置
+            
+        Returns:
+            用户确认的打印设置，取消时为None（同时保存在 result 属性中）
+        """
+        self.current_settings = current_settings
+        self.result = None
+        self._closed_var.set(False)
+        
+        # 再次打开时组件已存在，只需重新加载设置
+        if self._populated:
+            self._load_current_settings()
         
         # 居中显示
         self._center_dialog()
-        
-        # 创建界面
-        self._create_widgets()
-        self._load_current_settings()
+        self.dialog.deiconify()
+        self.dialog.grab_set()
         
         # 等待对话框关闭
-        self.dialog.wait_window()
+        self.dialog.wait_variable(self._closed_var)
+        return self.result
+    
+    def _close(self):
+        """隐藏对话框，保留组件供下次打开时复用"""
+        self.dialog.grab_release()
+        self.dialog.withdraw()
+        self._closed_var.set(True)
+    
+    def is_alive(self) -> bool:
+        """对话框窗口是否仍然存在（可复用）"""
+        try:
+            return bool(self.dialog.winfo_exists())
+        except tk.TclError:
+            return False
     
     def _center_dialog(self):
-        """将对话框居中显示"""
-        self.dialog.update_idletasks()
-        
+        """将对话框居中显示（尺寸固定，无需强制刷新布局来获取请求尺寸）"""
         # 获取父窗口位置和大小
         parent_x = self.parent.winfo_rootx()
         parent_y = self.parent.winfo_rooty()
@@ -56,16 +97,13 @@ class PrintSettingsDialog:
         parent_height = self.parent.winfo_height()
         
         # 计算对话框位置
-        dialog_width = self.dialog.winfo_reqwidth()
-        dialog_height = self.dialog.winfo_reqheight()
-        
-        x = parent_x + (parent_width - dialog_width) // 2
-        y = parent_y + (parent_height - dialog_height) // 2
+        x = parent_x + (parent_width - self.WIDTH) // 2
+        y = parent_y + (parent_height - self.HEIGHT) // 2
         
         self.dialog.geometry(f"+{x}+{y}")
     
-    def _create_widgets(self):
-        """创建界面组件"""
+    def _create_shell(self):
+        """创建对话框外壳（打印机选择、空的分区框架和按钮）"""
         # 主框架
         main_frame = ttk.Frame(self.dialog, padding="10")
         main_frame.pack(fill="both", expand=True)
@@ -73,15 +111,29 @@ class PrintSettingsDialog:
         # 打印机选择区域
         self._create_printer_section(main_frame)
         
-        # 纸张设置区域
-        self._create_paper_section(main_frame)
+        # 纸张设置和打印选项区域先占位，内容在 _populate_async 中创建
+        self.paper_frame = ttk.LabelFrame(main_frame, text="纸张设置", padding="10")
+        self.paper_frame.pack(fill="x", pady=(0, 10))
         
-        # 打印选项区域
-        self._create_options_section(main_frame)
+        self.options_frame = ttk.LabelFrame(main_frame, text="打印选项", padding="10")
+        self.options_frame.pack(fill="x", pady=(0, 10))
         
         # 按钮区域
         self._create_button_section(main_frame)
     
+    def _populate_async(self):
+        """对话框绘制后填充纸张、选项区域并加载当前设置"""
+        try:
+            if not self.dialog.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        
+        self._create_paper_section(self.paper_frame)
+        self._create_options_section(self.options_frame)
+        self._populated = True
+        self._load_current_settings()
+    
     def _create_printer_section(self, parent):
         """创建打印机选择区域"""
         # 打印机框架
@@ -104,7 +156,7 @@ class PrintSettingsDialog:
         self.btn_refresh = ttk.Button(
             printer_frame, 
             text="刷新",
-            command=self._refresh_printers
+            command=lambda: self._refresh_printers(force=True)
         )
         self.btn_refresh.grid(row=0, column=2)
         
@@ -125,11 +177,8 @@ class PrintSettingsDialog:
         # 绑定打印机选择变化事件
         self.printer_combo.bind('<<ComboboxSelected>>', self._on_printer_changed)
     
-    def _create_paper_section(self, parent):
-        """创建纸张设置区域"""
-        paper_frame = ttk.LabelFrame(parent, text="纸张设置", padding="10")
-        paper_frame.pack(fill="x", pady=(0, 10))
-        
+    def _create_paper_section(self, paper_frame):
+        """填充纸张设置区域"""
         # 纸张尺寸行
         paper_row_frame = ttk.Frame(paper_frame)
         paper_row_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
@@ -180,11 +229,8 @@ class PrintSettingsDialog:
         paper_frame.grid_columnconfigure(1, weight=1)
         paper_row_frame.grid_columnconfigure(1, weight=1)
     
-    def _create_options_section(self, parent):
-        """创建打印选项区域"""
-        options_frame = ttk.LabelFrame(parent, text="打印选项", padding="10")
-        options_frame.pack(fill="x", pady=(0, 10))
-        
+    def _create_options_section(self, options_frame):
+        """填充打印选项区域"""
         # 打印数量
         ttk.Label(options_frame, text="打印数量:").grid(row=0, column=0, sticky="w", padx=(0, 10))
         
@@ -194,7 +240,9 @@ class PrintSettingsDialog:
             from_=1,
             to=999,
             textvariable=self.copies_var,
-            width=10
+            width=10,
+            validate="key",
+            validatecommand=(self.dialog.register(self._validate_copies_key), '%P')
         )
         self.copies_spin.grid(row=0, column=1, sticky="w")
         
@@ -270,28 +318,91 @@ class PrintSettingsDialog:
         )
         self.btn_ok.pack(side="left")
     
-    def _refresh_printers(self):
-        """刷新打印机列表"""
-        try:
-            self.printer_manager.refresh_printer_list()
-            printers = self.printer_manager.available_printers
-            
-            self.printer_combo['values'] = printers
+    def _refresh_printers(self, force: bool = False):
+        """
+        刷新打印机列表
+        
+        Args:
+            force: 是否忽略缓存强制重新枚举打印机
+        """
+        self.lbl_printer_info.config(text="正在获取打印机列表...")
+        
+        def task():
+            self.printer_manager.refresh_printer_list(force=force)
+            return self.printer_manager.available_printers, self.printer_manager.default_printer
+        
+        self._run_in_background(task, self._apply_printer_list, self.btn_refresh)
+    
+    def _run_in_background(self, task, on_done, button, busy_text: Optional[str] = None):
+        """
+        在后台线程执行耗时的Win32调用，完成后回到Tk主线程处理结果
+        
+        Args:
+            task: 后台执行的函数，返回值传给 on_done
+            on_done: 主线程回调，参数为 (结果, 异常)，成功时异常为None
+            button: 执行期间禁用的按钮
+            busy_text: 执行期间按钮上显示的文字（None表示不修改）
+        """
+        original_text = button.cget("text")
+        button.config(state="disabled")
+        if busy_text:
+            button.config(text=busy_text)
+        
+        def finish(result, error):
+            try:
+                if not self.dialog.winfo_exists():
+                    return
+            except tk.TclError:
+                return
             
-            if printers:
-                # 如果有默认打印机，选择它
-                default_printer = self.printer_manager.default_printer
-                if default_printer and default_printer in printers:
-                    self.printer_var.set(default_printer)
-                elif not self.printer_var.get():
-                    self.printer_var.set(printers[0])
-                
-                self._update_printer_info()
+            button.config(state="normal", text=original_text)
+            on_done(result, error)
+        
+        def worker():
+            try:
+                result, error = task(), None
+            except Exception as e:
+                result, error = None, e
+            try:
+                self.dialog.after(0, finish, result, error)
+            except (tk.TclError, RuntimeError):
+                # 对话框已关闭
+                pass
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def _apply_printer_list(self, result, error):
+        """
+        在主线程中应用打印机枚举结果
+        
+        Args:
+            result: (可用打印机列表, 默认打印机)
+            error: 枚举过程中的异常（无异常时为None）
+        """
+        if error is not None:
+            self.lbl_printer_info.config(text="")
+            messagebox.showerror("错误", f"刷新打印机列表失败: {error}")
+            return
+        
+        printers, default_printer = result
+        self.printer_combo['values'] = printers
+        
+        if printers:
+            # 优先保留当前选择，其次使用默认打印机
+            current_printer = self.printer_var.get()
+            if current_printer in printers:
+                pass
+            elif default_printer and default_printer in printers:
+                if current_printer:
+                    print(f"原打印机不可用，已切换到默认打印机: {default_printer}")
+                self.printer_var.set(default_printer)
             else:
-                self.lbl_printer_info.config(text="未找到可用的打印机")
-                
-        except Exception as e:
-            messagebox.showerror("错误", f"刷新打印机列表失败: {e}")
+                self.printer_var.set(printers[0])
+            
+            self._update_printer_info()
+        else:
+            self.printer_var.set('')
+            self.lbl_printer_info.config(text="未找到可用的打印机")
     
     def _test_printer(self):
         """测试打印机连接"""
@@ -300,14 +411,23 @@ class PrintSettingsDialog:
             messagebox.showwarning("提示", "请先选择打印机")
             return
         
-        try:
-            if self.printer_manager.test_printer_connection(printer_name):
+        def on_done(connected, error):
+            if error is not None:
+                self.printer_manager.invalidate_printer_cache()
+                messagebox.showerror("错误", f"测试打印机连接失败: {error}")
+            elif connected:
                 # 去掉连接成功提示窗口
                 print(f"打印机 '{printer_name}' 连接正常")
             else:
+                # 打印机状态可能已变化，下次刷新时重新枚举
+                self.printer_manager.invalidate_printer_cache()
                 messagebox.showerror("错误", f"无法连接到打印机 '{printer_name}'")
-        except Exception as e:
-            messagebox.showerror("错误", f"测试打印机连接失败: {e}")
+        
+        # 离线的网络打印机可能要等待超时，放到后台线程避免界面卡住
+        self._run_in_background(
+            lambda: self.printer_manager.test_printer_connection(printer_name),
+            on_done, self.btn_test, "测试中..."
+        )
     
     def _update_printer_info(self):
         """更新打印机信息显示"""
@@ -329,30 +449,18 @@ class PrintSettingsDialog:
     
     def _load_current_settings(self):
         """加载当前设置到界面"""
-        # 首先自动刷新打印机列表，确保数据是最新的
+        # 设置打印机，枚举完成后若该打印机不存在则切换到默认打印机
+        self.printer_var.set(self.current_settings.printer_name or '')
+        
+        # 自动刷新打印机列表（后台进行），确保数据是最新的
         print("自动刷新打印机列表...")
         self._refresh_printers()
         
-        # 设置打印机
-        if self.current_settings.printer_name:
-            # 检查打印机是否还存在
-            available_printers = self.printer_manager.available_printers
-            if self.current_settings.printer_name in available_printers:
-                self.printer_var.set(self.current_settings.printer_name)
-            else:
-                # 如果原打印机不存在，使用默认打印机
-                default_printer = self.printer_manager.default_printer
-                if default_printer:
-                    self.printer_var.set(default_printer)
-                    print(f"原打印机不可用，已切换到默认打印机: {default_printer}")
-            
-            self._update_printer_info()
-        
         # 设置默认纸张列表（标准纸张，不自动同步系统纸张）
         self._load_default_paper_sizes()
         
         # 设置纸张尺寸（优先使用A4）
-        if self.current_settings.paper_size and self.current_settings.paper_size in list(self.paper_combo['values']):
+        if self.current_settings.paper_size in self.printer_manager.STANDARD_PAPER_SET:
             self.paper_var.set(self.current_settings.paper_size)
         else:
             # 默认使用A4
@@ -375,7 +483,7 @@ class PrintSettingsDialog:
     def _load_default_paper_sizes(self):
         """加载默认纸张尺寸列表"""
         # 使用标准纸张尺寸列表
-        standard_papers = list(self.printer_manager.STANDARD_PAPER_SIZES.keys())
+        standard_papers = self.printer_manager.STANDARD_PAPER_NAMES
         self.paper_combo['values'] = standard_papers
         print(f"已加载默认纸张列表，共 {len(standard_papers)} 种标准格式")
     
@@ -391,18 +499,30 @@ class PrintSettingsDialog:
             messagebox.showerror("错误", "请选择纸张尺寸")
             return False
         
-        # 检查打印数量
-        try:
-            copies = self.copies_var.get()
-            if copies < 1 or copies > 999:
-                messagebox.showerror("错误", "打印数量必须在1-999之间")
-                return False
-        except:
+        # 检查打印数量（输入时已限制为数字，这里只需检查范围和空值）
+        copies_text = self.copies_spin.get()
+        if not (copies_text.isascii() and copies_text.isdigit()):
             messagebox.showerror("错误", "打印数量必须是有效数字")
             return False
+        if not 1 <= int(copies_text) <= 999:
+            messagebox.showerror("错误", "打印数量必须在1-999之间")
+            return False
         
         return True
     
+    @staticmethod
+    def _validate_copies_key(new_value: str) -> bool:
+        """
+        打印数量输入校验，只允许输入最多3位数字
+        
+        Args:
+            new_value: 输入后的完整内容
+            
+        Returns:
+            是否接受本次输入
+        """
+        return new_value == "" or (len(new_value) <= 3 and new_value.isascii() and new_value.isdigit())
+    
     def _create_settings_from_form(self) -> PrintSettings:
         """从表单创建打印设置对象"""
         return PrintSettings(
@@ -410,8 +530,8 @@ class PrintSettingsDialog:
             paper_size=self.paper_var.get(),
             copies=self.copies_var.get(),
             duplex=self.duplex_var.get(),
-            color_mode=ColorMode(self.color_var.get()),
-            orientation=Orientation(self.orientation_var.get())
+            color_mode=COLOR_MODE_BY_VALUE[self.color_var.get()],
+            orientation=ORIENTATION_BY_VALUE[self.orientation_var.get()]
         )
     
     def _on_ok(self):
@@ -428,7 +548,7 @@ class PrintSettingsDialog:
                     return
                 
                 print(f"打印设置已确认: {self.result.printer_name}")
-                self.dialog.destroy()
+                self._close()
                 
             except Exception as e:
                 messagebox.showerror("错误", f"保存设置失败: {e}")
@@ -436,7 +556,7 @@ class PrintSettingsDialog:
     def _on_cancel(self):
         """取消按钮处理"""
         self.result = None
-        self.dialog.destroy()
+        self._close()
     
     def _on_reset(self):
         """重置按钮处理"""
@@ -457,9 +577,26 @@ class PrintSettingsDialog:
         if not printer_name:
             return
         
+        # 获取选中打印机支持的纸张尺寸（DeviceCapabilities 较慢，放到后台线程）
+        self._run_in_background(
+            lambda: self.printer_manager.get_printer_paper_sizes_cached(printer_name),
+            lambda paper_sizes, error: self._apply_paper_sizes(printer_name, paper_sizes, error),
+            self.btn_sync_paper, "同步中..."
+        )
+    
+    def _apply_paper_sizes(self, printer_name: str, paper_sizes, error):
+        """
+        在主线程中应用同步到的纸张尺寸列表
+        
+        Args:
+            printer_name: 打印机名称
+            paper_sizes: 纸张尺寸列表
+            error: 获取过程中的异常（无异常时为None）
+        """
         try:
-            # 获取选中打印机支持的纸张尺寸
-            paper_sizes = self.printer_manager.get_printer_paper_sizes(printer_name)
+            if error is not None:
+                raise error
+            
             self.paper_combo['values'] = paper_sizes
             
             # 保存当前选择的纸张尺寸
@@ -480,9 +617,8 @@ class PrintSettingsDialog:
         except Exception as e:
             print(f"同步纸张尺寸失败: {e}")
             # 如果失败，使用标准纸张尺寸作为备用
-            standard_papers = list(self.printer_manager.STANDARD_PAPER_SIZES.keys())
-            self.paper_combo['values'] = standard_papers
-            if 'A4' in standard_papers:
+            self.paper_combo['values'] = self.printer_manager.STANDARD_PAPER_NAMES
+            if 'A4' in self.printer_manager.STANDARD_PAPER_SET:
                 self.paper_var.set('A4')
     
  
\ No newline at end of file
@@ -25,4 +25,5 @@ try:
     ]
 except ImportError as e:
     print(f"警告: 导入处理器模块时出错: {e}")
-    __all__ = [] 
\ No newline at end of file
+    __all__ = []
+
@@ -2,11 +2,45 @@
 文档处理器基础类
 定义所有文档处理器必须实现的接口
 """
+import os
+import stat
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Set
+from typing import Dict, List, Optional, Set
 from ..core.models import FileType, PrintSettings
 
+# 文件状态缓存，只在 BaseDocumentHandler.stat_cache() 范围内（一次批处理）生效；
+# 批处理之外文件随时可能被修改、删除或替换，每次都访问文件系统
+_stat_cache: Dict[str, Optional[os.stat_result]] = {}
+_stat_cache_depth = 0
+_stat_cache_lock = threading.Lock()
+
+
+def _safe_stat(path_str: str) -> Optional[os.stat_result]:
+    """
+    获取文件状态（批处理范围内结果缓存，同一文件只访问一次文件系统）
+    
+    Args:
+        path_str: 文件路径字符串
+        
+    Returns:
+        os.stat 结果，文件不存在或无法访问时返回None
+    """
+    caching = _stat_cache_depth > 0
+    if caching and path_str in _stat_cache:
+        return _stat_cache[path_str]
+    
+    try:
+        result = os.stat(path_str)
+    except OSError:
+        result = None
+    
+    if caching:
+        _stat_cache[path_str] = result
+    return result
+
 
 class BaseDocumentHandler(ABC):
     """文档处理器基础抽象类"""
@@ -90,7 +124,8 @@ class BaseDocumentHandler(ABC):
         Returns:
             文件是否存在
         """
-        return file_path.exists() and file_path.is_file()
+        file_stat = _safe_stat(str(file_path))
+        return file_stat is not None and stat.S_ISREG(file_stat.st_mode)
     
     def get_file_size_mb(self, file_path: Path) -> float:
         """
@@ -102,7 +137,29 @@ class BaseDocumentHandler(ABC):
         Returns:
             文件大小（MB）
         """
+        file_stat = _safe_stat(str(file_path))
+        if file_stat is None:
+            return 0.0
+        return file_stat.st_size / (1024 * 1024)
+    
+    @staticmethod
+    @contextmanager
+    def stat_cache():
+        """
+        批处理期间缓存文件状态，退出时清空（可嵌套，最外层退出时清空）
+        
+        用法:
+            with BaseDocumentHandler.stat_cache():
+                ...
+        """
+        global _stat_cache_depth
+        with _stat_cache_lock:
+            _stat_cache_depth += 1
         try:
-            return file_path.stat().st_size / (1024 * 1024)
-        except Exception:
-            return 0.0 
\ No newline at end of file
+            yield
+        finally:
+            with _stat_cache_lock:
+                _stat_cache_depth -= 1
+                if _stat_cache_depth == 0:
+                    _stat_cache.clear()
+ 
\ No newline at end of file
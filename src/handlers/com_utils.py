@@ -0,0 +1,101 @@
+"""
+COM工具模块
+提供线程级的COM初始化和COM对象释放函数
+"""
+import gc
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_thread_state = threading.local()
+
+
+@contextmanager
+def com_apartment():
+    """
+    在当前线程初始化COM（单线程套间），退出时反初始化
+    
+    工作线程在最外层使用，使 CoInitialize 与 CoUninitialize 配对；范围内处理器调用
+    ensure_com_initialized() 直接返回。已初始化的线程（嵌套使用）不重复初始化，
+    未安装pywin32时不做处理，由处理器在使用COM时报告缺少依赖。
+    
+    用法:
+        with com_apartment():
+            ...
+    """
+    if getattr(_thread_state, 'com_initialized', False):
+        yield
+        return
+    
+    try:
+        import pythoncom
+    except ImportError:
+        yield
+        return
+    
+    pythoncom.CoInitialize()
+    _thread_state.com_initialized = True
+    _thread_state.cleanups = []
+    try:
+        yield
+    finally:
+        # 先释放线程内缓存的COM代理，反初始化后再释放代理是未定义行为
+        for cleanup in reversed(_thread_state.cleanups):
+            try:
+                cleanup()
+            except Exception as e:
+                logger.debug("释放线程内COM对象失败: %s", e)
+        _thread_state.cleanups = None
+        _thread_state.com_initialized = False
+        gc.collect()
+        pythoncom.CoUninitialize()
+
+
+def on_com_uninitialize(cleanup):
+    """
+    注册当前线程由 com_apartment() 反初始化COM前执行的清理函数
+    
+    用于释放跨调用缓存在线程内的COM代理；线程不在 com_apartment() 范围内时
+    COM不会被反初始化，不需要清理
+    
+    Args:
+        cleanup: 无参数的清理函数
+    """
+    cleanups = getattr(_thread_state, 'cleanups', None)
+    if cleanups is not None:
+        cleanups.append(cleanup)
+
+
+def ensure_com_initialized():
+    """
+    确保当前线程已初始化COM（单线程套间）
+    
+    在 com_apartment() 范围内直接返回；范围外（如主线程）每个线程只初始化一次，
+    不会反初始化，因此短生命周期的工作线程应在最外层使用 com_apartment()
+    
+    Raises:
+        ImportError: 未安装pywin32
+    """
+    if getattr(_thread_state, 'com_initialized', False):
+        return
+    
+    import pythoncom
+    pythoncom.CoInitialize()
+    _thread_state.com_initialized = True
+
+
+def release_com_objects():
+    """
+    回收已无引用的COM代理并卸载不再使用的COM库
+    
+    退出Office应用后由调用方先将代理变量置为None再调用：循环引用中的代理要等垃圾回收才会释放，
+    未释放的代理会让进程外服务器（如WINWORD.EXE）在后台继续运行
+    """
+    gc.collect()
+    try:
+        import pythoncom
+        pythoncom.CoFreeUnusedLibraries()
+    except ImportError:
+        pass
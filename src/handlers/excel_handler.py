@@ -1,200 +1,528 @@
 """
 Excel文档处理器
 负责Excel文件的打印和页数统计
-使用xlwings库获得精确的打印页数
+缩放为单页的 .xlsx 直接解析压缩包确定页数，其它情况使用xlwings获取打印页数
 """
+import logging
 import time
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Set, Optional
+from typing import Dict, Set, Optional, Tuple
 from ..core.models import FileType, PrintSettings
 from .base_handler import BaseDocumentHandler
 
-try:
-    import xlwings as xw
-    XLWINGS_AVAILABLE = True
-except ImportError:
-    XLWINGS_AVAILABLE = False
+logger = logging.getLogger(__name__)
+
+# .xlsx 工作表XML所在目录及页面设置相关标签（去掉命名空间后的本地名）
+_XLSX_SHEET_PREFIX = 'xl/worksheets/sheet'
+_PAGE_SETUP_PR_TAG = 'pageSetUpPr'
+_SHEET_DATA_TAG = 'sheetData'
+_PAGE_SETUP_TAG = 'pageSetup'
+_XML_TRUE = ('1', 'true')
+
+# xlwings 会连带加载 pywin32/COM 组件，导入代价较高，推迟到首次使用时加载
+_xw = None
+
+
+def _get_xw():
+    """
+    获取xlwings模块（首次调用时导入并缓存）
+    
+    Returns:
+        xlwings模块
+        
+    Raises:
+        ImportError: xlwings库未安装
+    """
+    global _xw
+    if _xw is None:
+        try:
+            import xlwings
+        except ImportError:
+            raise ImportError("xlwings库未安装，无法处理Excel文件")
+        _xw = xlwings
+    return _xw
 
 
 class ExcelDocumentHandler(BaseDocumentHandler):
     """Excel文档处理器"""
     
+    # 支持的文件类型和扩展名（不可变，避免每次调用重新构建集合）
+    _SUPPORTED_FILE_TYPES: frozenset = frozenset({FileType.EXCEL})
+    _SUPPORTED_EXTENSIONS: frozenset = frozenset({'.xls', '.xlsx', '.et'})
+    
+    # 批处理会话期间共享的Excel应用实例（COM为STA，仅在开启会话的线程中复用）
+    _shared_app = None
+    _shared_app_thread: Optional[int] = None
+    _app_lock = threading.Lock()
+    
+    # 会话期间共享的打印机句柄，用于等待打印作业进入队列
+    _shared_printer_name: Optional[str] = None
+    _shared_printer_handle = None
+    
+    # 打印后等待作业进入打印队列的最长时间（秒）
+    SPOOL_WAIT_SECONDS = 2.0
+    
     def __init__(self):
         """初始化Excel处理器"""
         self._timeout_seconds = 60  # Excel文件可能更复杂，给60秒超时
-        if not XLWINGS_AVAILABLE:
-            raise ImportError("xlwings库未安装，无法处理Excel文件")
+        self._page_counts: Dict[Tuple[str, int, int], int] = {}  # 页数缓存
     
     def get_supported_file_types(self) -> Set[FileType]:
         """获取支持的文件类型"""
-        return {FileType.EXCEL}
+        return self._SUPPORTED_FILE_TYPES
     
     def get_supported_extensions(self) -> Set[str]:
         """获取支持的文件扩展名"""
-        return {'.xls', '.xlsx', '.et'}
+        return self._SUPPORTED_EXTENSIONS
+    
+    @staticmethod
+    def _create_app(xw):
+        """
+        创建不可见且不显示警告的Excel应用实例
+        
+        应用级选项只在创建时设置一次，共享实例在整个会话内沿用
+        """
+        app = xw.App(visible=False, add_book=False)
+        app.display_alerts = False
+        app.screen_updating = False
+        return app
+    
+    @classmethod
+    def _get_app(cls) -> Tuple[object, bool]:
+        """
+        获取Excel应用实例
+        
+        在 session() 所在线程中返回共享实例，其它情况创建独立实例
+        
+        Returns:
+            (应用实例, 是否为共享实例)，非共享实例需由调用方退出
+        """
+        xw = _get_xw()
+        with cls._app_lock:
+            if cls._shared_app_thread == threading.get_ident():
+                if cls._shared_app is None:
+                    cls._shared_app = cls._create_app(xw)
+                return cls._shared_app, True
+        return cls._create_app(xw), False
+    
+    @classmethod
+    def close_shared_app(cls):
+        """退出共享的Excel应用实例并结束当前会话"""
+        with cls._app_lock:
+            app = cls._shared_app
+            printer_handle = cls._shared_printer_handle
+            cls._shared_app = None
+            cls._shared_app_thread = None
+            cls._shared_printer_name = None
+            cls._shared_printer_handle = None
+        
+        if app is not None:
+            try:
+                app.quit()
+            except:
+                pass
+        
+        if printer_handle is not None:
+            try:
+                import win32print
+                win32print.ClosePrinter(printer_handle)
+            except:
+                pass
+    
+    @classmethod
+    def _get_printer_handle(cls, printer_name: str) -> Tuple[object, bool]:
+        """
+        获取打印机句柄，在 session() 所在线程中复用
+        
+        Args:
+            printer_name: 打印机名称
+            
+        Returns:
+            (打印机句柄, 是否为共享句柄)，非共享句柄需由调用方关闭
+        """
+        import win32print
+        
+        with cls._app_lock:
+            in_session = cls._shared_app_thread == threading.get_ident()
+            if in_session and cls._shared_printer_name == printer_name:
+                return cls._shared_printer_handle, True
+        
+        handle = win32print.OpenPrinter(printer_name)
+        if not in_session:
+            return handle, False
+        
+        with cls._app_lock:
+            old_handle = cls._shared_printer_handle
+            cls._shared_printer_name = printer_name
+            cls._shared_printer_handle = handle
+        
+        if old_handle is not None:
+            try:
+                win32print.ClosePrinter(old_handle)
+            except:
+                pass
+        return handle, True
+    
+    @classmethod
+    def _discard_shared_app(cls):
+        """丢弃可能已失效的共享实例，会话内下次使用时重新创建"""
+        with cls._app_lock:
+            app = cls._shared_app
+            cls._shared_app = None
+        
+        if app is not None:
+            try:
+                app.quit()
+            except:
+                pass
+    
+    @classmethod
+    @contextmanager
+    def session(cls):
+        """
+        批处理会话，会话内同一线程的Excel操作复用一个应用实例
+        
+        用法:
+            with ExcelDocumentHandler.session():
+                ...
+        """
+        with cls._app_lock:
+            owner = cls._shared_app_thread is None
+            if owner:
+                cls._shared_app_thread = threading.get_ident()
+        
+        try:
+            yield
+        finally:
+            if owner:
+                cls.close_shared_app()
     
     def can_handle_file(self, file_path: Path) -> bool:
         """检查是否能处理指定文件"""
-        if not self.validate_file_exists(file_path):
+        # 先做扩展名查找，避免对不支持的文件访问文件系统
+        if file_path.suffix.lower() not in self._SUPPORTED_EXTENSIONS:
             return False
         
-        extension = file_path.suffix.lower()
-        return extension in self.get_supported_extensions()
+        return self.validate_file_exists(file_path)
     
     def count_pages(self, file_path: Path) -> int:
         """
-        使用xlwings获取Excel精确打印页数
-        通过Excel原生API访问分页符信息
+        获取Excel打印页数
+        缩放为单页的 .xlsx 直接读取压缩包，其它情况通过Excel原生API统计
         """
         if not self.can_handle_file(file_path):
             return 0
             
         try:
+            if file_path.suffix.lower() == '.xlsx':
+                pages = self._count_pages_via_zip(file_path)
+                if pages is not None:
+                    return pages
             return self._count_pages_with_xlwings(file_path)
         except Exception as e:
-            print(f"Excel页数统计失败 {file_path}: {e}")
+            logger.error("Excel页数统计失败 %s: %s", file_path, e)
             # 如果xlwings失败，至少返回1页避免返回0
             return 1
     
-    def _count_pages_with_xlwings(self, file_path: Path) -> int:
-        """使用xlwings获取Excel精确打印页数"""
-        app = None
-        wb = None
-        total_pages = 0
+    def _count_pages_via_zip(self, file_path: Path) -> Optional[int]:
+        """
+        解析 .xlsx 压缩包确定打印页数，无需启动Excel
+        
+        打印页数取决于Excel按列宽、行高、纸张和边距自动插入的分页符，压缩包中只保存手动分页符，
+        无法据此推算。只有每个工作表都设置了"调整为1页宽、1页高"（缩放打印时手动分页符也被忽略）
+        时结果才确定，每个工作表计1页；其它情况返回None，由调用方通过Excel统计。
         
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            页数，无法确定或文件无法按 .xlsx 解析（如加密文件）时返回None
+        """
         try:
-            # 创建Excel应用实例，设置为不可见且不显示警告
-            app = xw.App(visible=False, add_book=False)
-            app.display_alerts = False
-            app.screen_updating = False
+            with zipfile.ZipFile(file_path) as zf:
+                sheet_names = [name for name in zf.namelist()
+                               if name.startswith(_XLSX_SHEET_PREFIX) and name.endswith('.xml')]
+                if not sheet_names:
+                    return None
+                
+                for name in sheet_names:
+                    with zf.open(name) as sheet_xml:
+                        if not self._sheet_fits_one_page(sheet_xml):
+                            return None
+                
+                return len(sheet_names)
+                
+        except (zipfile.BadZipFile, ET.ParseError, KeyError, OSError) as e:
+            logger.warning("解析xlsx页面设置失败，改用Excel统计 %s: %s", file_path, e)
+            return None
+    
+    @staticmethod
+    def _sheet_fits_one_page(sheet_xml) -> bool:
+        """
+        判断工作表是否设置为缩放到1页宽、1页高打印
+        
+        Args:
+            sheet_xml: 工作表XML文件对象
             
-            # 打开工作簿
-            wb = app.books.open(str(file_path))
+        Returns:
+            是否缩放为单页
+        """
+        fit_to_page = False
+        # 流式解析，处理完的元素立即清理，避免大表占用内存
+        for event, elem in ET.iterparse(sheet_xml, events=('start', 'end')):
+            if event == 'end':
+                elem.clear()
+                continue
             
-            # 遍历所有工作表
-            for sheet in wb.sheets:
-                try:
-                    # 获取水平和垂直分页符数量
-                    h_page_breaks = len(sheet.api.HPageBreaks)
-                    v_page_breaks = len(sheet.api.VPageBreaks)
-                    
-                    # 计算页数：(水平分页符+1) × (垂直分页符+1)
-                    sheet_pages = (h_page_breaks + 1) * (v_page_breaks + 1)
-                    
-                    # 确保每个工作表至少有1页
-                    if sheet_pages < 1:
-                        sheet_pages = 1
-                        
-                    total_pages += sheet_pages
-                    
-                except Exception as e:
-                    print(f"工作表 {sheet.name} 页数统计失败: {e}")
-                    # 如果单个工作表失败，至少计为1页
-                    total_pages += 1
+            tag = elem.tag.rpartition('}')[2]
+            if tag == _PAGE_SETUP_PR_TAG:
+                fit_to_page = elem.get('fitToPage') in _XML_TRUE
+            elif tag == _SHEET_DATA_TAG:
+                # sheetPr 位于单元格数据之前，未启用缩放时无需继续读取整张表
+                if not fit_to_page:
+                    return False
+            elif tag == _PAGE_SETUP_TAG:
+                return (fit_to_page and elem.get('fitToWidth', '1') == '1'
+                        and elem.get('fitToHeight', '1') == '1')
+        
+        # 没有 pageSetup 元素时 fitToWidth/fitToHeight 取默认值1
+        return fit_to_page
+    
+    def _page_count_key(self, file_path: Path) -> Optional[Tuple[str, int, int]]:
+        """生成页数缓存键（路径、修改时间、大小），文件变化后缓存自动失效"""
+        try:
+            stat = file_path.stat()
+            return (str(file_path), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    @staticmethod
+    def _terminate_excel_process(pid: Optional[int], timed_out: threading.Event):
+        """
+        看门狗超时回调：强制结束卡住的Excel进程，使阻塞的COM调用返回
+        
+        Args:
+            pid: Excel进程ID
+            timed_out: 超时标记
+        """
+        timed_out.set()
+        if not pid:
+            return
+        
+        try:
+            import win32api
+            import win32con
+            handle = win32api.OpenProcess(win32con.PROCESS_TERMINATE, False, pid)
+            try:
+                win32api.TerminateProcess(handle, 1)
+            finally:
+                win32api.CloseHandle(handle)
+            logger.warning("⚠️ 已强制结束无响应的Excel进程 (PID %s)", pid)
+        except Exception as e:
+            logger.error("❌ 结束Excel进程失败 (PID %s): %s", pid, e)
+    
+    @contextmanager
+    def _open_workbook(self, file_path: Path, timeout: Optional[float] = None):
+        """
+        打开工作簿，退出时关闭工作簿（非共享实例同时退出Excel）
+        
+        Args:
+            file_path: 文件路径
+            timeout: 看门狗超时（秒），超时后强制结束Excel进程；None表示不限时
             
-            return max(total_pages, 1)  # 确保至少返回1页
+        Yields:
+            (应用实例, 工作簿)
             
+        Raises:
+            TimeoutError: 操作超时，Excel进程已被结束
+        """
+        app, shared = self._get_app()
+        wb = None
+        watchdog = None
+        timed_out = threading.Event()
+        
+        if timeout:
+            # COM为单线程模型，操作留在当前线程，由定时器线程在超时后结束Excel进程
+            try:
+                pid = app.pid
+            except Exception:
+                pid = None
+            watchdog = threading.Timer(timeout, self._terminate_excel_process, (pid, timed_out))
+            watchdog.daemon = True
+            watchdog.start()
+        
+        try:
+            wb = app.books.open(str(file_path))
+            yield app, wb
+            if timed_out.is_set():
+                # Excel进程已被结束，期间得到的结果不可信
+                raise TimeoutError(f"Excel操作超过{timeout}秒未完成")
         except Exception as e:
-            print(f"xlwings处理Excel文件失败 {file_path}: {e}")
-            return 1
-            
+            if shared:
+                # 共享实例可能已失效，丢弃后由会话内下次调用重新创建
+                wb = None
+                self._discard_shared_app()
+            if timed_out.is_set():
+                raise TimeoutError(f"Excel操作超过{timeout}秒未完成") from e
+            raise
         finally:
-            # 清理资源
+            if watchdog is not None:
+                watchdog.cancel()
+            
+            # 清理资源，共享实例只关闭工作簿
             try:
                 if wb:
                     wb.close()
-                if app:
+                if not shared:
                     app.quit()
             except:
                 pass
     
-    def print_document(self, file_path: Path, settings: PrintSettings) -> bool:
-        """使用Excel COM接口执行打印"""
-        if not self.can_handle_file(file_path):
-            return False
-            
-        app = None
-        wb = None
+    def _count_workbook_pages(self, wb) -> int:
+        """统计已打开工作簿的打印页数"""
+        total_pages = 0
         
-        try:
-            # 创建Excel应用实例
-            app = xw.App(visible=False, add_book=False)
-            app.display_alerts = False
-            app.screen_updating = False
-            
-            # 打开工作簿
-            wb = app.books.open(str(file_path))
-            
-            # 设置打印选项
-            if settings.printer_name:
-                try:
-                    # Excel的打印机设置方式 - 使用更可靠的方法
-                    current_printer = app.api.ActivePrinter
-                    print(f"📋 Excel当前打印机: {current_printer}")
-                    
-                    app.api.ActivePrinter = settings.printer_name
-                    print(f"🖨️ 设置Excel打印机: {settings.printer_name}")
-                    
-                    # 验证设置是否成功
-                    new_printer = app.api.ActivePrinter
-                    print(f"✅ Excel打印机设置后: {new_printer}")
+        # 直接使用COM集合按索引访问，避免xlwings包装对象带来的额外调用
+        worksheets = wb.api.Worksheets
+        for index in range(1, worksheets.Count + 1):
+            try:
+                worksheet = worksheets.Item(index)
+                
+                # 计算页数：(水平分页符+1) × (垂直分页符+1)
+                sheet_pages = (worksheet.HPageBreaks.Count + 1) * (worksheet.VPageBreaks.Count + 1)
+                
+                # 确保每个工作表至少有1页
+                if sheet_pages < 1:
+                    sheet_pages = 1
                     
-                except Exception as printer_error:
-                    print(f"⚠️ 设置Excel打印机失败，使用默认打印机: {printer_error}")
-                    # 继续使用默认打印机
-            
-            # 验证系统级双面打印设置
-            if settings.duplex and settings.printer_name:
-                try:
-                    import win32print
-                    printer_handle = win32print.OpenPrinter(settings.printer_name)
-                    try:
-                        printer_info = win32print.GetPrinter(printer_handle, 2)
-                        devmode = printer_info.get('pDevMode')
-                        if devmode and hasattr(devmode, 'Duplex'):
-                            print(f"🔍 Excel打印前验证: 打印机双面设置为 {devmode.Duplex}")
-                    finally:
-                        win32print.ClosePrinter(printer_handle)
-                except Exception as duplex_check:
-                    print(f"⚠️ Excel双面打印验证失败: {duplex_check}")
-            
-            # 执行打印 - 使用更明确的参数
+                total_pages += sheet_pages
+                
+            except Exception as e:
+                logger.warning("第 %s 个工作表页数统计失败: %s", index, e)
+                # 如果单个工作表失败，至少计为1页
+                total_pages += 1
+        
+        return max(total_pages, 1)  # 确保至少返回1页
+    
+    def _count_pages_with_xlwings(self, file_path: Path) -> int:
+        """使用xlwings获取Excel精确打印页数"""
+        key = self._page_count_key(file_path)
+        if key is not None and key in self._page_counts:
+            return self._page_counts[key]
+        
+        try:
+            with self._open_workbook(file_path, timeout=self._timeout_seconds) as (app, wb):
+                total_pages = self._count_workbook_pages(wb)
+        except TimeoutError as e:
+            logger.warning("⚠️ Excel页数统计超时 %s: %s", file_path, e)
+            return 1
+        except Exception as e:
+            logger.error("xlwings处理Excel文件失败 %s: %s", file_path, e)
+            return 1
+        
+        if key is not None:
+            self._page_counts[key] = total_pages
+        return total_pages
+    
+    def _print_workbook(self, app, wb, settings: PrintSettings):
+        """
+        打印已打开的工作簿
+        
+        Raises:
+            Exception: 打印失败
+        """
+        # 设置打印选项
+        if settings.printer_name:
             try:
-                print("📤 正在发送Excel打印作业...")
-                wb.api.PrintOut(
-                    Copies=settings.copies,
-                    Collate=True,
-                    Preview=False,
-                    PrintToFile=False,
-                    ActivePrinter=settings.printer_name if settings.printer_name else None
-                )
-                print(f"✅ Excel打印作业已发送到打印机")
+                # Excel的打印机设置方式 - 使用更可靠的方法
+                current_printer = app.api.ActivePrinter
+                logger.debug("📋 Excel当前打印机: %s", current_printer)
+                
+                app.api.ActivePrinter = settings.printer_name
+                logger.debug("🖨️ 设置Excel打印机: %s", settings.printer_name)
                 
-                # 等待打印作业处理
-                time.sleep(2)
+                # 验证设置是否成功
+                new_printer = app.api.ActivePrinter
+                logger.debug("✅ Excel打印机设置后: %s", new_printer)
                 
-            except Exception as print_error:
-                print(f"❌ Excel详细打印失败: {print_error}")
-                # 尝试简单的打印调用
+            except Exception as printer_error:
+                logger.warning("⚠️ 设置Excel打印机失败，使用默认打印机: %s", printer_error)
+                # 继续使用默认打印机
+        
+        # 验证系统级双面打印设置
+        if settings.duplex and settings.printer_name:
+            try:
+                # 验证结果按打印机缓存，同一批次只查询一次打印后台
+                from .print_utils import verify_printer_duplex_setting
+                verify_printer_duplex_setting(settings.printer_name, "Excel")
+            except Exception as duplex_check:
+                logger.warning("⚠️ Excel双面打印验证失败: %s", duplex_check)
+        
+        # 记录打印前的队列作业，用于判断本次作业是否已进入队列
+        printer_handle = None
+        shared_handle = False
+        known_job_ids = set()
+        try:
+            import win32print
+            from .print_utils import get_print_job_ids
+            printer_handle, shared_handle = self._get_printer_handle(
+                settings.printer_name or win32print.GetDefaultPrinter()
+            )
+            known_job_ids = get_print_job_ids(printer_handle)
+        except Exception as queue_error:
+            logger.warning("⚠️ 无法读取打印队列，将固定等待: %s", queue_error)
+            printer_handle = None
+        
+        try:
+            self._send_print_out(wb, settings, printer_handle, known_job_ids)
+        finally:
+            if printer_handle is not None and not shared_handle:
                 try:
-                    wb.api.PrintOut(Copies=settings.copies)
-                    print("🔄 使用简单方式重试Excel打印")
-                except Exception as simple_error:
-                    print(f"❌ Excel简单打印也失败: {simple_error}")
-                    raise simple_error
-            
+                    win32print.ClosePrinter(printer_handle)
+                except:
+                    pass
+    
+    def _send_print_out(self, wb, settings: PrintSettings, printer_handle, known_job_ids):
+        """发送PrintOut并等待作业进入打印队列"""
+        # 执行打印 - 仅在指定了打印机时传入ActivePrinter，传None反而可能导致调用失败
+        print_kwargs = {
+            'Copies': settings.copies,
+            'Collate': True,
+            'Preview': False,
+            'PrintToFile': False,
+        }
+        if settings.printer_name:
+            print_kwargs['ActivePrinter'] = settings.printer_name
+        
+        try:
+            logger.debug("📤 正在发送Excel打印作业...")
+            wb.api.PrintOut(**print_kwargs)
+            logger.debug("✅ Excel打印作业已发送到打印机")
+        except Exception as print_error:
+            logger.error("❌ Excel打印失败: %s", print_error)
+            raise
+        
+        # 等待打印作业进入队列，出现后立即继续
+        if printer_handle is not None:
+            from .print_utils import wait_for_new_print_job
+            if not wait_for_new_print_job(printer_handle, known_job_ids, self.SPOOL_WAIT_SECONDS):
+                logger.debug("⚠️ 未在打印队列中检测到新作业，继续处理")
+        else:
+            time.sleep(self.SPOOL_WAIT_SECONDS)
+    
+    def print_document(self, file_path: Path, settings: PrintSettings) -> bool:
+        """使用Excel COM接口执行打印"""
+        if not self.can_handle_file(file_path):
+            return False
+        
+        try:
+            with self._open_workbook(file_path) as (app, wb):
+                self._print_workbook(app, wb, settings)
             return True
-            
         except Exception as e:
-            print(f"Excel打印失败 {file_path}: {e}")
+            logger.error("Excel打印失败 %s: %s", file_path, e)
             return False
-            
-        finally:
-            # 清理资源
-            try:
-                if wb:
-                    wb.close()
-                if app:
-                    app.quit()
-            except:
-                pass 
\ No newline at end of file
@@ -2,11 +2,15 @@
 文档处理器注册中心
 负责管理和分发各种文档格式的处理器
 """
+import logging
+import sys
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import AbstractSet, Dict, List, Optional, Set, Tuple
 from ..core.models import FileType
 from .base_handler import BaseDocumentHandler
 
+logger = logging.getLogger(__name__)
+
 
 class HandlerRegistry:
     """处理器注册中心"""
@@ -14,8 +18,12 @@ class HandlerRegistry:
     def __init__(self):
         """初始化注册中心"""
         self._handlers: List[BaseDocumentHandler] = []
+        # 只读快照，注册/注销时更新，读取时无需复制列表
+        self._handlers_tuple: Tuple[BaseDocumentHandler, ...] = ()
         self._file_type_handlers: Dict[FileType, BaseDocumentHandler] = {}
         self._extension_handlers: Dict[str, BaseDocumentHandler] = {}
+        # 按对象标识记录已注册的处理器，注册/注销时无需线性扫描列表
+        self._handler_ids: Set[int] = set()
     
     def register_handler(self, handler: BaseDocumentHandler):
         """
@@ -24,31 +32,36 @@ class HandlerRegistry:
         Args:
             handler: 要注册的处理器
         """
-        if handler in self._handlers:
-            print(f"处理器 {handler.get_handler_name()} 已经注册")
+        if id(handler) in self._handler_ids:
+            logger.warning("处理器 %s 已经注册", handler.get_handler_name())
             return
         
         # 添加到处理器列表
         self._handlers.append(handler)
+        self._handlers_tuple = tuple(self._handlers)
+        self._handler_ids.add(id(handler))
         
         # 按文件类型注册
         for file_type in handler.get_supported_file_types():
             if file_type in self._file_type_handlers:
-                print(f"警告: 文件类型 {file_type} 已有处理器 {self._file_type_handlers[file_type].get_handler_name()}, "
-                      f"将被 {handler.get_handler_name()} 替换")
+                logger.warning("文件类型 %s 已有处理器 %s, 将被 %s 替换", file_type,
+                               self._file_type_handlers[file_type].get_handler_name(), handler.get_handler_name())
             self._file_type_handlers[file_type] = handler
         
         # 按文件扩展名注册
         for extension in handler.get_supported_extensions():
-            ext_lower = extension.lower()
+            # 驻留扩展名字符串，查找时可直接按指针比较键
+            ext_lower = sys.intern(extension.lower())
             if ext_lower in self._extension_handlers:
-                print(f"警告: 文件扩展名 {ext_lower} 已有处理器 {self._extension_handlers[ext_lower].get_handler_name()}, "
-                      f"将被 {handler.get_handler_name()} 替换")
+                logger.warning("文件扩展名 %s 已有处理器 %s, 将被 %s 替换", ext_lower,
+                               self._extension_handlers[ext_lower].get_handler_name(), handler.get_handler_name())
             self._extension_handlers[ext_lower] = handler
         
-        print(f"已注册处理器: {handler.get_handler_name()}")
-        print(f"  - 支持文件类型: {[ft.value for ft in handler.get_supported_file_types()]}")
-        print(f"  - 支持扩展名: {sorted(handler.get_supported_extensions())}")
+        # 只有开启详细日志时才生成类型和扩展名列表
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("已注册处理器: %s", handler.get_handler_name())
+            logger.debug("  - 支持文件类型: %s", [ft.value for ft in handler.get_supported_file_types()])
+            logger.debug("  - 支持扩展名: %s", sorted(handler.get_supported_extensions()))
     
     def unregister_handler(self, handler: BaseDocumentHandler):
         """
@@ -57,25 +70,27 @@ class HandlerRegistry:
         Args:
             handler: 要注销的处理器
         """
-        if handler not in self._handlers:
-            print(f"处理器 {handler.get_handler_name()} 未注册")
+        if id(handler) not in self._handler_ids:
+            logger.warning("处理器 %s 未注册", handler.get_handler_name())
             return
         
         # 从处理器列表移除
-        self._handlers.remove(handler)
+        self._handlers = [h for h in self._handlers if h is not handler]
+        self._handlers_tuple = tuple(self._handlers)
+        self._handler_ids.discard(id(handler))
         
         # 从文件类型映射移除
         for file_type in handler.get_supported_file_types():
-            if file_type in self._file_type_handlers and self._file_type_handlers[file_type] == handler:
+            if file_type in self._file_type_handlers and self._file_type_handlers[file_type] is handler:
                 del self._file_type_handlers[file_type]
         
         # 从扩展名映射移除
         for extension in handler.get_supported_extensions():
             ext_lower = extension.lower()
-            if ext_lower in self._extension_handlers and self._extension_handlers[ext_lower] == handler:
+            if ext_lower in self._extension_handlers and self._extension_handlers[ext_lower] is handler:
                 del self._extension_handlers[ext_lower]
         
-        print(f"已注销处理器: {handler.get_handler_name()}")
+        logger.debug("已注销处理器: %s", handler.get_handler_name())
     
     def get_handler_by_file_type(self, file_type: FileType) -> Optional[BaseDocumentHandler]:
         """
@@ -99,10 +114,27 @@ class HandlerRegistry:
         Returns:
             处理器实例或None
         """
+        # 已是标准形式（小写、带点号）时直接命中
+        handler = self._extension_handlers.get(extension)
+        if handler is not None:
+            return handler
+        
         # 标准化扩展名
         if not extension.startswith('.'):
             extension = '.' + extension
-        return self._extension_handlers.get(extension.lower())
+        return self._fast_lookup(sys.intern(extension.lower()))
+    
+    def _fast_lookup(self, extension: str) -> Optional[BaseDocumentHandler]:
+        """
+        按已标准化的扩展名（小写、带点号）获取处理器
+        
+        Args:
+            extension: 标准化后的扩展名
+            
+        Returns:
+            处理器实例或None
+        """
+        return self._extension_handlers.get(extension)
     
     def get_handler_by_file_path(self, file_path: Path) -> Optional[BaseDocumentHandler]:
         """
@@ -114,8 +146,8 @@ class HandlerRegistry:
         Returns:
             处理器实例或None
         """
-        extension = file_path.suffix.lower()
-        return self.get_handler_by_extension(extension)
+        # Path.suffix 已带点号，只需转小写一次
+        return self._fast_lookup(file_path.suffix.lower())
     
     def can_handle_file(self, file_path: Path) -> bool:
         """
@@ -132,14 +164,14 @@ class HandlerRegistry:
             return handler.can_handle_file(file_path)
         return False
     
-    def get_all_supported_extensions(self) -> Set[str]:
+    def get_all_supported_extensions(self) -> AbstractSet[str]:
         """
         获取所有支持的文件扩展名
         
         Returns:
-            所有支持的扩展名集合
+            所有支持的扩展名（只读视图，随注册情况变化）
         """
-        return set(self._extension_handlers.keys())
+        return self._extension_handlers.keys()
     
     def get_all_supported_file_types(self) -> Set[FileType]:
         """
@@ -150,24 +182,27 @@ class HandlerRegistry:
         """
         return set(self._file_type_handlers.keys())
     
-    def get_registered_handlers(self) -> List[BaseDocumentHandler]:
+    def get_registered_handlers(self) -> Tuple[BaseDocumentHandler, ...]:
         """
         获取所有已注册的处理器
         
         Returns:
-            处理器列表
+            处理器元组（只读快照）
         """
-        return self._handlers.copy()
+        return self._handlers_tuple
     
     def print_registry_info(self):
-        """打印注册中心信息"""
-        print("\n=== 处理器注册中心信息 ===")
-        print(f"已注册处理器数量: {len(self._handlers)}")
+        """输出注册中心信息（日志级别低于INFO时跳过，避免无谓的格式化）"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        
+        logger.info("\n=== 处理器注册中心信息 ===")
+        logger.info("已注册处理器数量: %d", len(self._handlers))
         
         for i, handler in enumerate(self._handlers, 1):
-            print(f"\n{i}. {handler.get_handler_name()}")
-            print(f"   文件类型: {[ft.value for ft in handler.get_supported_file_types()]}")
-            print(f"   扩展名: {sorted(handler.get_supported_extensions())}")
+            logger.info("\n%d. %s", i, handler.get_handler_name())
+            logger.info("   文件类型: %s", [ft.value for ft in handler.get_supported_file_types()])
+            logger.info("   扩展名: %s", sorted(handler.get_supported_extensions()))
         
-        print(f"\n支持的所有扩展名: {sorted(self.get_all_supported_extensions())}")
-        print("========================\n") 
\ No newline at end of file
+        logger.info("\n支持的所有扩展名: %s", sorted(self.get_all_supported_extensions()))
+        logger.info("========================\n") 
\ No newline at end of file
@@ -2,11 +2,16 @@
 图片文档处理器
 使用SumatraPDF实现图片打印，支持各种图片格式的高效打印和页数统计
 """
+import importlib.util
+import logging
+import mmap
 import os
+import stat
 import sys
 import subprocess
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Set, Optional, Dict, Any
+from typing import List, Literal, Set, Optional, Dict, Any
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parents[2]
@@ -16,39 +21,175 @@ if str(project_root) not in sys.path:
 from src.core.models import FileType, Document
 from src.handlers.base_handler import BaseDocumentHandler
 
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
+logger = logging.getLogger(__name__)
+
+# PIL导入较慢，推迟到首次需要解析图片时加载（None表示尚未尝试导入）
+PIL_AVAILABLE: Optional[bool] = None
+_pil_image = None
+
+
+def _get_pil():
+    """
+    获取PIL的Image模块（首次调用时导入并缓存）
+    
+    Returns:
+        PIL.Image模块，未安装Pillow时返回None
+    """
+    global PIL_AVAILABLE, _pil_image
+    if PIL_AVAILABLE is None:
+        try:
+            from PIL import Image
+            _pil_image = Image
+            PIL_AVAILABLE = True
+        except ImportError:
+            PIL_AVAILABLE = False
+    return _pil_image
+
+
+# 常见图片格式的文件头标识（WEBP 需额外检查第8-12字节）
+_IMAGE_MAGIC_PREFIXES = (
+    b'\xff\xd8\xff',          # JPEG
+    b'\x89PNG\r\n\x1a\n',     # PNG
+    b'BM',                    # BMP
+    b'II*\x00',               # TIFF（小端）
+    b'MM\x00*',               # TIFF（大端）
+    b'GIF87a',                # GIF
+    b'GIF89a',                # GIF
+)
+_WEBP_RIFF = b'RIFF'
+_WEBP_TAG = b'WEBP'
+_IMAGE_HEADER_SIZE = 32
+
+# 可能包含多页的TIFF扩展名
+_TIFF_EXTENSIONS = frozenset({'.tiff', '.tif'})
+
+# SumatraPDF单个文件的打印超时（秒），批量调用按文件数累加
+_SUMATRA_TIMEOUT_PER_FILE = 30
+# 启动外部打印程序时不创建控制台窗口（仅Windows有此标志）
+_NO_WINDOW_FLAGS = getattr(subprocess, 'CREATE_NO_WINDOW', 0) if os.name == 'nt' else 0
+
+
+def _has_image_magic(path_str: str) -> Optional[bool]:
+    """
+    读取文件头判断是否为已知图片格式
+    
+    Args:
+        path_str: 文件路径
+        
+    Returns:
+        True表示文件头匹配已知图片格式，None表示无法仅凭文件头判断（如TGA、DIB）
+    """
+    with open(path_str, 'rb') as f:
+        header = f.read(_IMAGE_HEADER_SIZE)
+    
+    if header.startswith(_IMAGE_MAGIC_PREFIXES):
+        return True
+    if header.startswith(_WEBP_RIFF) and header[8:12] == _WEBP_TAG:
+        return True
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _verify_image(path_str: str, mtime_ns: int, size: int) -> bool:
+    """
+    校验图片文件（按路径、修改时间、大小缓存，同一文件只校验一次）
+    
+    优先只读取文件头判断格式，文件头无法判断时才使用PIL完整解析
+    
+    Args:
+        path_str: 文件路径
+        mtime_ns: 修改时间（纳秒），文件变化后缓存自动失效
+        size: 文件大小
+        
+    Returns:
+        是否为有效图片
+    """
+    try:
+        if _has_image_magic(path_str):
+            return True
+    except OSError:
+        return False
+    
+    Image = _get_pil()
+    if Image is None:
+        # 没有PIL时，仅基于扩展名判断
+        return True
+    
+    try:
+        with Image.open(path_str) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
+
+
+@lru_cache(maxsize=4096)
+def _count_tiff_pages_cached(path_str: str, mtime_ns: int, size: int) -> int:
+    """
+    使用PIL统计TIFF页数（缓存键同 _verify_image）
+    
+    Args:
+        path_str: 文件路径
+        mtime_ns: 修改时间（纳秒）
+        size: 文件大小
+        
+    Returns:
+        页数
+    """
+    # 通过内存映射读取，遍历IFD链时由系统页缓存提供数据，不再逐次调用read()
+    with open(path_str, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+            _get_pil().open(mm) as img:
+        # Pillow 直接提供帧数，无需逐页 seek
+        try:
+            return max(img.n_frames, 1)
+        except AttributeError:
+            pass
+        
+        page_count = 0
+        try:
+            while True:
+                img.seek(page_count)
+                page_count += 1
+        except EOFError:
+            # 到达文件末尾，正常结束
+            pass
+        
+        return max(page_count, 1)  # 至少返回1页
 
 
 class ImageDocumentHandler(BaseDocumentHandler):
     """基于SumatraPDF的图片文档处理器"""
     
-    def __init__(self):
-        """初始化图片处理器"""
+    def __init__(self, prefer_sumatra: bool = True):
+        """
+        初始化图片处理器
+        
+        Args:
+            prefer_sumatra: 是否优先使用SumatraPDF打印，为False时直接使用Windows系统方案
+        """
         super().__init__()
         
         # 支持的图片格式（SumatraPDF支持的格式）
-        self._supported_extensions = {
+        # 使用不可变集合，查询时直接返回共享引用
+        self._supported_extensions = frozenset({
             '.jpg', '.jpeg', '.png', '.gif', '.webp', 
             '.tiff', '.tif', '.tga', '.bmp', '.dib'
-        }
-        self._supported_file_types = {FileType.IMAGE}
+        })
+        self._supported_file_types = frozenset({FileType.IMAGE})
         
         # SumatraPDF路径
         self._sumatra_path = project_root / "external" / "SumatraPDF" / "SumatraPDF.exe"
-        self._sumatra_available = self._sumatra_path.exists()
+        self._sumatra_available = prefer_sumatra and self._sumatra_path.exists()
         
         if not self._sumatra_available:
-            print("⚠️ SumatraPDF不可用，图片打印将使用Windows系统方案")
+            logger.warning("⚠️ SumatraPDF不可用，图片打印将使用Windows系统方案")
             # 回退到Windows系统支持的格式
-            self._supported_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif'}
+            self._supported_extensions = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif'})
         
         # 如果PIL不可用，进一步限制格式
-        if not PIL_AVAILABLE:
-            print("⚠️ PIL/Pillow 未安装，多页TIFF支持受限")
+        if importlib.util.find_spec("PIL") is None:
+            logger.warning("⚠️ PIL/Pillow 未安装，多页TIFF支持受限")
     
     def get_handler_name(self) -> str:
         """获取处理器名称"""
@@ -58,139 +199,148 @@ class ImageDocumentHandler(BaseDocumentHandler):
     
     def get_supported_file_types(self) -> Set[FileType]:
         """获取支持的文件类型"""
-        return self._supported_file_types.copy()
+        return self._supported_file_types
     
     def get_supported_extensions(self) -> Set[str]:
         """获取支持的文件扩展名"""
-        return self._supported_extensions.copy()
+        return self._supported_extensions
     
-    def can_handle_file(self, file_path: Path) -> bool:
+    def can_handle_file(self, file_path: Path, file_stat: Optional[os.stat_result] = None) -> bool:
         """
         检查是否可以处理指定文件
         
         Args:
             file_path: 文件路径
+            file_stat: 调用方已获取的文件状态（可选，传入时不再重复访问文件系统）
             
         Returns:
             是否可以处理
         """
-        if not file_path.exists() or not file_path.is_file():
-            return False
-        
         extension = file_path.suffix.lower()
         if extension not in self._supported_extensions:
             return False
         
         # 基本的图片文件验证
         try:
+            # 只访问一次文件系统，后续校验复用同一份状态信息
+            if file_stat is None:
+                try:
+                    file_stat = file_path.stat()
+                except OSError:
+                    return False
+            if not stat.S_ISREG(file_stat.st_mode):
+                return False
+            
             # 检查文件大小（过滤掉异常小的文件）
-            if file_path.stat().st_size < 10:
+            if file_stat.st_size < 10:
                 return False
             
-            # 如果有PIL，进行更严格的验证
-            if PIL_AVAILABLE:
-                try:
-                    with Image.open(file_path) as img:
-                        img.verify()
-                    return True
-                except Exception:
-                    return False
-            else:
-                # 没有PIL时，仅基于扩展名判断
-                return True
+            # 检查文件头，必要时使用PIL验证（结果按文件缓存）
+            return _verify_image(str(file_path), file_stat.st_mtime_ns, file_stat.st_size)
                 
         except Exception as e:
-            print(f"验证图片文件失败 {file_path}: {e}")
+            logger.error("验证图片文件失败 %s: %s", file_path, e)
             return False
     
-    def count_pages(self, file_path: Path) -> int:
+    def count_pages(self, file_path: Path, file_stat: Optional[os.stat_result] = None,
+                    skip_validation: bool = False) -> int:
         """
         统计图片文件页数
         对于多数图片文件返回1页，但TIFF可能有多页
         
         Args:
             file_path: 文件路径
+            file_stat: 调用方已获取的文件状态（可选）
+            skip_validation: 调用方已通过 can_handle_file 校验时传入True，跳过重复校验
             
         Returns:
             页数
         """
-        if not self.can_handle_file(file_path):
+        if file_stat is None:
+            try:
+                file_stat = file_path.stat()
+            except OSError:
+                raise ValueError(f"无法处理的图片文件: {file_path}")
+        
+        if not skip_validation and not self.can_handle_file(file_path, file_stat):
             raise ValueError(f"无法处理的图片文件: {file_path}")
         
         # 检查是否为TIFF格式
-        extension = file_path.suffix.lower()
-        if extension in ['.tiff', '.tif']:
-            return self._count_tiff_pages(file_path)
+        if file_path.suffix.lower() in _TIFF_EXTENSIONS:
+            return self._count_tiff_pages(file_path, file_stat)
         
         # 其他图片格式固定为1页
         return 1
     
-    def _count_tiff_pages(self, file_path: Path) -> int:
+    def _count_tiff_pages(self, file_path: Path, file_stat: Optional[os.stat_result] = None) -> int:
         """
         统计TIFF文件的页数
         
         Args:
             file_path: TIFF文件路径
+            file_stat: 调用方已获取的文件状态（可选）
             
         Returns:
             页数
         """
         try:
-            if PIL_AVAILABLE:
-                # 使用PIL计算TIFF页数
-                with Image.open(file_path) as img:
-                    page_count = 0
-                    try:
-                        while True:
-                            img.seek(page_count)
-                            page_count += 1
-                    except EOFError:
-                        # 到达文件末尾，正常结束
-                        pass
-                    
-                    return max(page_count, 1)  # 至少返回1页
+            if _get_pil() is not None:
+                # 使用PIL计算TIFF页数（结果按文件缓存，打印时不再重复统计）
+                if file_stat is None:
+                    file_stat = file_path.stat()
+                return _count_tiff_pages_cached(str(file_path), file_stat.st_mtime_ns, file_stat.st_size)
             else:
                 # 没有PIL时，TIFF文件假设为1页
-                print(f"⚠️ 缺少PIL库，无法准确统计TIFF页数，假设为1页: {file_path.name}")
+                logger.warning("⚠️ 缺少PIL库，无法准确统计TIFF页数，假设为1页: %s", file_path.name)
                 return 1
                 
         except Exception as e:
-            print(f"统计TIFF页数失败 {file_path}: {e}")
+            logger.error("统计TIFF页数失败 %s: %s", file_path, e)
             return 1  # 失败时返回1页
     
-    def print_document(self, file_path: Path, settings: Any) -> bool:
+    def print_document(self, file_path: Path, settings: Any, skip_validation: bool = False) -> bool:
         """
         打印图片文档 - 智能打印策略：SumatraPDF优先，Windows系统备用
         
         Args:
             file_path: 文件路径
             settings: 打印设置
+            skip_validation: 调用方已通过 can_handle_file 校验时传入True，跳过重复校验
             
         Returns:
             打印是否成功
         """
         try:
-            if not self.can_handle_file(file_path):
+            if not skip_validation and not self.can_handle_file(file_path):
                 raise ValueError(f"无法处理的图片文件: {file_path}")
             
             # 主策略：SumatraPDF打印（优先）
             if self._sumatra_available:
-                print(f"🎯 使用SumatraPDF打印图片: {file_path.name}")
-                success = self._print_with_sumatra(file_path, settings)
+                logger.debug("🎯 使用SumatraPDF打印图片: %s", file_path.name)
+                success = self._print_with_sumatra([file_path], settings)
                 if success:
                     return True
-                print("⚠️ SumatraPDF打印失败，启用Windows系统备用方案...")
+                logger.warning("⚠️ SumatraPDF打印失败，启用Windows系统备用方案...")
             
             # 备用策略：Windows系统方案
-            print(f"🔄 使用Windows系统方案打印图片: {file_path.name}")
+            logger.debug("🔄 使用Windows系统方案打印图片: %s", file_path.name)
             return self._print_with_windows_system(file_path, settings)
                 
         except Exception as e:
-            print(f"✗ 打印图片文档失败 {file_path.name}: {e}")
+            logger.error("✗ 打印图片文档失败 %s: %s", file_path.name, e)
             return False
     
-    def _print_with_sumatra(self, file_path: Path, settings: Any) -> bool:
-        """使用SumatraPDF打印图片"""
+    def _print_with_sumatra(self, file_paths: List[Path], settings: Any) -> bool:
+        """
+        使用SumatraPDF打印图片（一次调用可打印多个文件）
+        
+        Args:
+            file_paths: 文件路径列表
+            settings: 打印设置
+            
+        Returns:
+            是否全部打印成功
+        """
         try:
             # 构建SumatraPDF命令
             cmd = [
@@ -199,47 +349,43 @@ class ImageDocumentHandler(BaseDocumentHandler):
                 "-silent"
             ]
             
-            # 图片打印设置
-            print_settings = []
-            print_settings.append(settings.duplex_mode_str)
-            print_settings.append(settings.orientation_str)
-            
-            if print_settings:
-                cmd.extend(["-print-settings", ",".join(print_settings)])
+            # 图片打印设置（双面、纸张方向）
+            cmd.extend(["-print-settings", settings.sumatra_settings_str])
             
-            cmd.append(str(file_path))
+            cmd.extend(str(file_path) for file_path in file_paths)
             
-            # 执行打印
+            # 执行打印（SumatraPDF没有有用的标准输出，只在失败时解码错误输出）
             result = subprocess.run(
                 cmd, 
-                capture_output=True, 
-                text=True, 
-                timeout=30
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=_SUMATRA_TIMEOUT_PER_FILE * len(file_paths),
+                creationflags=_NO_WINDOW_FLAGS
             )
             
             if result.returncode == 0:
-                print(f"✓ SumatraPDF图片打印成功: {file_path.name}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("✓ SumatraPDF图片打印成功: %s", ", ".join(file_path.name for file_path in file_paths))
                 return True
             else:
-                print(f"✗ SumatraPDF图片打印失败: {file_path.name}")
+                logger.error("✗ SumatraPDF图片打印失败: %s", ", ".join(file_path.name for file_path in file_paths))
                 if result.stderr:
-                    print(f"   错误信息: {result.stderr}")
+                    logger.error("   错误信息: %s", result.stderr.decode('utf-8', errors='replace'))
                 return False
                 
         except Exception as e:
-            print(f"✗ SumatraPDF图片打印异常: {e}")
+            logger.error("✗ SumatraPDF图片打印异常: %s", e)
             return False
     
     def _print_with_windows_system(self, file_path: Path, settings: Any) -> bool:
         """使用Windows系统方案打印图片（备用）"""
         try:
             # 检查是否为多页TIFF
-            extension = file_path.suffix.lower()
-            if extension in ['.tiff', '.tif']:
+            if file_path.suffix.lower() in _TIFF_EXTENSIONS:
                 page_count = self._count_tiff_pages(file_path)
                 if page_count > 1:
-                    print(f"⚠️ 检测到多页TIFF文件: {file_path.name} ({page_count}页)")
-                    print("   注意: Windows系统方案可能只能打印第一页")
+                    logger.warning("⚠️ 检测到多页TIFF文件: %s (%d页)", file_path.name, page_count)
+                    logger.warning("   注意: Windows系统方案可能只能打印第一页")
             
             if os.name == 'nt':  # Windows系统
                 try:
@@ -249,60 +395,69 @@ class ImageDocumentHandler(BaseDocumentHandler):
                         'shimgvw.dll,ImageView_PrintTo',
                         str(file_path),
                         settings.printer_name
-                    ], capture_output=True, text=True, timeout=30)
+                    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30,
+                       creationflags=_NO_WINDOW_FLAGS)
                     
                     if result.returncode == 0:
-                        print(f"✓ Windows系统图片打印成功: {file_path.name}")
+                        logger.debug("✓ Windows系统图片打印成功: %s", file_path.name)
                         return True
                     else:
-                        print(f"✗ Windows系统打印命令失败，使用默认程序打开")
+                        logger.warning("✗ Windows系统打印命令失败，使用默认程序打开")
                         # 备用方案：使用系统默认程序打开
                         os.startfile(str(file_path), 'print')
-                        print(f"✓ 已使用默认程序打开图片: {file_path.name} (请手动打印)")
+                        logger.warning("✓ 已使用默认程序打开图片: %s (请手动打印)", file_path.name)
                         return True
                         
                 except Exception as e:
-                    print(f"✗ Windows图片打印失败: {e}")
+                    logger.error("✗ Windows图片打印失败: %s", e)
                     # 最后的备用方案：直接打开文件
                     try:
                         os.startfile(str(file_path))
-                        print(f"✓ 已打开图片文件: {file_path.name} (请手动打印)")
+                        logger.warning("✓ 已打开图片文件: %s (请手动打印)", file_path.name)
                         return True
                     except Exception as e2:
-                        print(f"✗ 打开图片文件失败: {e2}")
+                        logger.error("✗ 打开图片文件失败: %s", e2)
                         return False
             else:
                 # 非Windows系统的处理
-                print(f"✗ 非Windows系统，图片打印功能需要手动实现")
+                logger.error("✗ 非Windows系统，图片打印功能需要手动实现")
                 return False
                 
         except Exception as e:
-            print(f"✗ Windows系统图片打印异常: {e}")
+            logger.error("✗ Windows系统图片打印异常: %s", e)
             return False
     
-    def get_file_info(self, file_path: Path) -> Dict[str, Any]:
+    def get_file_info(self, file_path: Path, detail: Literal['basic', 'full'] = 'basic') -> Dict[str, Any]:
         """
         获取图片文件信息
         
         Args:
             file_path: 文件路径
+            detail: 信息详细程度，'basic' 只包含大小、格式和页数；
+                    'full' 额外使用PIL读取尺寸和颜色模式
             
         Returns:
             文件信息字典
         """
+        # 整个信息收集过程只获取一次文件状态
+        file_stat = file_path.stat()
         info = {
             'file_path': str(file_path),
             'file_name': file_path.name,
-            'file_size': file_path.stat().st_size,
-            'pages': self.count_pages(file_path),
+            'file_size': file_stat.st_size,
+            'pages': self.count_pages(file_path, file_stat),
             'format': file_path.suffix.upper().lstrip('.'),
             'dimensions': None,
             'color_mode': None,
             'handler': self.get_handler_name()
         }
         
-        # 如果有PIL，获取更详细的信息
-        if PIL_AVAILABLE and self.can_handle_file(file_path):
+        if detail != 'full':
+            return info
+        
+        # 如果有PIL，获取更详细的信息（count_pages 已完成文件校验）
+        Image = _get_pil()
+        if Image is not None:
             try:
                 with Image.open(file_path) as img:
                     info['dimensions'] = f"{img.width} x {img.height}"
@@ -313,7 +468,7 @@ class ImageDocumentHandler(BaseDocumentHandler):
                         info['format'] = img.format
                         
             except Exception as e:
-                print(f"获取图片详细信息失败 {file_path}: {e}")
+                logger.warning("获取图片详细信息失败 %s: %s", file_path, e)
         
         return info
     
@@ -330,11 +485,12 @@ class ImageDocumentHandler(BaseDocumentHandler):
         errors = []
         
         # 检查打印机名称
-        if not hasattr(print_settings, 'printer_name') or not print_settings.printer_name:
+        if not getattr(print_settings, 'printer_name', None):
             errors.append("未指定打印机")
         
         # 图片打印建议设置
-        if hasattr(print_settings, 'color_mode') and print_settings.color_mode.value == 'grayscale':
-            print("💡 提示: 建议图片使用彩色打印以获得最佳效果")
+        color_mode = getattr(print_settings, 'color_mode', None)
+        if color_mode is not None and color_mode.value == 'grayscale':
+            logger.info("💡 提示: 建议图片使用彩色打印以获得最佳效果")
         
         return len(errors) == 0, errors 
\ No newline at end of file
@@ -3,40 +3,325 @@ PDF文档处理器 - 基于SumatraPDF绿色版的可靠打印方案
 集成SumatraPDF绿色版，提供高兼容性的PDF打印支持
 支持系统关联和SumatraPDF双重方案
 """
+import logging
+import os
+import re
 import subprocess
 import time
+from io import BytesIO
 from pathlib import Path
-from typing import Set, Optional
+from typing import Dict, List, Set, Optional, Tuple
 from ..core.models import FileType, PrintSettings
 from .base_handler import BaseDocumentHandler
 
+logger = logging.getLogger(__name__)
+
+# pywin32在模块加载时导入一次，方法中通过标志判断是否可用
+try:
+    import win32print
+    _HAS_PYWIN32 = True
+except ImportError:
+    win32print = None
+    _HAS_PYWIN32 = False
+
+# 打印队列工具依赖pywin32，不可用时提交打印后改为固定等待
+if _HAS_PYWIN32:
+    from . import print_utils
+else:
+    print_utils = None
+
+# PyMuPDF 直接从 MuPDF 引擎读取页数，比 PyPDF2 构建完整页面树快得多
+try:
+    import fitz
+    FITZ_AVAILABLE = True
+except ImportError:
+    FITZ_AVAILABLE = False
+
+# 不超过此大小的PDF整体读入内存后交给PyPDF2解析，避免大量小块磁盘读取
+_IN_MEMORY_PDF_LIMIT = 100 * 1024 * 1024
+# 加密PDF的尾部字典中包含 /Encrypt 引用或内联字典，只需扫描文件末尾即可判断
+_ENCRYPT_RE = re.compile(rb"/Encrypt\s*(?:\d+\s+\d+\s+R|<<)")
+_ENCRYPT_SCAN_SIZE = 4096
+
+# 直接解析trailer统计页数所用的模式（只处理传统xref表，其余情况交给PDF库）
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+_XREF_SUBSECTION_RE = re.compile(rb"(\d+)\s+(\d+)\s*\r?\n")
+_XREF_ENTRY_RE = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+_ROOT_RE = re.compile(rb"/Root\s+(\d+)\s+(\d+)\s+R")
+_PREV_RE = re.compile(rb"/Prev\s+(\d+)")
+_PAGES_RE = re.compile(rb"/Pages\s+(\d+)\s+(\d+)\s+R")
+# (?!\d) 阻止数字回溯：否则间接引用 "/Count 15 0 R" 会被截成 "1" 而通过后面的否定断言
+_COUNT_RE = re.compile(rb"/Count\s+(\d+)(?!\d)(?!\s+\d+\s+R)")
+_RAW_TAIL_SIZE = 1024
+_RAW_OBJECT_READ_SIZE = 4096
+_RAW_OBJECT_MAX_SIZE = 64 * 1024
+_XREF_ENTRY_SIZE = 20
+# 启动外部程序时不创建控制台窗口（仅Windows有此标志）
+_NO_WINDOW_FLAGS = getattr(subprocess, 'CREATE_NO_WINDOW', 0) if os.name == 'nt' else 0
+
+
+def _read_xref_offset(file, xref_offset: int, obj_num: int) -> Optional[int]:
+    """
+    在传统xref表（沿 /Prev 链）中查找对象的文件偏移
+    
+    xref表项固定为20字节，按子段起始编号直接计算目标表项位置，无需读取整张表
+    
+    Args:
+        file: 以二进制模式打开的PDF文件
+        xref_offset: startxref 指向的xref表偏移
+        obj_num: 对象编号
+        
+    Returns:
+        对象偏移，无法确定时返回None
+    """
+    visited = set()
+    while xref_offset not in visited:
+        visited.add(xref_offset)
+        file.seek(xref_offset)
+        if file.read(4) != b'xref':
+            return None  # xref流（PDF 1.5+）不在此处理
+        
+        pos = xref_offset + 4
+        while True:
+            file.seek(pos)
+            raw = file.read(64)
+            head = raw.lstrip()
+            pos += len(raw) - len(head)
+            
+            if head.startswith(b'trailer'):
+                # 本段未找到，沿 /Prev 继续查找更早的xref表
+                file.seek(pos)
+                trailer = file.read(_RAW_OBJECT_READ_SIZE)
+                end = trailer.find(b'startxref')
+                prev = _PREV_RE.search(trailer if end < 0 else trailer[:end])
+                if prev is None:
+                    return None
+                xref_offset = int(prev.group(1))
+                break
+            
+            match = _XREF_SUBSECTION_RE.match(head)
+            if match is None:
+                return None
+            start, count = int(match.group(1)), int(match.group(2))
+            entries_pos = pos + match.end()
+            if start <= obj_num < start + count:
+                file.seek(entries_pos + (obj_num - start) * _XREF_ENTRY_SIZE)
+                entry = _XREF_ENTRY_RE.match(file.read(_XREF_ENTRY_SIZE))
+                if entry is None or entry.group(3) != b'n':
+                    return None
+                return int(entry.group(1))
+            pos = entries_pos + count * _XREF_ENTRY_SIZE
+    return None
+
+
+def _read_object(file, offset: int) -> Optional[bytes]:
+    """
+    读取从 offset 开始到 endobj 为止的对象内容
+    
+    Args:
+        file: 以二进制模式打开的PDF文件
+        offset: 对象偏移
+        
+    Returns:
+        对象内容，超过读取上限仍未结束时返回None
+    """
+    file.seek(offset)
+    data = b''
+    while len(data) < _RAW_OBJECT_MAX_SIZE:
+        chunk = file.read(_RAW_OBJECT_READ_SIZE)
+        if not chunk:
+            break
+        data += chunk
+        end = data.find(b'endobj')
+        if end >= 0:
+            return data[:end]
+    return None
+
+
+def _read_trailer(file, xref_offset: int) -> Optional[bytes]:
+    """
+    读取传统xref表之后的trailer字典（到 startxref 为止）
+    
+    Args:
+        file: 以二进制模式打开的PDF文件
+        xref_offset: xref表偏移
+        
+    Returns:
+        trailer内容，不是传统xref表或找不到trailer时返回None
+    """
+    file.seek(xref_offset)
+    if file.read(4) != b'xref':
+        return None
+    data = file.read(_RAW_OBJECT_MAX_SIZE)
+    start = data.find(b'trailer')
+    if start < 0:
+        return None
+    end = data.find(b'startxref', start)
+    return data[start:end] if end >= 0 else data[start:]
+
+
+def _count_pages_raw(path_str: str) -> Optional[int]:
+    """
+    直接读取trailer → 文档目录 → 页面树根节点的 /Count，不加载PDF库
+    
+    只处理使用传统xref表的文件；xref流、压缩对象、间接引用的 /Count 等情况返回None，
+    由调用方改用PyMuPDF或PyPDF2统计。
+    沿 /Prev 链检查每个trailer，含 /Encrypt 时同样返回None（线性化文件的加密字典
+    位于文件开头的首页trailer中，末尾扫描发现不了）
+    
+    Args:
+        path_str: PDF文件路径
+        
+    Returns:
+        页数，无法直接确定时返回None
+    """
+    try:
+        with open(path_str, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            file.seek(max(0, size - _RAW_TAIL_SIZE))
+            startxrefs = _STARTXREF_RE.findall(file.read())
+            if not startxrefs:
+                return None
+            xref_offset = int(startxrefs[-1])
+            
+            # 最新的trailer中读取文档目录
+            trailer = _read_trailer(file, xref_offset)
+            if trailer is None:
+                return None
+            root = _ROOT_RE.search(trailer)
+            if root is None:
+                return None
+            
+            # 任一trailer含加密字典时交给PDF库判断
+            visited = {xref_offset}
+            prev_trailer = trailer
+            while True:
+                if _ENCRYPT_RE.search(prev_trailer):
+                    return None
+                prev = _PREV_RE.search(prev_trailer)
+                if prev is None or int(prev.group(1)) in visited:
+                    break
+                visited.add(int(prev.group(1)))
+                prev_trailer = _read_trailer(file, int(prev.group(1)))
+                if prev_trailer is None:
+                    return None
+            
+            root_offset = _read_xref_offset(file, xref_offset, int(root.group(1)))
+            root_obj = _read_object(file, root_offset) if root_offset is not None else None
+            pages = _PAGES_RE.search(root_obj) if root_obj else None
+            if pages is None:
+                return None
+            
+            pages_offset = _read_xref_offset(file, xref_offset, int(pages.group(1)))
+            pages_obj = _read_object(file, pages_offset) if pages_offset is not None else None
+            count = _COUNT_RE.search(pages_obj) if pages_obj else None
+            if count is None:
+                return None
+            return int(count.group(1))
+    except (OSError, ValueError):
+        return None
+
+
+def _is_encrypted_fast(path_str: str) -> bool:
+    """
+    扫描文件末尾的trailer判断PDF是否加密，无需完整解析文件
+    
+    Args:
+        path_str: PDF文件路径
+        
+    Returns:
+        是否包含加密字典
+    """
+    with open(path_str, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        file.seek(max(0, size - _ENCRYPT_SCAN_SIZE))
+        return _ENCRYPT_RE.search(file.read()) is not None
+
+
+def _open_fitz(path_str: str):
+    """
+    使用PyMuPDF打开PDF
+    
+    直接按路径打开，由MuPDF按需读取trailer和xref所在的文件块；
+    以 stream 方式传入时PyMuPDF会先把内容复制成完整的内存缓冲区。
+    指定 filetype 可跳过文件类型探测。
+    
+    Args:
+        path_str: PDF文件路径
+        
+    Returns:
+        fitz.Document 对象
+    """
+    return fitz.open(path_str, filetype="pdf")
+
+
+def _count_pages_pypdf2(path_str: str) -> int:
+    """
+    使用PyPDF2统计页数（小文件先读入内存，超大文件直接按文件句柄解析）
+    
+    Args:
+        path_str: PDF文件路径
+        
+    Returns:
+        页数
+        
+    Raises:
+        ValueError: 文件被加密且需要密码
+    """
+    from PyPDF2 import PdfReader
+    
+    with open(path_str, 'rb') as file:
+        if os.fstat(file.fileno()).st_size <= _IN_MEMORY_PDF_LIMIT:
+            reader = PdfReader(BytesIO(file.read()))
+        else:
+            reader = PdfReader(file)
+        
+        # 只设置了权限密码的文件可以用空密码打开
+        # （is_encrypted 由已解析的trailer得出，不依赖文件末尾扫描，线性化或xref流文件也能识别）
+        if reader.is_encrypted and not reader.decrypt(''):
+            raise ValueError("文件被加密")
+        return len(reader.pages)
+
 
 class PDFDocumentHandler(BaseDocumentHandler):
     """PDF文档处理器 - 集成SumatraPDF绿色版"""
     
+    # 页数缓存（路径、修改时间、大小），各处理器实例共享，重复扫描同一目录时无需再次解析
+    _page_count_cache: Dict[Tuple[str, int, int], int] = {}
+    
+    # SumatraPDF存放路径
+    _sumatra_dir = Path("external/SumatraPDF")
+    _sumatra_exe = _sumatra_dir / "SumatraPDF.exe"
+    # 外部程序查找结果（每个进程只查找一次）
+    _tools_discovered = False
+    _sumatra_path: Optional[str] = None
+    
     def __init__(self):
         """初始化PDF处理器"""
         self._timeout_seconds = 30
-        self._sumatra_path = None
         self._setup_sumatra_pdf()
     
+    @classmethod
+    def _discover_tools(cls):
+        """查找外部打印程序并缓存结果，后续创建实例或打印时不再访问文件系统"""
+        if cls._tools_discovered:
+            return
+        
+        cls._sumatra_path = str(cls._sumatra_exe) if cls._sumatra_exe.exists() else None
+        cls._tools_discovered = True
+    
     def _setup_sumatra_pdf(self):
         """设置SumatraPDF环境"""
-        # SumatraPDF存放路径
-        self._sumatra_dir = Path("external/SumatraPDF")
-        self._sumatra_exe = self._sumatra_dir / "SumatraPDF.exe"
-        
-        # 检查是否已存在
-        if self._sumatra_exe.exists():
-            self._sumatra_path = str(self._sumatra_exe)
-            print(f"✅ SumatraPDF已就绪: {self._sumatra_exe}")
+        self._discover_tools()
+        
+        if self._sumatra_path:
+            logger.debug("✅ SumatraPDF已就绪: %s", self._sumatra_exe)
         else:
-            self._sumatra_path = None
-            print(f"❌ SumatraPDF未找到: {self._sumatra_exe}")
+            logger.warning("❌ SumatraPDF未找到: %s", self._sumatra_exe)
     
     def ensure_sumatra_available(self) -> bool:
-        """确保SumatraPDF可用"""
-        return self._sumatra_path and Path(self._sumatra_path).exists()
+        """确保SumatraPDF可用（使用缓存的查找结果）"""
+        return self._sumatra_path is not None
     
 
     
@@ -67,32 +352,30 @@ class PDFDocumentHandler(BaseDocumentHandler):
         Returns:
             是否打印成功
         """
-        print(f"🖨️ 开始打印PDF文件: {file_path.name}")
+        logger.info("🖨️ 开始打印PDF文件: %s", file_path.name)
         
         # 获取打印机名称
         printer_name = self._get_printer_name(settings)
         if not printer_name:
-            print("❌ 无法获取打印机")
+            logger.error("❌ 无法获取打印机")
             return False
         
-        print(f"📋 使用打印机: {printer_name}")
+        logger.debug("📋 使用打印机: %s", printer_name)
         
         # 使用SumatraPDF打印
         if self.ensure_sumatra_available():
-            return self._print_with_sumatra_pdf(file_path, printer_name, settings)
+            return self._print_with_sumatra_pdf([file_path], printer_name, settings)
         else:
-            print("❌ SumatraPDF不可用，请检查安装")
+            logger.error("❌ SumatraPDF不可用，请检查安装")
             return False
     
-    def _print_with_sumatra_pdf(self, file_path: Path, printer_name: str, settings: PrintSettings) -> bool:
-        """使用SumatraPDF打印 - 支持完整的打印设置"""
+    def _print_with_sumatra_pdf(self, file_paths: List[Path], printer_name: str, settings: PrintSettings) -> bool:
+        """使用SumatraPDF打印 - 支持完整的打印设置，一次调用可打印多个文件"""
         try:
             if not self._sumatra_path:
-                print("❌ SumatraPDF路径未设置")
+                logger.error("❌ SumatraPDF路径未设置")
                 return False
             
-            print(f"🖨️ 使用SumatraPDF打印: {file_path.name}")
-            
             # 构建SumatraPDF命令行参数
             cmd = [
                 self._sumatra_path,
@@ -100,56 +383,58 @@ class PDFDocumentHandler(BaseDocumentHandler):
                 "-silent"  # 静默模式
             ]
             
-            # 构建打印设置
-            print_settings = []
+            # 打印设置（双面、纸张方向）
+            cmd.extend(["-print-settings", settings.sumatra_settings_str])
             
-            # 双面打印设置
-            print_settings.append(settings.duplex_mode_str)
+            # 添加文件路径
+            cmd.extend(str(file_path) for file_path in file_paths)
             
-            # 纸张方向设置
-            print_settings.append(settings.orientation_str)
+            # 显示打印设置信息
+            logger.debug("📄 双面设置: %s", settings.duplex_mode_str)
+            logger.debug("📐 纸张方向: %s", settings.orientation_str)
+            logger.debug("🔢 打印份数: %s", settings.copies)
+            logger.debug("🎨 色彩模式: %s", '彩色' if settings.color else '黑白')
             
-            # 如果有打印设置，添加到命令中
-            if print_settings:
-                cmd.extend(["-print-settings", ",".join(print_settings)])
+            logger.debug("🔧 SumatraPDF命令: %s", cmd)
             
-            # 添加文件路径
-            cmd.append(str(file_path))
+            # 记录打印前的队列作业，提交后轮询新作业入队，而不是固定等待
+            queue_snapshot = print_utils.snapshot_print_queue(printer_name) if print_utils else None
             
-            # 显示打印设置信息
-            print(f"📄 双面设置: {settings.duplex_mode_str}")
-            print(f"📐 纸张方向: {settings.orientation_str}")
-            print(f"🔢 打印份数: {settings.copies}")
-            print(f"🎨 色彩模式: {'彩色' if settings.color else '黑白'}")
-            
-            print(f"🔧 SumatraPDF命令: {' '.join(cmd)}")
-            
-            # 执行打印命令
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=self._timeout_seconds
-            )
-            
-            if result.returncode == 0:
-                print("✅ SumatraPDF打印命令执行成功")
-                # 等待打印作业完成
-                time.sleep(2)
-                return True
-            else:
-                print(f"❌ SumatraPDF打印失败:")
-                if result.stdout:
-                    print(f"   输出: {result.stdout}")
-                if result.stderr:
-                    print(f"   错误: {result.stderr}")
-                return False
+            try:
+                # 执行打印命令
+                # SumatraPDF没有有用的标准输出，只保留错误输出用于失败诊断
+                result = subprocess.run(
+                    cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    timeout=self._timeout_seconds * len(file_paths),
+                    creationflags=_NO_WINDOW_FLAGS
+                )
+                
+                if result.returncode == 0:
+                    logger.info("✅ SumatraPDF打印成功: %d 个文件", len(file_paths))
+                    # 等待打印作业进入队列（最多2秒）
+                    if print_utils:
+                        print_utils.wait_for_queued_job(queue_snapshot, timeout=2.0)
+                        queue_snapshot = None
+                    else:
+                        time.sleep(2)
+                    return True
+                else:
+                    logger.error("❌ SumatraPDF打印失败: %s", ', '.join(file_path.name for file_path in file_paths))
+                    if result.stderr:
+                        logger.error("   错误: %s", result.stderr)
+                    return False
+            finally:
+                if print_utils:
+                    print_utils.release_print_queue(queue_snapshot)
                 
         except subprocess.TimeoutExpired:
-            print(f"❌ SumatraPDF打印超时（{self._timeout_seconds}秒）")
+            logger.error("❌ SumatraPDF打印超时（%d秒）", self._timeout_seconds * len(file_paths))
             return False
         except Exception as e:
-            print(f"❌ SumatraPDF打印异常: {e}")
+            logger.error("❌ SumatraPDF打印异常: %s", e)
             return False
     
 
@@ -160,29 +445,28 @@ class PDFDocumentHandler(BaseDocumentHandler):
             return settings.printer_name
             
         try:
-            import win32print
+            if not _HAS_PYWIN32:
+                raise ImportError("缺少pywin32库")
             return win32print.GetDefaultPrinter()
         except Exception as e:
-            print(f"⚠️ 获取默认打印机失败: {e}")
+            logger.warning("⚠️ 获取默认打印机失败: %s", e)
             
-            # 备用方案：使用PowerShell获取默认打印机
-            try:
-                result = subprocess.run(
-                    ['powershell', '-Command', 'Get-WmiObject -Class Win32_Printer | Where-Object {$_.Default -eq $true} | Select-Object -ExpandProperty Name'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                if result.returncode == 0 and result.stdout.strip():
-                    return result.stdout.strip()
-            except Exception:
-                pass
+            # 备用方案：未设置默认打印机时使用第一台本地或网络打印机
+            if _HAS_PYWIN32:
+                try:
+                    printers = win32print.EnumPrinters(
+                        win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS
+                    )
+                    if printers:
+                        return printers[0][2]
+                except Exception:
+                    pass
                 
             return None
     
     def count_pages(self, file_path: Path) -> int:
         """
-        统计PDF页数 - 使用PyPDF2高效解析
+        统计PDF页数 - 优先使用PyMuPDF，未安装时使用PyPDF2
         
         Args:
             file_path: PDF文件路径
@@ -190,22 +474,66 @@ class PDFDocumentHandler(BaseDocumentHandler):
         Returns:
             页数，失败返回-1
         """
-        return self._count_pages_with_pypdf2(file_path)
+        try:
+            stat = file_path.stat()
+        except OSError as e:
+            logger.warning("⚠️ PDF页数统计失败: %s", e)
+            return -1
+        
+        key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+        cached = self._page_count_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        page_count = self._count_pages_fast(file_path)
+        if page_count >= 0:
+            self._page_count_cache[key] = page_count
+        return page_count
+    
+    def _count_pages_fast(self, file_path: Path) -> int:
+        """使用PyMuPDF统计页数（未安装时回退到PyPDF2）"""
+        try:
+            # 先扫描文件末尾，未发现加密字典的文件（绝大多数）尝试直接读取页面树
+            # 线性化文件的加密字典可能不在末尾，由 _count_pages_raw 沿trailer链再检查；
+            # xref流文件无法直接解析，交给PDF库判断
+            encrypted = _is_encrypted_fast(str(file_path))
+        except OSError as e:
+            logger.warning("⚠️ PDF页数统计失败: %s", e)
+            return -1
+        
+        # 未加密的传统xref文件直接读取页面树的 /Count
+        if not encrypted:
+            page_count = _count_pages_raw(str(file_path))
+            if page_count is not None:
+                logger.debug("📄 PDF页数统计成功: %d", page_count)
+                return page_count
+        
+        if not FITZ_AVAILABLE:
+            return self._count_pages_with_pypdf2(file_path)
+        
+        try:
+            with _open_fitz(str(file_path)) as doc:
+                if doc.needs_pass:
+                    logger.warning("⚠️ PDF文件被加密，无法统计页数: %s", file_path.name)
+                    return -1
+                page_count = doc.page_count
+                logger.debug("📄 PDF页数统计成功: %d", page_count)
+                return page_count
+                
+        except Exception as e:
+            logger.warning("⚠️ PDF页数统计失败: %s", e)
+            return -1
     
     def _count_pages_with_pypdf2(self, file_path: Path) -> int:
         """使用PyPDF2统计页数"""
         try:
-            from PyPDF2 import PdfReader
-            
-            with open(file_path, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                page_count = len(pdf_reader.pages)
-                print(f"📄 PDF页数统计成功: {page_count}")
-                return page_count
+            page_count = _count_pages_pypdf2(str(file_path))
+            logger.debug("📄 PDF页数统计成功: %d", page_count)
+            return page_count
                 
         except ImportError:
-            print("⚠️ 缺少PyPDF2库，无法统计PDF页数")
+            logger.warning("⚠️ 缺少PyPDF2库，无法统计PDF页数")
             return -1
         except Exception as e:
-            print(f"⚠️ PDF页数统计失败: {e}")
+            logger.warning("⚠️ PDF页数统计失败: %s", e)
             return -1 
\ No newline at end of file
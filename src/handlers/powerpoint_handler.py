@@ -2,12 +2,238 @@
 PowerPoint文档处理器
 负责PowerPoint文件的打印和页数统计
 """
+import atexit
+import logging
+import struct
+import threading
 import time
+import zipfile
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Set, Optional
 from ..core.models import FileType, PrintSettings
 from .base_handler import BaseDocumentHandler
 
+logger = logging.getLogger(__name__)
+
+# olefile 可选，用于不启动PowerPoint直接读取 .ppt 的幻灯片数
+try:
+    import olefile
+    OLEFILE_AVAILABLE = True
+except ImportError:
+    OLEFILE_AVAILABLE = False
+
+
+class _PPTAppPool:
+    """
+    PowerPoint应用程序池
+    
+    批量处理期间所有文件复用同一个PowerPoint实例（PowerPoint为单实例服务器，
+    各线程持有各自的COM代理，指向同一进程），最后一次使用后空闲超时才退出应用。
+    """
+    
+    def __init__(self, idle_timeout: float = 30.0):
+        """
+        初始化应用程序池
+        
+        Args:
+            idle_timeout: 空闲多少秒后退出PowerPoint
+        """
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()  # 每个线程的COM代理（COM对象不能跨线程使用）
+        self._generation = 0  # 应用退出后递增，使各线程缓存的代理失效
+        self._refcount = 0
+        self._idle_timer: Optional[threading.Timer] = None
+    
+    @contextmanager
+    def acquire(self, visible: bool = False):
+        """
+        获取PowerPoint应用程序对象
+        
+        用法:
+            with _ppt_pool.acquire(visible=True) as app:
+                ...
+        
+        Args:
+            visible: 是否显示PowerPoint窗口
+        """
+        import win32com.client
+        
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self._refcount += 1
+            generation = self._generation
+        
+        try:
+            self.init_thread()
+            
+            local = self._local
+            app = getattr(local, 'app', None)
+            if app is None or local.generation != generation or not self._is_alive(app):
+                app = win32com.client.Dispatch("PowerPoint.Application")
+                if getattr(local, 'app', None) is None:
+                    from .com_utils import on_com_uninitialize
+                    on_com_uninitialize(self._release_thread_app)
+                local.app = app
+                local.generation = generation
+            
+            try:
+                app.Visible = visible
+            except Exception:
+                # PowerPoint不允许隐藏已有窗口时沿用当前状态
+                pass
+            
+            yield app
+        finally:
+            with self._lock:
+                self._refcount -= 1
+            self.schedule_idle_quit()
+    
+    def init_thread(self):
+        """当前线程首次使用时初始化COM，线程内后续调用复用"""
+        from .com_utils import ensure_com_initialized
+        ensure_com_initialized()
+    
+    def _release_thread_app(self):
+        """释放当前线程缓存的COM代理（COM反初始化前调用）"""
+        self._local.app = None
+    
+    def schedule_idle_quit(self):
+        """没有使用者时启动空闲计时器，超时后退出PowerPoint"""
+        with self._lock:
+            if self._refcount > 0 or self._idle_timer is not None:
+                return
+            self._idle_timer = threading.Timer(self._idle_timeout, self._quit_if_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+    
+    @staticmethod
+    def _is_alive(app) -> bool:
+        """检查缓存的应用程序对象是否仍然可用（用户可能手动关闭了PowerPoint）"""
+        try:
+            app.Version
+            return True
+        except Exception:
+            return False
+    
+    def _quit_if_idle(self):
+        """空闲超时后退出PowerPoint（在计时器线程中执行，连接到正在运行的实例）"""
+        with self._lock:
+            if self._refcount > 0:
+                return
+            self._idle_timer = None
+            self._generation += 1
+            
+            try:
+                import pythoncom
+                import win32com.client
+            except ImportError:
+                return
+            
+            pythoncom.CoInitialize()
+            try:
+                app = win32com.client.GetActiveObject("PowerPoint.Application")
+                # 用户自己打开的演示文稿仍在时不退出
+                if app.Presentations.Count == 0:
+                    app.Quit()
+                app = None
+            except Exception:
+                pass
+            finally:
+                pythoncom.CoUninitialize()
+    
+    def shutdown(self):
+        """取消空闲计时器并立即退出空闲的PowerPoint（程序退出时调用）"""
+        with self._lock:
+            timer = self._idle_timer
+            self._idle_timer = None
+        if timer is not None:
+            timer.cancel()
+            self._quit_if_idle()
+
+
+# 模块级共享的应用程序池
+_ppt_pool = _PPTAppPool()
+atexit.register(_ppt_pool.shutdown)
+
+# .pptx 演示文稿部件及其幻灯片列表（sldIdLst 中的 sldId 才是演示文稿实际包含的幻灯片，
+# 其它工具删除幻灯片后可能残留未引用的 slideN.xml 部件）
+_PRESENTATION_PART = 'ppt/presentation.xml'
+_PML_NS = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+_SLD_ID_TAG = _PML_NS + 'sldId'
+_SLD_ID_LST_TAG = _PML_NS + 'sldIdLst'
+
+# .ppt 记录头：recVer/recInstance、recType、recLen
+_PPT_RECORD_HEADER = struct.Struct('<HHI')
+_RT_DOCUMENT = 0x03E8
+_RT_SLIDE_PERSIST_ATOM = 0x03F3
+_RT_SLIDE_LIST_WITH_TEXT = 0x0FF0
+
+
+def _iter_ppt_records(data: bytes, start: int, end: int):
+    """
+    遍历 .ppt 记录流中 [start, end) 范围内的同级记录
+    
+    Yields:
+        (recInstance, recType, 记录体起始位置, 记录体长度)
+    """
+    pos = start
+    while pos + 8 <= end:
+        ver_inst, rec_type, rec_len = _PPT_RECORD_HEADER.unpack_from(data, pos)
+        body = pos + 8
+        if body + rec_len > end:
+            return
+        yield ver_inst >> 4, rec_type, body, rec_len
+        pos = body + rec_len
+
+
+def _count_ppt_slides_ole(path_str: str) -> Optional[int]:
+    """
+    解析 .ppt 的 "PowerPoint Document" 流统计幻灯片数
+    
+    取最后一个（快速保存时为最新的）DocumentContainer，统计其中幻灯片列表
+    （SlideListWithText，instance 0）里的 SlidePersistAtom 数量
+    
+    Args:
+        path_str: 文件路径
+        
+    Returns:
+        幻灯片数量，未安装olefile或无法解析（如加密文件）时返回None
+    """
+    if not OLEFILE_AVAILABLE:
+        return None
+    
+    try:
+        if not olefile.isOleFile(path_str):
+            return None
+        with olefile.OleFileIO(path_str) as ole:
+            if not ole.exists('PowerPoint Document'):
+                return None
+            data = ole.openstream('PowerPoint Document').read()
+    except Exception:
+        return None
+    
+    document = None
+    for _, rec_type, body, rec_len in _iter_ppt_records(data, 0, len(data)):
+        if rec_type == _RT_DOCUMENT:
+            document = (body, body + rec_len)
+    if document is None:
+        return None
+    
+    for instance, rec_type, body, rec_len in _iter_ppt_records(data, *document):
+        if rec_type == _RT_SLIDE_LIST_WITH_TEXT and instance == 0:
+            return sum(
+                1 for _, child_type, _, _ in _iter_ppt_records(data, body, body + rec_len)
+                if child_type == _RT_SLIDE_PERSIST_ATOM
+            )
+    
+    # 没有幻灯片列表即为空演示文稿
+    return 0
+
 
 class PowerPointDocumentHandler(BaseDocumentHandler):
     """PowerPoint文档处理器"""
@@ -43,104 +269,111 @@ class PowerPointDocumentHandler(BaseDocumentHandler):
         Returns:
             是否打印成功
         """
-        import time
-        
         try:
-            import comtypes.client
+            logger.debug("开始打印PowerPoint文档: %s", file_path)
             
-            print(f"开始打印PowerPoint文档: {file_path}")
+            # 从应用程序池获取PowerPoint（不可见模式，静默打印），批量打印时复用同一实例
+            with _ppt_pool.acquire(visible=False) as ppt:
+                self._print_with_app(ppt, file_path, settings)
             
-            # 创建PowerPoint应用程序对象
-            ppt = comtypes.client.CreateObject("PowerPoint.Application")
+            logger.debug("✅ PowerPoint文档打印成功: %s", file_path.name)
+            return True
+                
+        except ImportError:
+            logger.error("❌ 缺少pywin32库，无法打印PowerPoint文档")
+            return False
+        except Exception as e:
+            logger.error("❌ PowerPoint文档打印失败: %s", e)
+            return False
+    
+    def _print_with_app(self, ppt, file_path: Path, settings: PrintSettings):
+        """
+        使用已获取的PowerPoint应用程序打印文档
+        
+        Args:
+            ppt: PowerPoint应用程序对象
+            file_path: PowerPoint文件路径
+            settings: 打印设置
+        """
+        try:
+            ppt.WindowState = 2  # ppWindowMinimized
+        except Exception:
+            pass
+        
+        presentation = None
+        foreground = False  # 是否已设置为前台打印
+        
+        try:
+            # 打开演示文稿
+            presentation = ppt.Presentations.Open(
+                str(file_path),
+                ReadOnly=True,
+                Untitled=False,
+                WithWindow=False  # 不显示窗口
+            )
             
-            # 设置为不可见模式（静默打印）
+            # 设置打印参数
             try:
-                ppt.Visible = False
-                ppt.WindowState = 2  # ppWindowMinimized
-            except Exception:
-                # 如果设置不可见失败，继续执行但会显示界面
-                print("⚠️ 无法设置PowerPoint为隐藏模式，将显示界面")
+                # 使用更明确的打印机设置方式
+                if settings.printer_name:
+                    presentation.PrintOptions.ActivePrinter = settings.printer_name
+                    logger.debug("🖨️ 设置PowerPoint打印机: %s", settings.printer_name)
+                
+                presentation.PrintOptions.NumberOfCopies = settings.copies
+                
+                # 验证系统级双面打印设置
+                if settings.duplex:
+                    try:
+                        # 验证结果按打印机缓存，同一批次只查询一次打印后台
+                        from .print_utils import verify_printer_duplex_setting
+                        verify_printer_duplex_setting(settings.printer_name, "PowerPoint")
+                    except Exception as duplex_check:
+                        logger.warning("⚠️ PowerPoint双面打印验证失败: %s", duplex_check)
+                
+                # 强制前台打印，确保打印作业真正发送
+                presentation.PrintOptions.PrintInBackground = False
+                foreground = True
+                logger.debug("✅ PowerPoint打印设置完成（强制前台打印）")
+                
+            except Exception as print_error:
+                logger.warning("⚠️ 设置打印参数失败，使用默认设置: %s", print_error)
             
-            presentation = None
+            # 记录打印前的队列作业，提交后轮询新作业入队，而不是固定等待
+            queue_snapshot = None
+            try:
+                import win32print
+                from .print_utils import snapshot_print_queue
+                queue_snapshot = snapshot_print_queue(settings.printer_name or win32print.GetDefaultPrinter())
+            except Exception as queue_error:
+                logger.warning("⚠️ 无法读取打印队列，将固定等待: %s", queue_error)
             
+            # 执行打印 - 使用简单可靠的方式
+            logger.debug("📤 正在发送PowerPoint打印作业...")
             try:
-                # 打开演示文稿
-                presentation = ppt.Presentations.Open(
-                    str(file_path),
-                    ReadOnly=True,
-                    Untitled=False,
-                    WithWindow=False  # 不显示窗口
-                )
-                
-                # 设置打印参数
-                try:
-                    # 使用更明确的打印机设置方式
-                    if settings.printer_name:
-                        presentation.PrintOptions.ActivePrinter = settings.printer_name
-                        print(f"🖨️ 设置PowerPoint打印机: {settings.printer_name}")
-                    
-                    presentation.PrintOptions.NumberOfCopies = settings.copies
-                    
-                    # 验证系统级双面打印设置
-                    if settings.duplex:
-                        try:
-                            import win32print
-                            printer_handle = win32print.OpenPrinter(settings.printer_name)
-                            try:
-                                printer_info = win32print.GetPrinter(printer_handle, 2)
-                                devmode = printer_info.get('pDevMode')
-                                if devmode and hasattr(devmode, 'Duplex'):
-                                    print(f"🔍 PowerPoint打印前验证: 打印机双面设置为 {devmode.Duplex}")
-                            finally:
-                                win32print.ClosePrinter(printer_handle)
-                        except Exception as duplex_check:
-                            print(f"⚠️ PowerPoint双面打印验证失败: {duplex_check}")
-                    
-                    # 强制前台打印，确保打印作业真正发送
-                    presentation.PrintOptions.PrintInBackground = False
-                    print(f"✅ PowerPoint打印设置完成（强制前台打印）")
-                    
-                except Exception as print_error:
-                    print(f"⚠️ 设置打印参数失败，使用默认设置: {print_error}")
-                
-                # 执行打印 - 使用简单可靠的方式
-                print("📤 正在发送PowerPoint打印作业...")
                 presentation.PrintOut()
-                print("✅ PowerPoint打印作业已发送到打印机")
-                
-                # 等待打印队列处理
+            except Exception:
+                if queue_snapshot is not None:
+                    from .print_utils import release_print_queue
+                    release_print_queue(queue_snapshot)
+                raise
+            logger.debug("✅ PowerPoint打印作业已发送到打印机")
+            
+            # 等待打印作业进入队列（最多3秒）；前台打印时 PrintOut 返回即已完成假脱机，无法读取队列也无需等待
+            if queue_snapshot is not None:
+                from .print_utils import wait_for_queued_job
+                wait_for_queued_job(queue_snapshot, timeout=3.0)
+            elif not foreground:
                 time.sleep(3)
-                
-                print(f"✅ PowerPoint文档打印成功: {file_path.name}")
-                return True
-                
-            finally:
-                # 关闭演示文稿
-                try:
-                    if presentation is not None:
-                        presentation.Close()
-                        presentation = None
-                        print("📁 PowerPoint文档已关闭")
-                except Exception as close_error:
-                    print(f"⚠️ 关闭PowerPoint文档时出错: {close_error}")
-                
-                # 退出PowerPoint应用程序
-                try:
-                    ppt.Quit()
-                    print("🔚 PowerPoint应用程序已退出")
-                    
-                    # 等待PowerPoint完全关闭
-                    time.sleep(1)
-                    
-                except Exception as quit_error:
-                    print(f"⚠️ 退出PowerPoint应用程序时出错: {quit_error}")
-                
-        except ImportError:
-            print("❌ 缺少comtypes库，无法打印PowerPoint文档")
-            return False
-        except Exception as e:
-            print(f"❌ PowerPoint文档打印失败: {e}")
-            return False
+            
+        finally:
+            # 关闭演示文稿（应用程序由池管理，空闲超时后才退出）
+            try:
+                if presentation is not None:
+                    presentation.Close()
+                    presentation = None
+                    logger.debug("📁 PowerPoint文档已关闭")
+            except Exception as close_error:
+                logger.warning("⚠️ 关闭PowerPoint文档时出错: %s", close_error)
     
     def count_pages(self, file_path: Path) -> int:
         """
@@ -157,8 +390,11 @@ class PowerPointDocumentHandler(BaseDocumentHandler):
         """
         file_extension = file_path.suffix.lower()
         
-        # 对于.ppt文件，优先使用COM方式（兼容性更好）
+        # 对于.ppt文件，先直接解析OLE记录流，失败时使用COM方式（兼容性更好）
         if file_extension == '.ppt':
+            slides_count = _count_ppt_slides_ole(str(file_path))
+            if slides_count is not None:
+                return slides_count
             try:
                 return self._calculate_ppt_pages_com(file_path)
             except Exception as com_error:
@@ -191,8 +427,37 @@ class PowerPointDocumentHandler(BaseDocumentHandler):
                 # 再尝试COM方式
                 return self._calculate_ppt_pages_com(file_path)
     
+    def _count_slides_via_zip(self, file_path: Path) -> Optional[int]:
+        """
+        直接读取 .pptx 压缩包中 presentation.xml 的幻灯片列表统计幻灯片数，无需加载python-pptx
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            幻灯片数量，不是有效的 .pptx 压缩包（如加密文件）时返回None
+        """
+        try:
+            with zipfile.ZipFile(file_path) as zf:
+                with zf.open(_PRESENTATION_PART) as part:
+                    count = 0
+                    for _, elem in ET.iterparse(part):
+                        if elem.tag == _SLD_ID_TAG:
+                            count += 1
+                        elif elem.tag == _SLD_ID_LST_TAG:
+                            # 幻灯片列表之后的内容无需解析
+                            break
+                    return count
+        except (KeyError, zipfile.BadZipFile, ET.ParseError, OSError):
+            return None
+    
     def _calculate_ppt_pages_pptx(self, file_path: Path) -> int:
         """使用python-pptx库计算PowerPoint幻灯片数"""
+        # 有效的 .pptx 压缩包只需读取目录即可得到幻灯片数
+        slides_count = self._count_slides_via_zip(file_path)
+        if slides_count is not None:
+            return slides_count
+        
         try:
             from pptx import Presentation
             
@@ -238,120 +503,61 @@ class PowerPointDocumentHandler(BaseDocumentHandler):
     
     def _try_com_method_visible(self, abs_path: Path) -> int:
         """可见模式COM方式（专为.ppt文件设计）"""
-        import win32com.client
-        import pythoncom
-        import time
-        
-        ppt_app = None
-        presentation = None
-        
-        try:
-            # 初始化COM
-            pythoncom.CoInitialize()
-            
-            # 创建PowerPoint应用程序实例（可见模式）
-            ppt_app = win32com.client.Dispatch("PowerPoint.Application")
-            ppt_app.Visible = True  # 对于.ppt文件，使用可见模式
-            
-            try:
-                # 打开演示文稿
-                presentation = ppt_app.Presentations.Open(
-                    str(abs_path),
-                    ReadOnly=True,
-                    Untitled=False,
-                    WithWindow=True
-                )
-                
-                # 获取幻灯片数量
-                slides_count = presentation.Slides.Count
-                
-                # 验证结果的合理性
-                if slides_count < 0:
-                    raise Exception("获取到无效的幻灯片数量")
-                
-                return slides_count
-                
-            except Exception as open_error:
-                error_str = str(open_error).lower()
-                if ("password" in error_str or "protected" in error_str or 
-                    "access" in error_str or "permission" in error_str or
-                    "encrypted" in error_str or "locked" in error_str):
-                    raise Exception("文件被加密")
-                else:
-                    raise Exception("文件已损坏")
-                
-        except ImportError:
-            raise Exception("需要安装pywin32库来处理PowerPoint文档")
-        except Exception as e:
-            if "文件被加密" in str(e) or "文件已损坏" in str(e):
-                raise e
-            else:
-                raise Exception("文件已损坏")
-        finally:
-            # 强制清理所有COM对象
-            try:
-                if presentation is not None:
-                    presentation.Close()
-                    presentation = None
-            except:
-                pass
-            
-            try:
-                if ppt_app is not None:
-                    ppt_app.Quit()
-                    ppt_app = None
-            except:
-                pass
-            
-            # 清理COM
-            try:
-                pythoncom.CoUninitialize()
-            except:
-                pass
+        return self._count_slides_with_pool(abs_path, visible=True)
     
     def _try_com_method_standard(self, abs_path: Path) -> int:
         """标准隐藏模式COM方式（专为.pptx文件设计）"""
-        import win32com.client
-        import pythoncom
-        import time
+        return self._count_slides_with_pool(abs_path, visible=False)
+    
+    def _count_slides_with_pool(self, abs_path: Path, visible: bool) -> int:
+        """
+        使用应用程序池中的PowerPoint统计幻灯片数
         
-        ppt_app = None
+        Args:
+            abs_path: 文件绝对路径
+            visible: 是否使用可见模式打开
+            
+        Returns:
+            幻灯片数量
+        """
         presentation = None
         
         try:
-            # 初始化COM
-            pythoncom.CoInitialize()
-            
-            # 创建PowerPoint应用程序实例（隐藏模式）
-            ppt_app = win32com.client.Dispatch("PowerPoint.Application")
-            ppt_app.Visible = False  # 对于.pptx文件，使用隐藏模式
-            
-            try:
-                # 打开演示文稿
-                presentation = ppt_app.Presentations.Open(
-                    str(abs_path),
-                    ReadOnly=True,
-                    Untitled=False,
-                    WithWindow=False
-                )
-                
-                # 获取幻灯片数量
-                slides_count = presentation.Slides.Count
-                
-                # 验证结果的合理性
-                if slides_count < 0:
-                    raise Exception("获取到无效的幻灯片数量")
-                
-                return slides_count
-                
-            except Exception as open_error:
-                error_str = str(open_error).lower()
-                if ("password" in error_str or "protected" in error_str or 
-                    "access" in error_str or "permission" in error_str or
-                    "encrypted" in error_str or "locked" in error_str):
-                    raise Exception("文件被加密")
-                else:
-                    raise Exception("文件已损坏")
+            with _ppt_pool.acquire(visible=visible) as ppt_app:
+                try:
+                    # 打开演示文稿
+                    presentation = ppt_app.Presentations.Open(
+                        str(abs_path),
+                        ReadOnly=True,
+                        Untitled=False,
+                        WithWindow=visible
+                    )
+                    
+                    # 获取幻灯片数量
+                    slides_count = presentation.Slides.Count
+                    
+                    # 验证结果的合理性
+                    if slides_count < 0:
+                        raise Exception("获取到无效的幻灯片数量")
+                    
+                    return slides_count
+                    
+                except Exception as open_error:
+                    error_str = str(open_error).lower()
+                    if ("password" in error_str or "protected" in error_str or 
+                        "access" in error_str or "permission" in error_str or
+                        "encrypted" in error_str or "locked" in error_str):
+                        raise Exception("文件被加密")
+                    else:
+                        raise Exception("文件已损坏")
+                finally:
+                    # 只关闭演示文稿，应用程序留在池中供后续文件复用
+                    try:
+                        if presentation is not None:
+                            presentation.Close()
+                            presentation = None
+                    except:
+                        pass
                 
         except ImportError:
             raise Exception("需要安装pywin32库来处理PowerPoint文档")
@@ -360,24 +566,3 @@ class PowerPointDocumentHandler(BaseDocumentHandler):
                 raise e
             else:
                 raise Exception("文件已损坏")
-        finally:
-            # 强制清理所有COM对象
-            try:
-                if presentation is not None:
-                    presentation.Close()
-                    presentation = None
-            except:
-                pass
-            
-            try:
-                if ppt_app is not None:
-                    ppt_app.Quit()
-                    ppt_app = None
-            except:
-                pass
-            
-            # 清理COM
-            try:
-                pythoncom.CoUninitialize()
-            except:
-                pass 
\ No newline at end of file
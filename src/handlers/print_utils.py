@@ -2,22 +2,42 @@
 打印工具模块
 提供通用的打印机验证和配置函数
 """
+import logging
+import time
 import win32print
-from typing import Optional
+from typing import Any, Dict, Optional, Set, Tuple
 from ..core.models import PrintSettings
 
+logger = logging.getLogger(__name__)
+
+# 各打印机的双面设置验证结果，同一批次内只向打印后台查询一次
+_printer_duplex_cache: Dict[str, Optional[int]] = {}
+
+
+def clear_printer_duplex_cache():
+    """清空双面设置验证缓存（批量打印开始、打印机配置变化后调用）"""
+    _printer_duplex_cache.clear()
+
 
 def verify_printer_duplex_setting(printer_name: str, handler_name: str = "") -> Optional[int]:
     """
     验证打印机的双面打印设置
     
+    验证结果只用于调试输出，未开启调试日志时直接跳过，不向打印后台发起查询
+    
     Args:
         printer_name: 打印机名称
         handler_name: 处理器名称（用于日志）
         
     Returns:
-        双面打印设置值（1=单面, 2=长边, 3=短边），如果失败返回None
+        双面打印设置值（1=单面, 2=长边, 3=短边），如果失败或未开启调试日志返回None
     """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return None
+    
+    if printer_name in _printer_duplex_cache:
+        return _printer_duplex_cache[printer_name]
+    
     try:
         printer_handle = win32print.OpenPrinter(printer_name)
         try:
@@ -26,15 +46,17 @@ def verify_printer_duplex_setting(printer_name: str, handler_name: str = "") ->
             if devmode and hasattr(devmode, 'Duplex'):
                 duplex_value = devmode.Duplex
                 duplex_name = {1: "单面", 2: "双面长边", 3: "双面短边"}.get(duplex_value, f"未知({duplex_value})")
-                print(f"🔍 {handler_name}打印前验证: 打印机双面设置为 {duplex_value} ({duplex_name})")
+                logger.debug("🔍 %s打印前验证: 打印机双面设置为 %s (%s)", handler_name, duplex_value, duplex_name)
+                _printer_duplex_cache[printer_name] = duplex_value
                 return duplex_value
             else:
-                print(f"⚠️ {handler_name}无法获取打印机双面设置")
+                logger.debug("⚠️ %s无法获取打印机双面设置", handler_name)
+                _printer_duplex_cache[printer_name] = None
                 return None
         finally:
             win32print.ClosePrinter(printer_handle)
     except Exception as e:
-        print(f"⚠️ {handler_name}双面打印验证失败: {e}")
+        logger.debug("⚠️ %s双面打印验证失败: %s", handler_name, e)
         return None
 
 
@@ -76,4 +98,99 @@ def log_print_error(file_path, handler_name: str, error: Exception):
         handler_name: 处理器名称  
         error: 错误信息
     """
-    print(f"❌ {handler_name}打印失败 {file_path.name}: {error}") 
\ No newline at end of file
+    print(f"❌ {handler_name}打印失败 {file_path.name}: {error}") 
+
+
+def get_print_job_ids(printer_handle) -> Set[int]:
+    """
+    获取打印队列中当前作业ID集合
+    
+    Args:
+        printer_handle: 打印机句柄
+        
+    Returns:
+        作业ID集合，查询失败时返回空集合
+    """
+    try:
+        return {job['JobId'] for job in win32print.EnumJobs(printer_handle, 0, 99, 1)}
+    except Exception:
+        return set()
+
+
+def wait_for_new_print_job(printer_handle, known_job_ids: Set[int],
+                           timeout: float = 2.0, poll_interval: float = 0.1) -> bool:
+    """
+    轮询打印队列，出现新作业后立即返回
+    
+    Args:
+        printer_handle: 打印机句柄
+        known_job_ids: 提交打印前已存在的作业ID
+        timeout: 最长等待时间（秒）
+        poll_interval: 轮询间隔（秒）
+        
+    Returns:
+        是否在超时前检测到新作业
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if get_print_job_ids(printer_handle) - known_job_ids:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_interval)
+
+
+def snapshot_print_queue(printer_name: str) -> Optional[Tuple[Any, Set[int]]]:
+    """
+    打开打印机并记录当前队列中的作业，用于提交打印后判断新作业是否已入队
+    
+    Args:
+        printer_name: 打印机名称
+        
+    Returns:
+        (打印机句柄, 作业ID集合)，无法打开打印机时返回None
+    """
+    try:
+        printer_handle = win32print.OpenPrinter(printer_name)
+    except Exception:
+        return None
+    return printer_handle, get_print_job_ids(printer_handle)
+
+
+def wait_for_queued_job(snapshot: Optional[Tuple[Any, Set[int]]], timeout: float,
+                        poll_interval: float = 0.05) -> bool:
+    """
+    等待新作业进入打印队列并关闭打印机句柄（无法读取队列时固定等待 timeout 秒）
+    
+    Args:
+        snapshot: snapshot_print_queue 的返回值
+        timeout: 最长等待时间（秒）
+        poll_interval: 轮询间隔（秒）
+        
+    Returns:
+        是否在超时前检测到新作业
+    """
+    if snapshot is None:
+        time.sleep(timeout)
+        return False
+    
+    printer_handle, known_job_ids = snapshot
+    try:
+        return wait_for_new_print_job(printer_handle, known_job_ids, timeout, poll_interval)
+    finally:
+        release_print_queue(snapshot)
+
+
+def release_print_queue(snapshot: Optional[Tuple[Any, Set[int]]]):
+    """
+    关闭 snapshot_print_queue 打开的打印机句柄（打印失败、不再等待时调用）
+    
+    Args:
+        snapshot: snapshot_print_queue 的返回值
+    """
+    if snapshot is None:
+        return
+    try:
+        win32print.ClosePrinter(snapshot[0])
+    except Exception:
+        pass
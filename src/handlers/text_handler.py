@@ -2,11 +2,15 @@
 文本文档处理器
 处理TXT文件的打印和页数统计功能
 """
+import logging
+import mmap
 import os
+import re
+import stat
 import sys
 import subprocess
 from pathlib import Path
-from typing import Set, Dict, Any
+from typing import Set, Dict, Any, Optional, Tuple
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parents[2]
@@ -16,6 +20,111 @@ if str(project_root) not in sys.path:
 from src.core.models import FileType
 from src.handlers.base_handler import BaseDocumentHandler
 
+logger = logging.getLogger(__name__)
+
+# charset-normalizer 可选，一次探测文件编码，避免逐个编码尝试完整解码
+try:
+    from charset_normalizer import from_bytes
+    CHARSET_NORMALIZER_AVAILABLE = True
+except ImportError:
+    CHARSET_NORMALIZER_AVAILABLE = False
+
+# 未安装 charset-normalizer 时依次尝试的编码
+_TXT_ENCODINGS = ('utf-8', 'gbk', 'gb2312', 'utf-16', 'utf-16le', 'latin1')
+# 字节顺序标记及对应编码（有BOM时无需探测）
+_BOM_ENCODINGS = (
+    (b'\xef\xbb\xbf', 'utf-8-sig'),
+    (b'\xff\xfe', 'utf-16'),
+    (b'\xfe\xff', 'utf-16'),
+)
+# 编码探测读取的字节数
+_ENCODING_PROBE_SIZE = 16384
+
+# 视为文本的字节：空白控制符、可打印ASCII，以及多字节编码使用的高位字节
+_TEXT_BYTES = bytes([0x09, 0x0A, 0x0B, 0x0C, 0x0D, 0x1C, 0x1D, 0x1E, 0x1F]) + bytes(range(0x20, 0x7F)) + bytes(range(0x80, 0x100))
+
+# 匹配每行去除行尾空白后的内容（与 line.rstrip() 等价），只取匹配跨度，不创建子字符串
+_EFFECTIVE_LINE_RE = re.compile(r'^(?:.*\S)?', re.M)
+
+# 非ASCII字节
+_NON_ASCII_RE = re.compile(rb'[\x80-\xff]')
+
+# 无需解码统计页数时，每次从内存映射中切出的字节数
+_NEWLINE_COUNT_CHUNK = 1 << 20
+
+# NumPy 可选，用于批量计算每行自动换行后占用的行数；
+# Numba 可选，将纯ASCII文本的逐字节换行统计编译为机器码。
+# 两者都在首次统计页数时才导入（Numba 需加载LLVM，模块级导入会明显拖慢程序启动）
+_np = None
+_page_kernel = None
+_accel_loaded = False
+
+
+def _count_ascii_pages(buf, chars_per_line, lines_per_page):
+    """
+    单次遍历字节缓冲区统计页数（与逐行 rstrip 后按每行字符数换行的计算结果一致）
+    
+    由 _load_accel 编译为Numba内核；页面参数作为参数传入，所有页面布局共用一份编译结果
+    
+    Args:
+        buf: uint8 数组（纯ASCII文本，每个字节即一个字符）
+        chars_per_line: 每行字符数
+        lines_per_page: 每页行数
+        
+    Returns:
+        页数
+    """
+    total = 0
+    current = 0
+    trailing = 0
+    for b in buf:
+        if b == 0x0A:
+            effective = current - trailing
+            wrapped = (effective + chars_per_line - 1) // chars_per_line
+            total += wrapped if wrapped > 1 else 1
+            current = 0
+            trailing = 0
+        elif (0x09 <= b <= 0x0D) or (0x1C <= b <= 0x20):
+            # rstrip 会去除的空白字符
+            current += 1
+            trailing += 1
+        else:
+            current += 1
+            trailing = 0
+    
+    # 最后一行（split('\n') 总会产生最后一个元素）
+    effective = current - trailing
+    wrapped = (effective + chars_per_line - 1) // chars_per_line
+    total += wrapped if wrapped > 1 else 1
+    
+    pages = (total + lines_per_page - 1) // lines_per_page
+    return pages if pages > 1 else 1
+
+
+def _load_accel():
+    """
+    导入 NumPy 并编译 Numba 页数统计内核（首次调用时执行并缓存，未安装时对应变量保持为None）
+    """
+    global _np, _page_kernel, _accel_loaded
+    if _accel_loaded:
+        return
+    _accel_loaded = True
+    try:
+        import numpy
+    except ImportError:
+        return
+    _np = numpy
+    try:
+        from numba import njit
+    except ImportError:
+        return
+    try:
+        # 编译结果缓存到磁盘，之后启动程序无需重新编译
+        _page_kernel = njit(cache=True)(_count_ascii_pages)
+    except RuntimeError:
+        # 打包后没有源文件，无法使用磁盘缓存
+        _page_kernel = njit(_count_ascii_pages)
+
 
 class TextDocumentHandler(BaseDocumentHandler):
     """文本文档处理器"""
@@ -32,6 +141,17 @@ class TextDocumentHandler(BaseDocumentHandler):
         self._chars_per_line = 75  # 每行字符数（考虑打印边距）
         self._lines_per_page = 50  # 每页行数（考虑页边距）
         
+        # 超过每行字符数的行（按字节计），用于判断能否跳过解码直接统计换行符
+        self._long_line_re = re.compile(rb"[^\n]{%d,}" % (self._chars_per_line + 1))
+        # 超过每行字符数的行（按字符计），用于已解码内容
+        self._long_text_line_re = re.compile(r"[^\n]{%d,}" % (self._chars_per_line + 1))
+        
+        # 以下缓存均以（路径、修改时间、大小）为键，文件变化后自动失效
+        self._encoding_cache: Dict[Tuple[str, int, int], str] = {}  # 编码探测结果
+        self._valid_cache: Dict[Tuple[str, int, int], bool] = {}  # 文件校验结果
+        self._page_cache: Dict[Tuple[str, int, int], int] = {}  # 页数统计结果
+        self._analysis_cache: Dict[Tuple[str, int, int], Dict[str, Any]] = {}  # 编码、行数、页数
+        
     def get_handler_name(self) -> str:
         """获取处理器名称"""
         return "文本文档处理器"
@@ -54,62 +174,99 @@ class TextDocumentHandler(BaseDocumentHandler):
         Returns:
             是否可以处理
         """
-        if not file_path.exists() or not file_path.is_file():
-            return False
-        
         extension = file_path.suffix.lower()
         if extension not in self._supported_extensions:
             return False
         
+        key = self._cache_key(file_path)
+        if key is None:
+            return False
+        
+        cached = self._valid_cache.get(key)
+        if cached is not None:
+            return cached
+        
         # 基本文件验证
         try:
             # 检查文件大小（避免处理过大的文本文件）
-            file_size_mb = file_path.stat().st_size / (1024 * 1024)
+            file_size_mb = key[2] / (1024 * 1024)
             if file_size_mb > 100:  # 限制100MB
-                print(f"文本文件过大: {file_path.name} ({file_size_mb:.1f}MB)")
-                return False
-            
-            # 验证TXT文件编码
-            return self._validate_txt_file(file_path)
+                logger.warning("文本文件过大: %s (%.1fMB)", file_path.name, file_size_mb)
+                valid = False
+            else:
+                # 验证TXT文件编码
+                valid = self._validate_txt_file(file_path)
                 
         except Exception as e:
-            print(f"验证文本文件失败 {file_path}: {e}")
+            logger.error("验证文本文件失败 %s: %s", file_path, e)
             return False
+        
+        self._valid_cache[key] = valid
+        return valid
+    
+    @staticmethod
+    def _cache_key(file_path: Path) -> Optional[Tuple[str, int, int]]:
+        """
+        生成缓存键（路径、修改时间、大小）
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            缓存键，文件不存在或不是普通文件时返回None
+        """
+        try:
+            file_stat = file_path.stat()
+        except OSError:
+            return None
+        if not stat.S_ISREG(file_stat.st_mode):
+            return None
+        return str(file_path), file_stat.st_mtime_ns, file_stat.st_size
     
     def _validate_txt_file(self, file_path: Path) -> bool:
         """验证TXT文件"""
         try:
-            # 尝试用不同编码读取文件开头
-            encodings = ['utf-8', 'gbk', 'gb2312', 'utf-16', 'latin1']
+            # 只读取文件开头（前4KB），直接在字节上判断（latin1 可解码任意字节，无需逐个尝试编码）
+            with open(file_path, 'rb') as f:
+                head = f.read(4096)
             
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        # 读取前2KB验证编码
-                        content = f.read(2048)
-                        # 检查是否包含大量二进制字符（可能不是文本文件）
-                        if self._is_likely_text(content):
-                            return True
-                except (UnicodeDecodeError, UnicodeError):
-                    continue
+            # 带BOM的文件即为文本文件
+            if head.startswith(tuple(bom for bom, _ in _BOM_ENCODINGS)):
+                return True
             
-            print(f"无法识别TXT文件编码或疑似二进制文件: {file_path.name}")
+            # 检查是否包含大量二进制字符（可能不是文本文件）
+            if self._is_likely_text(head):
+                return True
+            
+            logger.warning("无法识别TXT文件编码或疑似二进制文件: %s", file_path.name)
             return False
             
         except Exception:
             return False
     
-    def _is_likely_text(self, content: str) -> bool:
-        """判断内容是否为文本"""
-        if not content:
+    def _is_likely_text(self, data: bytes) -> bool:
+        """
+        判断字节内容是否为文本
+        
+        Args:
+            data: 文件开头的原始字节
+            
+        Returns:
+            是否为文本
+        """
+        # UTF-16 文本的NUL字节全部落在奇数位（LE）或偶数位（BE），去掉后按单字节判断
+        nul_count = data.count(0)
+        if nul_count and nul_count in (data[0::2].count(0), data[1::2].count(0)):
+            data = data.replace(b'\x00', b'')
+        
+        if not data:
             return True
         
-        # 计算可打印字符的比例
-        printable_chars = sum(1 for c in content if c.isprintable() or c.isspace())
-        ratio = printable_chars / len(content)
+        # translate 删除所有文本字节，剩下的即为二进制字节
+        binary_bytes = len(data.translate(None, _TEXT_BYTES))
         
-        # 如果80%以上是可打印字符，认为是文本文件
-        return ratio >= 0.8
+        # 如果80%以上是文本字节，认为是文本文件
+        return binary_bytes <= len(data) * 0.2
     
     def count_pages(self, file_path: Path) -> int:
         """
@@ -124,53 +281,192 @@ class TextDocumentHandler(BaseDocumentHandler):
         if not self.can_handle_file(file_path):
             raise ValueError(f"无法处理的文本文件: {file_path}")
         
-        return self._count_txt_pages(file_path)
+        key = self._cache_key(file_path)
+        cached = self._page_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        pages = self._count_txt_pages(file_path)
+        if key is not None:
+            self._page_cache[key] = pages
+        return pages
+    
+    def _count_pages_without_decoding(self, file_path: Path) -> Optional[int]:
+        """
+        不解码文件，直接在内存映射上计算页数（不把文件读入内存）
+        
+        所有行的字节数都不超过每行字符数时不会发生自动换行，页数只取决于行数；
+        存在长行的纯ASCII文件每个字节对应一个字符，可直接在映射上运行Numba内核。
+        含NUL字节的文件（如UTF-16）中0x0A不一定是换行符，不走此路径。
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            页数，需要解码才能统计（非ASCII长行文本）或无法判断时返回None
+        """
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return 1
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm.find(b'\x00') >= 0:
+                    return None
+                
+                if not self._long_line_re.search(mm):
+                    # mmap 没有 count 方法，分块切片后统计换行符
+                    total_lines = 1
+                    for start in range(0, len(mm), _NEWLINE_COUNT_CHUNK):
+                        total_lines += mm[start:start + _NEWLINE_COUNT_CHUNK].count(b'\n')
+                else:
+                    _load_accel()
+                    if _page_kernel is None or _NON_ASCII_RE.search(mm):
+                        return None
+                    buf = _np.frombuffer(mm, dtype=_np.uint8)
+                    pages = int(_page_kernel(buf, self._chars_per_line, self._lines_per_page))
+                    # 关闭映射前必须释放数组对映射缓冲区的引用
+                    del buf
+                    return pages
+        
+        pages = (total_lines + self._lines_per_page - 1) // self._lines_per_page
+        return max(pages, 1)
     
     def _count_txt_pages(self, file_path: Path) -> int:
         """统计TXT文件页数（估算）"""
         try:
-            # 检测文件编码并读取内容
-            content = self._read_txt_with_encoding(file_path)
-            if not content:
-                return 1
+            # 常见情况（短行文本）无需解码即可得到页数
+            pages = self._count_pages_without_decoding(file_path)
+            if pages is not None:
+                return pages
             
-            # 按行分割
-            lines = content.split('\n')
-            total_lines = 0
+            return self._analyze(file_path)['pages']
             
-            for line in lines:
-                # 计算每行实际占用的行数（考虑自动换行）
-                line_length = len(line.rstrip())  # 去除行尾空格
-                if line_length == 0:
-                    total_lines += 1  # 空行
-                else:
-                    # 计算自动换行导致的行数
-                    wrapped_lines = (line_length + self._chars_per_line - 1) // self._chars_per_line
-                    total_lines += max(wrapped_lines, 1)
+        except Exception as e:
+            logger.error("TXT页数统计失败 %s: %s", file_path, e)
+            return 1
+    
+    def _analyze(self, file_path: Path) -> Dict[str, Any]:
+        """
+        读取并分析TXT文件（文件只读取、解码一次，结果按文件缓存）
+        
+        Args:
+            file_path: 文件路径
             
-            # 计算页数
-            pages = (total_lines + self._lines_per_page - 1) // self._lines_per_page
-            return max(pages, 1)
+        Returns:
+            包含 encoding、lines、pages 的字典
             
-        except Exception as e:
-            print(f"TXT页数统计失败 {file_path}: {e}")
+        Raises:
+            ValueError: 无法解码文件
+        """
+        with open(file_path, 'rb') as f:
+            file_stat = os.fstat(f.fileno())
+            key = (str(file_path), file_stat.st_mtime_ns, file_stat.st_size)
+            cached = self._analysis_cache.get(key)
+            if cached is not None:
+                return cached
+            raw = f.read()
+        
+        encoding = self._encoding_cache.get(key)
+        if encoding is not None:
+            content = raw.decode(encoding, errors='replace')
+        else:
+            content, encoding = self._decode_txt(raw)
+            if content is None:
+                raise ValueError(f"无法解码文件: {file_path}")
+            self._encoding_cache[key] = encoding
+        
+        result = {
+            'encoding': encoding,
+            'lines': content.count('\n') + 1,
+            'pages': self._pages_from_content(content, raw),
+        }
+        self._analysis_cache[key] = result
+        self._page_cache[key] = result['pages']
+        return result
+    
+    def _pages_from_content(self, content: str, raw: bytes) -> int:
+        """
+        根据已解码的内容计算页数（考虑自动换行）
+        
+        Args:
+            content: 解码后的文件内容
+            raw: 文件原始字节
+            
+        Returns:
+            页数
+        """
+        if not content:
             return 1
+        
+        chars_per_line = self._chars_per_line
+        
+        # 纯ASCII文本每个字节对应一个字符，直接在原始字节缓冲区上单次遍历统计
+        _load_accel()
+        if _page_kernel is not None and content.isascii():
+            data = raw if len(raw) == len(content) else content.encode('ascii')
+            buf = _np.frombuffer(data, dtype=_np.uint8)
+            return int(_page_kernel(buf, chars_per_line, self._lines_per_page))
+        
+        # 没有超长行时不会自动换行，行数即换行符数+1（如多字节编码的中文短行文本）
+        if not self._long_text_line_re.search(content):
+            pages = (content.count('\n') + 1 + self._lines_per_page - 1) // self._lines_per_page
+            return max(pages, 1)
+        
+        # 每行去除行尾空格后的长度（正则在C层扫描，不为每行分配字符串）
+        lengths = (m.end() - m.start() for m in _EFFECTIVE_LINE_RE.finditer(content))
+        
+        # 计算每行实际占用的行数（考虑自动换行，空行占1行）
+        if _np is not None:
+            lengths = _np.fromiter(lengths, dtype=_np.int64, count=content.count('\n') + 1)
+            wrapped = _np.maximum((lengths + chars_per_line - 1) // chars_per_line, 1)
+            total_lines = int(wrapped.sum())
+        else:
+            total_lines = sum(
+                max((length + chars_per_line - 1) // chars_per_line, 1)
+                for length in lengths
+            )
+        
+        # 计算页数
+        pages = (total_lines + self._lines_per_page - 1) // self._lines_per_page
+        return max(pages, 1)
     
-    def _read_txt_with_encoding(self, file_path: Path) -> str:
-        """使用合适的编码读取TXT文件"""
-        encodings = ['utf-8', 'gbk', 'gb2312', 'utf-16', 'utf-16le', 'latin1']
+    def _decode_txt(self, raw: bytes) -> Tuple[Optional[str], Optional[str]]:
+        """
+        探测编码并解码文本
         
-        for encoding in encodings:
+        Args:
+            raw: 文件内容
+            
+        Returns:
+            (文件内容, 编码名称)，无法解码时均为None
+        """
+        # 带BOM的文件直接按BOM解码
+        for bom, encoding in _BOM_ENCODINGS:
+            if raw.startswith(bom):
+                try:
+                    return raw.decode(encoding), encoding
+                except UnicodeError:
+                    break
+        
+        # 纯ASCII内容用任何候选编码解码结果都相同，跳过探测（按UTF-8报告，与逐个尝试的结果一致）
+        if raw.isascii() and self._is_likely_text(raw[:_ENCODING_PROBE_SIZE]):
+            return raw.decode('ascii'), 'utf-8'
+        
+        if CHARSET_NORMALIZER_AVAILABLE:
+            best = from_bytes(raw[:_ENCODING_PROBE_SIZE]).best()
+            if best is not None:
+                return raw.decode(best.encoding, errors='replace'), best.encoding
+        
+        # 验证读取的内容是否合理（与编码无关，只需检查一次）
+        if not self._is_likely_text(raw[:_ENCODING_PROBE_SIZE]):
+            return None, None
+        
+        for encoding in _TXT_ENCODINGS:
             try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                    # 验证读取的内容是否合理
-                    if self._is_likely_text(content[:1000]):  # 检查前1000字符
-                        return content
+                return raw.decode(encoding), encoding
             except (UnicodeDecodeError, UnicodeError):
                 continue
         
-        raise ValueError(f"无法解码文件: {file_path}")
+        return None, None
     
     def print_document(self, file_path: Path, settings: Any) -> bool:
         """
@@ -187,56 +483,59 @@ class TextDocumentHandler(BaseDocumentHandler):
             if not self.can_handle_file(file_path):
                 raise ValueError(f"无法处理的文本文件: {file_path}")
             
-            print(f"开始打印文本文件: {file_path.name}")
+            logger.debug("开始打印文本文件: %s", file_path.name)
             
             if os.name == 'nt':  # Windows系统
                 return self._print_txt_windows(file_path, settings)
             else:
-                print("非Windows系统的文本打印功能需要手动实现")
+                logger.warning("非Windows系统的文本打印功能需要手动实现")
                 return False
                 
         except Exception as e:
-            print(f"打印文本文档失败 {file_path.name}: {e}")
+            logger.error("打印文本文档失败 %s: %s", file_path.name, e)
             return False
     
     def _print_txt_windows(self, file_path: Path, settings: Any) -> bool:
         """在Windows上打印TXT文件"""
         try:
-            # 方法1: 使用notepad打印（最直接的方式）
+            printer_name = getattr(settings, 'printer_name', None)
+            
+            # 方法1: 通过Shell打印动词交给关联程序打印（立即返回，不等待、不捕获输出）
             try:
-                result = subprocess.run([
-                    'notepad.exe', '/p', str(file_path)
-                ], capture_output=True, text=True, timeout=10)
-                
-                # notepad /p 命令通常会直接发送到默认打印机
-                print(f"✓ TXT文件已发送至打印机: {file_path.name}")
-                return True
-                
-            except subprocess.TimeoutExpired:
-                print(f"✓ TXT文件打印命令已执行: {file_path.name}")
+                import win32api
+                if printer_name:
+                    # printto 动词按用户选择的打印机打印
+                    win32api.ShellExecute(0, 'printto', str(file_path), f'"{printer_name}"', '.', 0)
+                else:
+                    win32api.ShellExecute(0, 'print', str(file_path), None, '.', 0)
+                logger.debug("✓ TXT文件已发送至打印机: %s", file_path.name)
                 return True
             except Exception as e1:
-                print(f"notepad打印失败: {e1}")
-                
-                # 方法2: 使用系统默认程序打印
-                try:
-                    os.startfile(str(file_path), 'print')
-                    print(f"✓ 已使用默认程序打印: {file_path.name}")
-                    return True
-                except Exception as e2:
-                    print(f"默认程序打印失败: {e2}")
-                    
-                    # 方法3: 直接打开文件让用户手动打印
-                    try:
-                        os.startfile(str(file_path))
-                        print(f"✓ 已打开文件 {file_path.name} (请手动打印)")
-                        return True
-                    except Exception as e3:
-                        print(f"打开文件失败: {e3}")
-                        return False
+                logger.warning("Shell打印失败: %s", e1)
+            
+            # 方法2: 使用notepad打印（/pt 指定打印机，/p 使用默认打印机），不等待进程结束
+            try:
+                if printer_name:
+                    args = ['notepad.exe', '/pt', str(file_path), printer_name]
+                else:
+                    args = ['notepad.exe', '/p', str(file_path)]
+                subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                logger.debug("✓ TXT文件打印命令已执行: %s", file_path.name)
+                return True
+            except Exception as e2:
+                logger.warning("notepad打印失败: %s", e2)
+            
+            # 方法3: 直接打开文件让用户手动打印
+            try:
+                os.startfile(str(file_path))
+                logger.warning("✓ 已打开文件 %s (请手动打印)", file_path.name)
+                return True
+            except Exception as e3:
+                logger.error("打开文件失败: %s", e3)
+                return False
                         
         except Exception as e:
-            print(f"TXT文件打印失败: {e}")
+            logger.error("TXT文件打印失败: %s", e)
             return False
     
     def get_file_info(self, file_path: Path) -> Dict[str, Any]:
@@ -261,23 +560,13 @@ class TextDocumentHandler(BaseDocumentHandler):
         
         if self.can_handle_file(file_path):
             try:
-                # 检测编码
-                content = self._read_txt_with_encoding(file_path)
-                info['lines'] = len(content.split('\n'))
-                info['pages'] = self._count_txt_pages(file_path)
-                
-                # 尝试检测编码类型
-                encodings = ['utf-8', 'gbk', 'gb2312']
-                for encoding in encodings:
-                    try:
-                        with open(file_path, 'r', encoding=encoding) as f:
-                            f.read(100)
-                        info['encoding'] = encoding.upper()
-                        break
-                    except (UnicodeDecodeError, UnicodeError):
-                        continue
+                # 一次读取同时得到编码、行数和页数
+                analysis = self._analyze(file_path)
+                info['lines'] = analysis['lines']
+                info['pages'] = analysis['pages']
+                info['encoding'] = analysis['encoding'].upper()
                         
             except Exception as e:
-                print(f"获取文本文件详细信息失败 {file_path}: {e}")
+                logger.error("获取文本文件详细信息失败 %s: %s", file_path, e)
         
         return info 
\ No newline at end of file
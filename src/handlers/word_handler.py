@@ -2,35 +2,258 @@
 Word文档处理器
 负责Word文件的打印和页数统计
 """
+import logging
+import os
+import shutil
+import tempfile
+import threading
 import time
+import zipfile
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Set, Optional
+from typing import Any, Set, Optional, Tuple
 from ..core.models import FileType, PrintSettings
 from .base_handler import BaseDocumentHandler
+from .com_utils import release_com_objects
+
+logger = logging.getLogger(__name__)
+
+# .docx 扩展属性部件中的页数（只有Word保存时会更新，其它工具生成的文件可能沿用旧值）
+_APP_PROPS_PART = 'docProps/app.xml'
+_APP_PROPS_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}'
+_APP_PROPS_PAGES = _APP_PROPS_NS + 'Pages'
+_APP_PROPS_APPLICATION = _APP_PROPS_NS + 'Application'
+_APP_PROPS_APP_VERSION = _APP_PROPS_NS + 'AppVersion'
+_WORD_APPLICATION_PREFIX = 'Microsoft Office Word'
+
+# 网络路径上小于此大小的文件先复制到本地临时目录再打开
+_STAGE_MAX_BYTES = 100 * 1024 * 1024
+
+
+@lru_cache(maxsize=32)
+def _is_network_drive(drive: str) -> bool:
+    """
+    判断驱动器是否为网络位置（UNC共享或映射的网络驱动器）
+    
+    Args:
+        drive: os.path.splitdrive 得到的驱动器部分
+        
+    Returns:
+        是否为网络位置
+    """
+    if drive.startswith(('\\\\', '//')):
+        return True
+    if not drive:
+        return False
+    try:
+        import win32file
+        return win32file.GetDriveType(drive + '\\') == win32file.DRIVE_REMOTE
+    except Exception:
+        return False
+
+
+def count_docx_pages_from_props(file_path: Path) -> Optional[int]:
+    """
+    从 .docx 的 docProps/app.xml 读取Word上次保存时记录的页数，无需启动Word
+    
+    只信任由Word保存的文件（Application 为 Microsoft Office Word 且带 AppVersion）；
+    LibreOffice、WPS、python-docx 等工具不会更新页数，记录的值可能是模板中的旧值
+    
+    Args:
+        file_path: 文件路径
+        
+    Returns:
+        页数，非 .docx 文件、非Word保存或未记录页数时返回None
+    """
+    if file_path.suffix.lower() != '.docx':
+        return None
+    
+    try:
+        with zipfile.ZipFile(file_path) as zf:
+            data = zf.read(_APP_PROPS_PART)
+        props = ET.fromstring(data)
+        application = props.findtext(_APP_PROPS_APPLICATION) or ''
+        if not application.startswith(_WORD_APPLICATION_PREFIX) or not props.findtext(_APP_PROPS_APP_VERSION):
+            return None
+        pages_text = props.findtext(_APP_PROPS_PAGES)
+        pages = int(pages_text) if pages_text else 0
+    except (KeyError, ValueError, zipfile.BadZipFile, ET.ParseError, OSError):
+        return None
+    
+    # 部分工具生成的文档页数为0，交由Word重新统计
+    return pages if pages > 0 else None
+
+
+def _stage_local_copy(file_path: Path) -> Optional[Path]:
+    """
+    将网络路径上的文件复制到本地临时文件
+    
+    Word打开网络共享上的文件时会逐个探测转换器和网络位置，先复制到本地再打开更快
+    
+    Args:
+        file_path: 原文件路径
+        
+    Returns:
+        本地临时文件路径（由调用方删除），无需或无法复制时返回None
+    """
+    drive, _ = os.path.splitdrive(str(file_path))
+    if not _is_network_drive(drive):
+        return None
+    
+    try:
+        if file_path.stat().st_size >= _STAGE_MAX_BYTES:
+            return None
+        
+        fd, temp_name = tempfile.mkstemp(suffix=file_path.suffix)
+        os.close(fd)
+        try:
+            shutil.copyfile(file_path, temp_name)
+        except Exception:
+            os.unlink(temp_name)
+            raise
+        return Path(temp_name)
+    except Exception as e:
+        logger.debug("复制到本地临时文件失败，直接打开原文件: %s", e)
+        return None
 
 
 class WordDocumentHandler(BaseDocumentHandler):
     """Word文档处理器"""
     
+    _SUPPORTED_FILE_TYPES: frozenset = frozenset({FileType.WORD})
+    _SUPPORTED_EXTENSIONS: frozenset = frozenset({'.doc', '.docx', '.wps'})
+    
+    # 统计页数时打开文档的参数（只读、不修复、不弹出转换和编码对话框）
+    _COUNT_OPEN_OPTIONS = {
+        'ReadOnly': True,
+        'AddToRecentFiles': False,
+        'Visible': False,
+        'OpenAndRepair': False,
+        'NoEncodingDialog': True,
+        'PasswordDocument': "",
+        'PasswordTemplate': "",
+        'ConfirmConversions': False,
+        'Revert': False,
+    }
+    
     def __init__(self):
         """初始化Word处理器"""
         self._timeout_seconds = 30
+        
+        # 会话期间复用的Word实例（COM对象只能在创建它的线程中使用）
+        self._word = None
+        self._word_thread: Optional[int] = None
+        self._word_lock = threading.Lock()
     
     def get_supported_file_types(self) -> Set[FileType]:
         """获取支持的文件类型"""
-        return {FileType.WORD}
+        return self._SUPPORTED_FILE_TYPES
     
     def get_supported_extensions(self) -> Set[str]:
         """获取支持的文件扩展名"""
-        return {'.doc', '.docx', '.wps'}
+        return self._SUPPORTED_EXTENSIONS
+    
+    def can_handle_extension(self, file_path: Path) -> bool:
+        """只按扩展名检查是否能处理指定文件，不访问文件系统（调用方已确认文件存在时使用）"""
+        return file_path.suffix.lower() in self._SUPPORTED_EXTENSIONS
     
     def can_handle_file(self, file_path: Path) -> bool:
         """检查是否能处理指定文件"""
-        if not self.validate_file_exists(file_path):
+        # 先做扩展名查找，避免对不支持的文件访问文件系统
+        if not self.can_handle_extension(file_path):
             return False
         
-        extension = file_path.suffix.lower()
-        return extension in self.get_supported_extensions()
+        return self.validate_file_exists(file_path)
+    
+    @staticmethod
+    def _create_word():
+        """
+        创建不可见且不显示警告的Word应用实例
+        
+        应用级选项只在创建时设置一次，会话内的后续文件沿用
+        
+        Raises:
+            ImportError: 未安装pywin32
+        """
+        import win32com.client
+        from .com_utils import ensure_com_initialized
+        
+        ensure_com_initialized()
+        word = win32com.client.DispatchEx("Word.Application")
+        try:
+            # 使用makepy生成的早绑定包装（DISPID在生成时确定，调用时不再按名称查询）
+            word = win32com.client.gencache.EnsureDispatch(word)
+        except Exception:
+            # gen_py缓存不可写（如打包后的程序目录只读）时沿用晚绑定
+            pass
+        word.Visible = False
+        word.DisplayAlerts = False  # wdAlertsNone
+        word.ScreenUpdating = False
+        try:
+            # 前台打印，PrintOut 返回时作业已提交，关闭文档不会中断打印
+            word.Options.PrintBackground = False
+        except Exception:
+            pass
+        return word
+    
+    def _ensure_word(self) -> Tuple[Any, bool]:
+        """
+        获取Word应用实例
+        
+        在 session() 所在线程中返回复用的实例，其它情况创建独立实例
+        
+        Returns:
+            (应用实例, 是否为复用实例)，非复用实例需由调用方退出
+        """
+        with self._word_lock:
+            if self._word_thread == threading.get_ident():
+                if self._word is not None:
+                    try:
+                        self._word.Version
+                        return self._word, True
+                    except Exception:
+                        # 实例已失效（如Word被手动关闭），重新创建
+                        self._word = None
+                self._word = self._create_word()
+                return self._word, True
+        return self._create_word(), False
+    
+    @contextmanager
+    def session(self):
+        """
+        批处理会话，会话内同一线程的Word操作复用一个应用实例，只按文件打开/关闭文档
+        
+        用法:
+            with word_handler.session():
+                ...
+        """
+        with self._word_lock:
+            owner = self._word_thread is None
+            if owner:
+                self._word_thread = threading.get_ident()
+        
+        try:
+            yield
+        finally:
+            if owner:
+                self.shutdown()
+    
+    def shutdown(self):
+        """退出会话中复用的Word实例并结束当前会话"""
+        with self._word_lock:
+            word = self._word
+            self._word = None
+            self._word_thread = None
+        
+        if word is not None:
+            try:
+                word.Quit()
+            except Exception as quit_error:
+                logger.warning("退出Word应用程序时出错: %s", quit_error)
+            word = None
+            release_com_objects()
     
     def print_document(self, file_path: Path, settings: PrintSettings) -> bool:
         """
@@ -39,80 +262,61 @@ class WordDocumentHandler(BaseDocumentHandler):
         Args:
             file_path: Word文件路径
             settings: 打印设置
-            
+        
         Returns:
             是否打印成功
         """
         try:
-            import comtypes.client
-            
-            print(f"开始打印Word文档: {file_path}")
+            logger.debug("开始打印Word文档: %s", file_path)
             
-            # 创建Word应用程序对象
-            word = comtypes.client.CreateObject("Word.Application")
-            # 保持Word可见性设置，Word通常可以隐藏
-            word.Visible = False
+            word, shared = self._ensure_word()
+            doc = print_out = None
             
             try:
-                # 打开文档
-                doc = word.Documents.Open(str(file_path))
+                # 打开文档（方法只解析一次，失败回退时直接复用）
+                doc = word.Documents.Open(str(file_path), ReadOnly=True, AddToRecentFiles=False)
+                print_out = doc.PrintOut
                 
-                # 设置打印参数
                 try:
-                    # 设置打印机
-                    word.ActivePrinter = settings.printer_name
-                    
-                    # 尝试强制应用双面打印设置到Word
-                    if settings.duplex:
-                        try:
-                            # 通过Word的Application对象设置打印机属性
-                            import win32print
-                            import win32con
-                            
-                            # 获取当前打印机的DEVMODE并强制设置双面打印
-                            printer_name = settings.printer_name
-                            printer_handle = win32print.OpenPrinter(printer_name)
-                            try:
-                                printer_info = win32print.GetPrinter(printer_handle, 2)
-                                devmode = printer_info.get('pDevMode')
-                                if devmode and hasattr(devmode, 'Duplex'):
-                                    print(f"🔍 Word打印前验证: 打印机双面设置为 {devmode.Duplex}")
-                            finally:
-                                win32print.ClosePrinter(printer_handle)
-                        except Exception as duplex_check:
-                            print(f"⚠️ Word双面打印验证失败: {duplex_check}")
-                    
-                    # 使用简化的打印调用，依赖系统级打印机配置
-                    # (双面打印等设置已通过PrinterConfigManager在系统级配置)
-                    doc.PrintOut(
-                        Copies=settings.copies,
-                        Collate=True,
-                        PrintToFile=False
-                    )
-                    print(f"✅ Word文档打印调用完成，使用系统级配置")
-                except Exception as print_error:
-                    print(f"设置打印参数失败，使用默认设置: {print_error}")
-                    # 如果设置打印选项失败，使用默认设置
-                    doc.PrintOut()
+                    # 设置打印参数
+                    try:
+                        # 设置打印机
+                        word.ActivePrinter = settings.printer_name
+                        
+                        # 使用简化的打印调用，依赖系统级打印机配置
+                        # (双面打印等设置已通过PrinterConfigManager在系统级配置)
+                        print_out(
+                            Copies=settings.copies,
+                            Collate=True,
+                            PrintToFile=False
+                        )
+                        logger.debug("✅ Word文档打印调用完成，使用系统级配置")
+                    except Exception as print_error:
+                        logger.warning("⚠️ 设置打印参数失败，使用默认设置: %s", print_error)
+                        # 如果设置打印选项失败，使用默认设置
+                        print_out()
+                finally:
+                    # 关闭文档（复用的Word实例保持运行）
+                    doc.Close(SaveChanges=False)
                 
-                # 关闭文档
-                doc.Close(SaveChanges=False)
-                
-                print(f"✅ Word文档打印成功: {file_path.name}")
+                logger.debug("✅ Word文档打印成功: %s", file_path.name)
                 return True
-                
+            
             finally:
-                # 退出Word应用程序
-                try:
-                    word.Quit()
-                except Exception as quit_error:
-                    print(f"退出Word应用程序时出错: {quit_error}")
-                
+                # 非会话内创建的实例用完即退出，并释放全部代理
+                if not shared:
+                    try:
+                        word.Quit()
+                    except Exception as quit_error:
+                        logger.warning("退出Word应用程序时出错: %s", quit_error)
+                    doc = print_out = word = None
+                    release_com_objects()
+        
         except ImportError:
-            print("❌ 缺少comtypes库，无法打印Word文档")
+            logger.error("❌ 缺少pywin32库，无法打印Word文档")
             return False
         except Exception as e:
-            print(f"❌ Word文档打印失败: {e}")
+            logger.error("❌ Word文档打印失败: %s", e)
             return False
     
     def count_pages(self, file_path: Path) -> int:
@@ -121,61 +325,24 @@ class WordDocumentHandler(BaseDocumentHandler):
         
         Args:
             file_path: Word文件路径
-            
+        
         Returns:
             页数
-            
+        
         Raises:
             Exception: 统计失败时抛出异常
         """
-        import win32com.client
-        import pythoncom
+        pages = count_docx_pages_from_props(file_path)
+        if pages is not None:
+            return pages
         
         word_app = None
-        document = None
+        shared = False
         
         try:
-            pythoncom.CoInitialize()
-            word_app = win32com.client.Dispatch("Word.Application")
-            word_app.Visible = False
-            word_app.DisplayAlerts = False
-            
-            try:
-                document = word_app.Documents.Open(
-                    FileName=str(file_path),
-                    ReadOnly=True,
-                    AddToRecentFiles=False,
-                    Visible=False,
-                    OpenAndRepair=False,
-                    NoEncodingDialog=True,
-                    PasswordDocument="",
-                    PasswordTemplate="",
-                    ConfirmConversions=False,
-                    Revert=False
-                )
-                
-                if document is None:
-                    raise Exception("文件被加密")
-                
-                try:
-                    pages = document.ComputeStatistics(2)  # wdStatisticPages
-                except Exception:
-                    raise Exception("文件被加密")
-                
-                if pages < 0:
-                    raise Exception("获取到无效的页数")
-                
-                return pages
-                
-            except Exception as open_error:
-                error_str = str(open_error).lower()
-                if ("password" in error_str or "protected" in error_str or 
-                    "access" in error_str or "permission" in error_str or
-                    "encrypted" in error_str or "locked" in error_str):
-                    raise Exception("文件被加密")
-                else:
-                    raise Exception("文件已损坏")
-                
+            word_app, shared = self._ensure_word()
+            return self.count_pages_with_app(word_app, file_path)
+        
         except ImportError:
             raise Exception("需要安装pywin32库来处理Word文档")
         except Exception as e:
@@ -183,6 +350,57 @@ class WordDocumentHandler(BaseDocumentHandler):
                 raise e
             else:
                 raise Exception("文件已损坏")
+        finally:
+            if word_app is not None and not shared:
+                try:
+                    word_app.Quit()
+                except:
+                    pass
+                word_app = None
+                release_com_objects()
+    
+    def count_pages_with_app(self, word_app, file_path: Path) -> int:
+        """
+        使用调用方提供的Word实例统计页数，只打开/关闭文档，不退出Word
+        
+        Args:
+            word_app: Word应用实例（须在当前线程可用）
+            file_path: Word文件路径
+        
+        Returns:
+            页数
+        
+        Raises:
+            Exception: 文件被加密或已损坏时抛出异常
+        """
+        document = None
+        staged_path = _stage_local_copy(file_path)
+        open_path = staged_path or file_path
+        
+        try:
+            document = word_app.Documents.Open(FileName=str(open_path), **self._COUNT_OPEN_OPTIONS)
+            
+            if document is None:
+                raise Exception("文件被加密")
+            
+            try:
+                pages = document.ComputeStatistics(2)  # wdStatisticPages
+            except Exception:
+                raise Exception("文件被加密")
+            
+            if pages < 0:
+                raise Exception("获取到无效的页数")
+            
+            return pages
+        
+        except Exception as open_error:
+            error_str = str(open_error).lower()
+            if ("password" in error_str or "protected" in error_str or
+                "access" in error_str or "permission" in error_str or
+                "encrypted" in error_str or "locked" in error_str):
+                raise Exception("文件被加密")
+            else:
+                raise Exception("文件已损坏")
         finally:
             # 清理资源
             try:
@@ -192,15 +410,7 @@ class WordDocumentHandler(BaseDocumentHandler):
                 pass
             
             try:
-                if word_app is not None:
-                    word_app.Quit()
-            except:
+                if staged_path is not None:
+                    staged_path.unlink()
+            except OSError:
                 pass
-            
-            try:
-                pythoncom.CoUninitialize()
-            except:
-                pass
-    
-
- 
\ No newline at end of file
@@ -2,11 +2,61 @@
 配置文件操作工具
 负责应用配置的保存和加载
 """
+import copy
 import json
+import logging
+import os
+import shutil
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 from src.core.models import AppConfig, PrintSettings
 
+logger = logging.getLogger(__name__)
+
+# orjson 可选，未安装时使用标准库json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_UTF8_BOM = b'\xef\xbb\xbf'
+
+# 默认配置目录：项目根目录下的data文件夹，导入时计算一次
+_DEFAULT_CONFIG_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+def _json_loads(data: bytes):
+    """
+    解析JSON字节串
+    
+    Args:
+        data: UTF-8编码的JSON内容（允许带BOM，如用记事本编辑过的文件）
+        
+    Returns:
+        解析结果
+    """
+    if data.startswith(_UTF8_BOM):
+        data = data[len(_UTF8_BOM):]
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj) -> bytes:
+    """
+    序列化为缩进2格、保留非ASCII字符的UTF-8 JSON字节串
+    
+    Args:
+        obj: 要序列化的对象
+        
+    Returns:
+        JSON字节串
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
 
 class ConfigManager:
     """配置管理器类"""
@@ -18,11 +68,7 @@ class ConfigManager:
         Args:
             config_dir: 配置文件目录，默认为data目录
         """
-        if config_dir is None:
-            # 默认使用项目根目录下的data文件夹
-            self.config_dir = Path(__file__).parent.parent.parent / "data"
-        else:
-            self.config_dir = config_dir
+        self.config_dir = config_dir if config_dir is not None else _DEFAULT_CONFIG_DIR
         
         # 确保配置目录存在
         self.config_dir.mkdir(parents=True, exist_ok=True)
@@ -30,6 +76,31 @@ class ConfigManager:
         # 配置文件路径
         self.app_config_file = self.config_dir / "config.json"
         self.print_settings_file = self.config_dir / "print_settings.json"
+        
+        # 已解析的配置对象，以（修改时间、大小）为键，文件变化后重新解析
+        self._load_cache: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
+    
+    def _load_cached(self, path: Path, from_dict: Callable[[dict], Any]) -> Any:
+        """
+        加载配置文件，文件未变化时直接使用上次解析的结果
+        
+        Args:
+            path: 配置文件路径
+            from_dict: 从字典创建配置对象的方法
+            
+        Returns:
+            配置对象副本（调用方可自由修改，不影响缓存）
+            
+        Raises:
+            FileNotFoundError: 配置文件不存在
+        """
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._load_cache.get(path)
+        if cached is None or cached[0] != key:
+            cached = (key, from_dict(_json_loads(path.read_bytes())))
+            self._load_cache[path] = cached
+        return copy.deepcopy(cached[1])
     
     def load_app_config(self) -> AppConfig:
         """
@@ -39,16 +110,13 @@ class ConfigManager:
             AppConfig对象
         """
         try:
-            if self.app_config_file.exists():
-                with open(self.app_config_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return AppConfig.from_dict(data)
-            else:
-                print("配置文件不存在，使用默认配置")
-                return AppConfig()
-                
+            return self._load_cached(self.app_config_file, AppConfig.from_dict)
+            
+        except FileNotFoundError:
+            logger.debug("配置文件不存在，使用默认配置")
+            return AppConfig()
         except Exception as e:
-            print(f"加载应用配置失败: {e}")
+            logger.error("加载应用配置失败: %s", e)
             return AppConfig()
     
     def save_app_config(self, config: AppConfig) -> bool:
@@ -62,13 +130,12 @@ class ConfigManager:
             是否保存成功
         """
         try:
-            with open(self.app_config_file, 'w', encoding='utf-8') as f:
-                json.dump(config.to_dict(), f, indent=2, ensure_ascii=False)
-            print(f"应用配置已保存到: {self.app_config_file}")
+            self._write_json(self.app_config_file, config.to_dict())
+            logger.debug("应用配置已保存到: %s", self.app_config_file)
             return True
             
         except Exception as e:
-            print(f"保存应用配置失败: {e}")
+            logger.error("保存应用配置失败: %s", e)
             return False
     
     def load_print_settings(self) -> PrintSettings:
@@ -79,16 +146,13 @@ class ConfigManager:
             PrintSettings对象
         """
         try:
-            if self.print_settings_file.exists():
-                with open(self.print_settings_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return PrintSettings.from_dict(data)
-            else:
-                print("打印设置文件不存在，使用默认设置")
-                return PrintSettings()
-                
+            return self._load_cached(self.print_settings_file, PrintSettings.from_dict)
+            
+        except FileNotFoundError:
+            logger.debug("打印设置文件不存在，使用默认设置")
+            return PrintSettings()
         except Exception as e:
-            print(f"加载打印设置失败: {e}")
+            logger.error("加载打印设置失败: %s", e)
             return PrintSettings()
     
     def save_print_settings(self, settings: PrintSettings) -> bool:
@@ -102,15 +166,34 @@ class ConfigManager:
             是否保存成功
         """
         try:
-            with open(self.print_settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings.to_dict(), f, indent=2, ensure_ascii=False)
-            print(f"打印设置已保存到: {self.print_settings_file}")
+            self._write_json(self.print_settings_file, settings.to_dict())
+            logger.debug("打印设置已保存到: %s", self.print_settings_file)
             return True
             
         except Exception as e:
-            print(f"保存打印设置失败: {e}")
+            logger.error("保存打印设置失败: %s", e)
             return False
     
+    def _write_json(self, path: Path, data: dict):
+        """
+        原子地写入JSON文件：先写临时文件，再替换目标文件，写入中途失败不会损坏原文件
+        
+        Args:
+            path: 目标文件路径
+            data: 要写入的数据
+        """
+        self._load_cache.pop(path, None)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        try:
+            tmp_path.write_bytes(_json_dumps(data))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            raise
+    
     def backup_config(self, backup_name: Optional[str] = None) -> bool:
         """
         备份配置文件
@@ -133,24 +216,18 @@ class ConfigManager:
             # 备份应用配置
             if self.app_config_file.exists():
                 backup_app_file = backup_dir / f"config_{backup_name}.json"
-                backup_app_file.write_text(
-                    self.app_config_file.read_text(encoding='utf-8'),
-                    encoding='utf-8'
-                )
+                shutil.copyfile(self.app_config_file, backup_app_file)
             
             # 备份打印设置
             if self.print_settings_file.exists():
                 backup_print_file = backup_dir / f"print_settings_{backup_name}.json"
-                backup_print_file.write_text(
-                    self.print_settings_file.read_text(encoding='utf-8'),
-                    encoding='utf-8'
-                )
+                shutil.copyfile(self.print_settings_file, backup_print_file)
             
-            print(f"配置文件已备份到: {backup_dir}")
+            logger.info("配置文件已备份到: %s", backup_dir)
             return True
             
         except Exception as e:
-            print(f"备份配置文件失败: {e}")
+            logger.error("备份配置文件失败: %s", e)
             return False
     
     def restore_config(self, backup_name: str) -> bool:
@@ -169,24 +246,18 @@ class ConfigManager:
             # 恢复应用配置
             backup_app_file = backup_dir / f"config_{backup_name}.json"
             if backup_app_file.exists():
-                self.app_config_file.write_text(
-                    backup_app_file.read_text(encoding='utf-8'),
-                    encoding='utf-8'
-                )
+                shutil.copyfile(backup_app_file, self.app_config_file)
             
             # 恢复打印设置
             backup_print_file = backup_dir / f"print_settings_{backup_name}.json"
             if backup_print_file.exists():
-                self.print_settings_file.write_text(
-                    backup_print_file.read_text(encoding='utf-8'),
-                    encoding='utf-8'
-                )
+                shutil.copyfile(backup_print_file, self.print_settings_file)
             
-            print(f"配置文件已从备份恢复: {backup_name}")
+            logger.info("配置文件已从备份恢复: %s", backup_name)
             return True
             
         except Exception as e:
-            print(f"恢复配置文件失败: {e}")
+            logger.error("恢复配置文件失败: %s", e)
             return False
     
     def reset_to_defaults(self) -> bool:
@@ -211,12 +282,12 @@ class ConfigManager:
             )
             
             if success:
-                print("配置已重置为默认值")
+                logger.info("配置已重置为默认值")
             
             return success
             
         except Exception as e:
-            print(f"重置配置失败: {e}")
+            logger.error("重置配置失败: %s", e)
             return False
     
     def get_config_info(self) -> dict:
@@ -228,25 +299,26 @@ class ConfigManager:
         """
         info = {
             'config_dir': str(self.config_dir),
-            'app_config_exists': self.app_config_file.exists(),
-            'print_settings_exists': self.print_settings_file.exists(),
+            'app_config_exists': False,
+            'print_settings_exists': False,
             'app_config_size': 0,
             'print_settings_size': 0,
             'last_modified': {}
         }
         
-        try:
-            if self.app_config_file.exists():
-                stat = self.app_config_file.stat()
-                info['app_config_size'] = stat.st_size
-                info['last_modified']['app_config'] = stat.st_mtime
+        # 每个文件只调用一次stat()，不存在时由异常判断，避免 exists() + stat() 两次系统调用
+        for key, config_file in (('app_config', self.app_config_file),
+                                 ('print_settings', self.print_settings_file)):
+            try:
+                stat = config_file.stat()
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.error("获取配置信息失败: %s", e)
+                continue
             
-            if self.print_settings_file.exists():
-                stat = self.print_settings_file.stat()
-                info['print_settings_size'] = stat.st_size
-                info['last_modified']['print_settings'] = stat.st_mtime
-                
-        except Exception as e:
-            print(f"获取配置信息失败: {e}")
+            info[f'{key}_exists'] = True
+            info[f'{key}_size'] = stat.st_size
+            info['last_modified'][key] = stat.st_mtime
         
         return info 
\ No newline at end of file
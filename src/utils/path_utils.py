@@ -2,10 +2,19 @@
 路径工具模块
 处理PyInstaller打包后的资源文件路径问题
 """
+import logging
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+# 项目根目录与资源根目录，进程内不会变化，导入时计算一次
+# PyInstaller创建临时文件夹，并将路径存储在_MEIPASS中；开发环境使用项目根目录
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+_BASE_PATH = Path(getattr(sys, '_MEIPASS', _PROJECT_ROOT))
+
 
 def get_resource_path(relative_path: str) -> Path:
     """
@@ -20,21 +29,10 @@ def get_resource_path(relative_path: str) -> Path:
     Returns:
         资源文件的绝对路径
     """
-    try:
-        # PyInstaller创建临时文件夹，并将路径存储在_MEIPASS中
-        base_path = sys._MEIPASS
-        print(f"🔧 检测到PyInstaller环境，使用临时路径: {base_path}")
-    except AttributeError:
-        # 开发环境，使用脚本所在目录的上级目录（项目根目录）
-        base_path = Path(__file__).parent.parent.parent
-        print(f"🔧 开发环境，使用项目根目录: {base_path}")
-    
-    resource_path = Path(base_path) / relative_path
-    print(f"🔧 资源路径解析: {relative_path} -> {resource_path}")
-    
-    return resource_path
+    return _BASE_PATH / relative_path
 
 
+@lru_cache(maxsize=1)
 def get_sumatra_pdf_path() -> Path:
     """
     获取SumatraPDF可执行文件的路径
@@ -45,6 +43,7 @@ def get_sumatra_pdf_path() -> Path:
     return get_resource_path("external/SumatraPDF/SumatraPDF.exe")
 
 
+@lru_cache(maxsize=1)
 def get_app_icon_path() -> Path:
     """
     获取应用程序图标的路径
@@ -59,28 +58,46 @@ def ensure_resource_exists(resource_path: Path) -> bool:
     """
     检查资源文件是否存在
     
+    资源文件在运行期间不会移动，结果按路径缓存，每个路径只访问一次文件系统；
+    需要重新检查时调用 ensure_resource_exists.cache_clear()
+    
     Args:
         resource_path: 资源文件路径
         
     Returns:
         资源文件是否存在
     """
+    return _resource_exists(os.path.normpath(str(resource_path)))
+
+
+@lru_cache(maxsize=64)
+def _resource_exists(path_str: str) -> bool:
+    """检查资源文件是否存在（按规范化路径缓存）"""
+    resource_path = Path(path_str)
     exists = resource_path.exists()
     if exists:
-        print(f"✅ 资源文件存在: {resource_path}")
+        logger.debug("✅ 资源文件存在: %s", resource_path)
     else:
-        print(f"❌ 资源文件不存在: {resource_path}")
+        logger.error("❌ 资源文件不存在: %s", resource_path)
         
-        # 尝试列出父目录内容以帮助调试
-        parent_dir = resource_path.parent
-        if parent_dir.exists():
-            print(f"📁 父目录内容: {list(parent_dir.iterdir())}")
-        else:
-            print(f"❌ 父目录也不存在: {parent_dir}")
+        # 列出父目录内容以帮助调试（遍历目录开销较大，仅在DEBUG级别执行）
+        if logger.isEnabledFor(logging.DEBUG):
+            parent_dir = resource_path.parent
+            try:
+                with os.scandir(parent_dir) as entries:
+                    names = [entry.name for entry in entries]
+                logger.debug("📁 父目录内容: %s", names)
+            except FileNotFoundError:
+                logger.debug("❌ 父目录也不存在: %s", parent_dir)
+            except OSError as e:
+                logger.debug("❌ 无法列出父目录 %s: %s", parent_dir, e)
     
     return exists
 
 
+ensure_resource_exists.cache_clear = _resource_exists.cache_clear
+
+
 def get_executable_dir() -> Path:
     """
     获取可执行文件所在目录
@@ -93,7 +110,7 @@ def get_executable_dir() -> Path:
         return Path(sys.executable).parent
     else:
         # 开发环境
-        return Path(__file__).parent.parent.parent
+        return _PROJECT_ROOT
 
 
 def debug_paths():
@@ -110,6 +127,7 @@ def debug_paths():
     if hasattr(sys, '_MEIPASS'):
         print(f"sys._MEIPASS: {sys._MEIPASS}")
     
+    print(f"资源根目录: {_BASE_PATH}")
     print(f"当前工作目录: {os.getcwd()}")
     print(f"可执行文件目录: {get_executable_dir()}")
     
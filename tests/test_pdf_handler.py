@@ -0,0 +1,105 @@
+"""
+PDF处理器测试
+"""
+import os
+import tempfile
+import unittest
+from typing import Tuple
+
+from src.handlers.pdf_handler import _count_pages_raw, _is_encrypted_fast, _ENCRYPT_SCAN_SIZE
+
+
+def _build_pdf(objects: dict, trailer_extra: bytes = b'') -> Tuple[bytes, int]:
+    """
+    按对象编号生成使用传统xref表的最小PDF
+    
+    Args:
+        objects: 对象编号 -> 对象内容（不含 obj/endobj）
+        trailer_extra: 追加到trailer字典中的内容
+        
+    Returns:
+        (文件内容, xref表偏移)
+    """
+    size = max(objects) + 1
+    data = b'%PDF-1.4\n'
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(data)
+        data += b'%d 0 obj\n%s\nendobj\n' % (num, objects[num])
+    
+    xref_offset = len(data)
+    data += b'xref\n0 %d\n' % size
+    data += b'0000000000 65535 f \n'
+    for num in range(1, size):
+        if num in offsets:
+            data += b'%010d 00000 n \n' % offsets[num]
+        else:
+            data += b'0000000000 00000 f \n'
+    data += b'trailer\n<< /Size %d /Root 1 0 R%s >>\nstartxref\n%d\n%%%%EOF\n' % (
+        size, trailer_extra, xref_offset)
+    return data, xref_offset
+
+
+def _save(data: bytes) -> str:
+    """
+    写出临时PDF文件
+    
+    Args:
+        data: 文件内容
+        
+    Returns:
+        临时文件路径（由调用方删除）
+    """
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(data)
+    return path
+
+
+class CountPagesRawTest(unittest.TestCase):
+    """直接解析页面树 /Count 的测试"""
+    
+    def _count(self, objects: dict):
+        path = _save(_build_pdf(objects)[0])
+        try:
+            return _count_pages_raw(path)
+        finally:
+            os.unlink(path)
+    
+    def test_direct_count(self):
+        self.assertEqual(self._count({
+            1: b'<< /Type /Catalog /Pages 2 0 R >>',
+            2: b'<< /Type /Pages /Kids [] /Count 12 >>',
+        }), 12)
+    
+    def test_indirect_count_with_two_digit_object_number(self):
+        # 间接引用的 /Count 无法直接确定，须返回None交给PDF库，而不是截断成对象编号的首位数字
+        self.assertIsNone(self._count({
+            1: b'<< /Type /Catalog /Pages 2 0 R >>',
+            2: b'<< /Type /Pages /Kids [] /Count 15 0 R >>',
+            15: b'12',
+        }))
+    
+    def test_encrypt_outside_tail_window(self):
+        # 加密字典位于较早的trailer中、距文件末尾超过扫描窗口时，仍须返回None交给PDF库
+        data, xref_offset = _build_pdf({
+            1: b'<< /Type /Catalog /Pages 2 0 R >>',
+            2: b'<< /Type /Pages /Kids [] /Count 7 >>',
+            3: b'<< /Filter /Standard /V 2 /R 3 >>',
+        }, b' /Encrypt 3 0 R')
+        data += b'%' + b'x' * _ENCRYPT_SCAN_SIZE + b'\n'
+        update_offset = len(data)
+        data += b'xref\n0 1\n0000000000 65535 f \n'
+        data += b'trailer\n<< /Size 4 /Root 1 0 R /Prev %d >>\nstartxref\n%d\n%%%%EOF\n' % (
+            xref_offset, update_offset)
+        
+        path = _save(data)
+        try:
+            self.assertFalse(_is_encrypted_fast(path))
+            self.assertIsNone(_count_pages_raw(path))
+        finally:
+            os.unlink(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Word处理器测试
+"""
+import os
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from src.handlers.word_handler import count_docx_pages_from_props
+
+
+def _write_docx(application: str, pages: int) -> Path:
+    """
+    写出只包含 docProps/app.xml 的 .docx 文件
+    
+    Args:
+        application: Application 元素内容
+        pages: Pages 元素内容
+        
+    Returns:
+        临时文件路径（由调用方删除）
+    """
+    app_xml = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+        '<Application>%s</Application><Pages>%d</Pages><AppVersion>16.0000</AppVersion>'
+        '</Properties>' % (application, pages)
+    )
+    fd, path = tempfile.mkstemp(suffix='.docx')
+    os.close(fd)
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('docProps/app.xml', app_xml)
+    return Path(path)
+
+
+class CountDocxPagesFromPropsTest(unittest.TestCase):
+    """从扩展属性读取 .docx 页数的测试"""
+    
+    def _count(self, application: str, pages: int):
+        path = _write_docx(application, pages)
+        try:
+            return count_docx_pages_from_props(path)
+        finally:
+            os.unlink(path)
+    
+    def test_saved_by_word(self):
+        self.assertEqual(self._count('Microsoft Office Word', 9), 9)
+    
+    def test_saved_by_other_application(self):
+        # 其它工具不会更新页数，须返回None交给Word统计
+        self.assertIsNone(self._count('LibreOffice/7.6.4.1$Windows_X86_64 LibreOffice_project/e19e193f88', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()